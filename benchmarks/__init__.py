@@ -0,0 +1 @@
+# Benchmarks de parse/export; veja benchmarks/run.py.
@@ -0,0 +1,127 @@
+"""Synthetic script generators for benchmarking.
+
+The generated files look like real game scripts (speaker tags, `[r]`/`[cr]`
+tails, `\\x81` wrappers, control-only `.message` lines...) and always round-trip
+byte-identically through their parser.
+"""
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+
+from sekai_parsers.engines.musica.sc_parser import MAP_ENCODE
+
+_JP_WORDS = ("今日", "は", "いい", "天気", "です", "ね", "……", "本当", "に", "そう", "思う", "先輩")
+_PT_WORDS = ("Olá", "não", "você", "então", "coração", "já", "está", "é", "manhã", "ação", "Tóquio")
+_EN_WORDS = ("Long", "time", "no", "see", "I'll", "be", "there", "soon", "okay", "right", "yes")
+_NAMES = ("Sato Shuma", "Yui", "Akane", "Hero", "Mio")
+_PT_TABLE = str.maketrans(MAP_ENCODE)
+
+
+@dataclass(frozen=True, slots=True)
+class CorpusSpec:
+    """Shape of a synthetic corpus for one engine."""
+    engine_id: str
+    encoding: str = "cp932"
+    eol: str = "\r\n"
+    lines: int = 20_000
+    seed: int = 0
+
+    @property
+    def variant(self) -> str:
+        eol = "crlf" if self.eol == "\r\n" else "lf"
+        return f"{self.encoding}-{eol}"
+
+
+def _sentence(rng: random.Random, words: tuple[str, ...], lo: int = 3, hi: int = 14) -> str:
+    sep = "" if words is _JP_WORDS else " "
+    return sep.join(rng.choice(words) for _ in range(rng.randint(lo, hi)))
+
+
+def _words_for(rng: random.Random, encoding: str) -> tuple[str, ...]:
+    # Português só em UTF-8; cp932 não representa os acentos.
+    if encoding.startswith("utf"):
+        return rng.choice((_JP_WORDS, _PT_WORDS, _EN_WORDS))
+    return rng.choice((_JP_WORDS, _EN_WORDS))
+
+
+def generate_ks(spec: CorpusSpec) -> bytes:
+    """KiriKiri/KAG scenario with comments, labels, tag lines and dialogue."""
+    rng = random.Random(spec.seed)
+    yandere = spec.engine_id.endswith(".yandere")
+    out: list[str] = [";//==================================================", "*start|Prologue"]
+
+    while len(out) < spec.lines:
+        roll = rng.random()
+        if roll < 0.35:
+            tag = rng.choice(("bg", "bgm", "se", "fadein", "wait", "chara"))
+            out.append(f'[{tag} file="{tag}_{rng.randint(0, 999):03d}" time={rng.randint(0, 2000)}]')
+        elif roll < 0.45:
+            name = rng.choice(_NAMES)
+            if yandere or rng.random() < 0.3:
+                out.append(f'[P_NAME s_cn="{name}"]')
+            else:
+                out.append(f'[cn name="{name}"]')
+        elif roll < 0.50:
+            out.append(f";// {_sentence(rng, _EN_WORDS, 1, 5)}")
+        elif roll < 0.53:
+            out.append(f"*label_{rng.randint(0, 9999)}|")
+        elif roll < 0.56:
+            out.append("")
+        else:
+            words = _words_for(rng, spec.encoding)
+            body = _sentence(rng, words)
+            if words is _JP_WORDS and rng.random() < 0.5:
+                body = f"「{body}」"
+            tail = rng.choice(("", "", "[r]", "[cr]", "[r][cr]", "[l][r]"))
+            out.append(f"　{body}{tail}" if rng.random() < 0.2 else f"{body}{tail}")
+            if rng.random() < 0.3:
+                out.append("[en]")
+
+    return spec.eol.join(out).encode(spec.encoding) + spec.eol.encode(spec.encoding)
+
+
+def generate_sc(spec: CorpusSpec) -> bytes:
+    """Musica `.sc` scene: mostly commands, with `.message` dialogue lines."""
+    rng = random.Random(spec.seed)
+    utf = spec.encoding.startswith("utf")
+    out: list[str] = [f".stage bg{rng.randint(0, 99):03d}"]
+    msg = 0
+
+    while len(out) < spec.lines:
+        roll = rng.random()
+        if roll < 0.45:
+            cmd = rng.choice((".stage", ".transition", ".se", ".bgm", ".wait", ".chr"))
+            out.append(f"{cmd} {rng.randint(0, 99)} {rng.choice(('*', 'fade', 'bg001'))}")
+        elif roll < 0.48:
+            out.append(f"; {_sentence(rng, _EN_WORDS, 1, 4)}")
+        elif roll < 0.50:
+            out.append(f".message {msg} \\w\\a")
+        else:
+            words = _words_for(rng, spec.encoding)
+            body = _sentence(rng, words)
+            if words is _PT_WORDS:
+                # Texto português já vem "codificado" com a tabela do fan-translation.
+                body = body.translate(_PT_TABLE)
+            wrap = rng.random()
+            if utf and wrap < 0.2:
+                body = f"\x81「{body}\x81」"
+            elif wrap < 0.6:
+                body = rng.choice(("「{}」", "『{}』", "“{}”" if utf else "「{}」")).format(body)
+            ident = f"{rng.randint(0, 999):03d}-{rng.randint(0, 99):02d}"
+            speaker = f"@{rng.choice(_NAMES).split()[0]} " if rng.random() < 0.6 else ""
+            suffix = rng.choice(("\\a", "\\v\\a", "", "\\n"))
+            chan = "[sub]." if rng.random() < 0.05 else ""
+            out.append(f"{chan}.message {msg} {ident} {speaker}{body}{suffix}")
+        msg += 1
+
+    return spec.eol.join(out).encode(spec.encoding) + spec.eol.encode(spec.encoding)
+
+
+def generate(spec: CorpusSpec) -> bytes:
+    """Generate a corpus for `spec.engine_id` (dispatches on the engine family)."""
+    if spec.engine_id.startswith("kirikiri."):
+        return generate_ks(spec)
+    if spec.engine_id.startswith("musica."):
+        return generate_sc(spec)
+    raise KeyError(f"No corpus generator for engine_id: {spec.engine_id}")
@@ -0,0 +1,162 @@
+"""Parse/export throughput benchmarks for every registered engine.
+
+Usage:
+
+    python -m benchmarks.run --lines 50000 --out baseline.json
+    python -m benchmarks.run --lines 50000 --compare baseline.json
+
+Each engine is timed on synthetic corpora (cp932/UTF-8 x CRLF/LF). Results hold
+the best-of-N wall time, throughput (MB/s, lines/s) and peak traced memory of
+`parse`, `export` and the parse+export round trip. `--compare` exits with status 1
+when any timing regresses by more than `--threshold`.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+from sekai_parsers import __version__, get_engine, list_engines
+
+from .corpus import CorpusSpec, generate
+
+_VARIANTS: tuple[tuple[str, str], ...] = (
+    ("cp932", "\r\n"),
+    ("cp932", "\n"),
+    ("utf-8", "\r\n"),
+    ("utf-8", "\n"),
+)
+_STAGES = ("parse", "export", "roundtrip")
+
+
+def _best_time(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _peak_memory(fn: Callable[[], object]) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_engine(engine_id: str, spec: CorpusSpec, *, repeat: int = 3) -> dict:
+    """Benchmark one engine on one corpus variant."""
+    parser = get_engine(engine_id)
+    data = generate(spec)
+    parsed = parser.parse(data, file_path="bench")
+    entries = parsed.entries
+
+    fns: dict[str, Callable[[], object]] = {
+        "parse": lambda: parser.parse(data, file_path="bench"),
+        "export": lambda: parser.export(data, entries, file_path="bench"),
+        "roundtrip": lambda: parser.export(
+            data, parser.parse(data, file_path="bench").entries, file_path="bench"
+        ),
+    }
+
+    mb = len(data) / 1e6
+    out: dict = {"bytes": len(data), "lines": spec.lines, "entries": len(entries)}
+    for stage, fn in fns.items():
+        seconds = _best_time(fn, repeat)
+        out[stage] = {
+            "seconds": seconds,
+            "mb_s": mb / seconds if seconds else None,
+            "lines_s": spec.lines / seconds if seconds else None,
+            "peak_bytes": _peak_memory(fn),
+        }
+    return out
+
+
+def run(*, lines: int, repeat: int, engines: list[str] | None = None) -> dict:
+    results: dict[str, dict] = {}
+    for engine_id in engines or list_engines():
+        per_variant: dict[str, dict] = {}
+        for encoding, eol in _VARIANTS:
+            spec = CorpusSpec(engine_id, encoding=encoding, eol=eol, lines=lines)
+            per_variant[spec.variant] = bench_engine(engine_id, spec, repeat=repeat)
+        results[engine_id] = per_variant
+
+    return {
+        "meta": {
+            "sekai_parsers": __version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "lines": lines,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, *, threshold: float) -> list[str]:
+    """Return a line per stage whose time grew by more than `threshold` (0.1 = 10%)."""
+    regressions: list[str] = []
+    for engine_id, variants in current["results"].items():
+        for variant, res in variants.items():
+            old = baseline.get("results", {}).get(engine_id, {}).get(variant)
+            if not old:
+                continue
+            for stage in _STAGES:
+                before = old[stage]["seconds"]
+                after = res[stage]["seconds"]
+                if before and after > before * (1 + threshold):
+                    regressions.append(
+                        f"{engine_id} {variant} {stage}: "
+                        f"{before * 1e3:.1f}ms -> {after * 1e3:.1f}ms (+{(after / before - 1):.0%})"
+                    )
+    return regressions
+
+
+def _print_table(report: dict) -> None:
+    print(f"{'engine':<22} {'variant':<12} {'stage':<10} {'ms':>9} {'MB/s':>8} {'klines/s':>9} {'peak MB':>8}")
+    for engine_id, variants in report["results"].items():
+        for variant, res in variants.items():
+            for stage in _STAGES:
+                r = res[stage]
+                print(
+                    f"{engine_id:<22} {variant:<12} {stage:<10} "
+                    f"{r['seconds'] * 1e3:>9.1f} {r['mb_s']:>8.2f} "
+                    f"{r['lines_s'] / 1e3:>9.1f} {r['peak_bytes'] / 1e6:>8.1f}"
+                )
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.splitlines()[0])
+    ap.add_argument("--lines", type=int, default=20_000, help="lines per synthetic script")
+    ap.add_argument("--repeat", type=int, default=3, help="best-of-N repetitions")
+    ap.add_argument("--engine", action="append", help="engine id (repeatable; default: all)")
+    ap.add_argument("--out", type=Path, help="write the JSON report here")
+    ap.add_argument("--compare", type=Path, help="baseline JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown (0.10 = 10%%)")
+    args = ap.parse_args(argv)
+
+    report = run(lines=args.lines, repeat=args.repeat, engines=args.engine)
+    _print_table(report)
+
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare(baseline, report, threshold=args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,8 +1,14 @@
 from __future__ import annotations
 
-from .engine_registry import get_engine, list_engines, register_engine
+from .engine_registry import (
+    _LOAD_ERRORS,
+    get_engine,
+    list_engines,
+    load_engine_module,
+    register_engine,
+)
 
-_DISCOVERY_ERRORS: list[tuple[str, str]] = []  # (module_name, error_str)
+__version__ = "0.1.0"
 
 
 def discover_engines() -> None:
@@ -10,41 +16,41 @@ def discover_engines() -> None:
     Importa todo submódulo dentro de sekai_parsers.engines para que cada engine
     registre seu parser via register_engine(...).
 
-    Importante: não deixa 1 engine quebrada impedir o pacote inteiro de carregar.
+    Não é mais chamado no import do pacote: as engines do ENGINE_MANIFEST são
+    carregadas sob demanda por get_engine(). Use isto para registrar engines que
+    estão em sekai_parsers.engines mas fora do manifesto.
+
+    Importante: não deixa 1 engine quebrada impedir as outras de carregar.
     """
-    import importlib
     import pkgutil
 
-    try:
-        from . import engines as engines_pkg
-    except Exception as e:
-        _DISCOVERY_ERRORS.append(("sekai_parsers.engines", repr(e)))
+    if not load_engine_module("sekai_parsers.engines"):
         return
 
+    from . import engines as engines_pkg
+
     for m in pkgutil.iter_modules(engines_pkg.__path__, engines_pkg.__name__ + "."):
-        try:
-            importlib.import_module(m.name)
-        except Exception as e:
-            _DISCOVERY_ERRORS.append((m.name, repr(e)))
-            # continua importando as outras engines
+        load_engine_module(m.name)  # continua importando as outras engines
 
 
-def discovery_errors() -> list[tuple[str, str]]:
-    """Retorna erros de discovery (se houver)."""
-    return list(_DISCOVERY_ERRORS)
+def detect(path, data: bytes | None = None):
+    """Best engine for `path` (see `sekai_parsers.detection.detect`)."""
+    from .detection import detect as _detect
 
+    return _detect(path, data)
 
-# descobre ao importar o pacote (sem quebrar o import)
-try:
-    discover_engines()
-except Exception as _e:
-    _DISCOVERY_ERRORS.append(("discover_engines()", repr(_e)))
+
+def discovery_errors() -> list[tuple[str, str]]:
+    """Retorna erros de discovery (se houver)."""
+    return list(_LOAD_ERRORS)
 
 
 __all__ = [
+    "__version__",
+    "detect",
     "get_engine",
     "list_engines",
     "register_engine",
     "discover_engines",
     "discovery_errors",
-]
\ No newline at end of file
+]
@@ -0,0 +1,219 @@
+"""asyncio front-end for parse/export.
+
+    from sekai_parsers import aio
+
+    result = await aio.parse_file("scene.ks", "kirikiri.ks")
+    await aio.export_file("scene.ks", "kirikiri.ks", result.entries, "out/scene.ks")
+
+File I/O and parsing both run in an executor, never on the event loop. The
+module functions share a default `AsyncParsers` (thread pool); create your own
+to use a `ProcessPoolExecutor` or a different concurrency limit.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import weakref
+from collections.abc import Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from .api import Entry, ParseResult, SpanIndex, pack_entries, unpack_entries
+from .columnar import ColumnarParseResult
+from .engine_registry import get_engine
+from .utils.fs import atomic_write_bytes
+
+
+# Jobs (funções de módulo: precisam ser picklable para ProcessPoolExecutor)
+def _parse_job(
+    engine_id: str,
+    path: str,
+    file_path: str | None,
+    encoding: str | None,
+    with_spans: bool,
+    pack: bool,
+) -> ParseResult | ColumnarParseResult:
+    data = Path(path).read_bytes()
+    result = get_engine(engine_id, shared=True).parse(
+        data,
+        file_path=file_path,
+        encoding=encoding,
+        with_spans=with_spans,
+    )
+    # Entre processos o colunar é bem mais barato de picklar que as Entry.
+    return ColumnarParseResult.from_result(result) if pack else result
+
+
+def _export_job(
+    engine_id: str,
+    path: str,
+    rows: list[tuple],
+    out_path: str,
+    file_path: str | None,
+    encoding: str | None,
+    spans: SpanIndex | None,
+) -> str:
+    data = Path(path).read_bytes()
+    exported = get_engine(engine_id, shared=True).export(
+        data,
+        unpack_entries(rows),
+        file_path=file_path,
+        encoding=encoding,
+        spans=spans,
+    )
+    return str(atomic_write_bytes(out_path, exported))
+
+
+class AsyncParsers:
+    """Runs parse/export jobs off the event loop.
+
+    - `executor`: where jobs run. Defaults to a thread pool with `max_concurrency`
+      workers, created on first use. A `ProcessPoolExecutor` gives real CPU
+      parallelism; results then cross the process boundary in columnar form.
+    - `max_concurrency`: jobs admitted at once. Excess callers wait on a
+      semaphore (FIFO), so a burst of large files can't starve later requests.
+
+    Cancelling the awaiting task releases its slot and drops the job if it hasn't
+    started yet; a job already running finishes in the background and its result
+    is discarded (a running thread can't be interrupted).
+    """
+
+    def __init__(self, executor: Executor | None = None, *, max_concurrency: int | None = None):
+        self.max_concurrency = max_concurrency or min(32, (os.cpu_count() or 1) + 4)
+        self._executor = executor
+        self._owns_executor = executor is None
+        # Um semáforo por event loop: o asyncio.Semaphore fica preso ao loop em que
+        # é usado, e a instância default sobrevive a vários asyncio.run().
+        self._sems: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency,
+                thread_name_prefix="sekai-aio",
+            )
+        return self._executor
+
+    def _semaphore(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        sem = self._sems.get(loop)
+        if sem is None:
+            sem = self._sems[loop] = asyncio.Semaphore(self.max_concurrency)
+        return sem
+
+    async def _submit(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        async with self._semaphore(loop):
+            return await loop.run_in_executor(self.executor, fn, *args)
+
+    async def parse_file(
+        self,
+        path: str | os.PathLike,
+        engine_id: str,
+        *,
+        file_path: str | None = None,
+        encoding: str | None = None,
+        with_spans: bool = False,
+        columnar: bool = False,
+    ) -> ParseResult | ColumnarParseResult:
+        """Read and parse `path`. `file_path` (used in entry keys) defaults to `path`."""
+        pack = columnar or isinstance(self.executor, ProcessPoolExecutor)
+        result = await self._submit(
+            _parse_job,
+            engine_id,
+            os.fspath(path),
+            os.fspath(path) if file_path is None else file_path,
+            encoding,
+            with_spans,
+            pack,
+        )
+        if isinstance(result, ColumnarParseResult) and not columnar:
+            return result.to_result()
+        return result
+
+    async def export_file(
+        self,
+        path: str | os.PathLike,
+        engine_id: str,
+        entries: Sequence[Entry],
+        out_path: str | os.PathLike,
+        *,
+        file_path: str | None = None,
+        encoding: str | None = None,
+        spans: SpanIndex | None = None,
+    ) -> Path:
+        """Export `entries` over the script at `path` into `out_path` (written atomically)."""
+        dst = await self._submit(
+            _export_job,
+            engine_id,
+            os.fspath(path),
+            pack_entries(entries),
+            os.fspath(out_path),
+            os.fspath(path) if file_path is None else file_path,
+            encoding,
+            spans,
+        )
+        return Path(dst)
+
+    def shutdown(self, *, wait: bool = True) -> None:
+        """Shut down the executor if this instance created it."""
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+_DEFAULT: AsyncParsers | None = None
+
+
+def _default() -> AsyncParsers:
+    global _DEFAULT
+    if _DEFAULT is None:
+        _DEFAULT = AsyncParsers()
+    return _DEFAULT
+
+
+async def parse_file(
+    path: str | os.PathLike,
+    engine_id: str,
+    *,
+    file_path: str | None = None,
+    encoding: str | None = None,
+    with_spans: bool = False,
+    columnar: bool = False,
+) -> ParseResult | ColumnarParseResult:
+    """`AsyncParsers.parse_file` on the shared default instance."""
+    return await _default().parse_file(
+        path,
+        engine_id,
+        file_path=file_path,
+        encoding=encoding,
+        with_spans=with_spans,
+        columnar=columnar,
+    )
+
+
+async def export_file(
+    path: str | os.PathLike,
+    engine_id: str,
+    entries: Sequence[Entry],
+    out_path: str | os.PathLike,
+    *,
+    file_path: str | None = None,
+    encoding: str | None = None,
+    spans: SpanIndex | None = None,
+) -> Path:
+    """`AsyncParsers.export_file` on the shared default instance."""
+    return await _default().export_file(
+        path,
+        engine_id,
+        entries,
+        out_path,
+        file_path=file_path,
+        encoding=encoding,
+        spans=spans,
+    )
+
+
+__all__ = ["AsyncParsers", "export_file", "parse_file"]
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Protocol
+from collections.abc import Iterator, Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import BinaryIO, Protocol
 
 
 @dataclass(slots=True)
@@ -19,21 +20,102 @@ class Entry:
     meta: dict | None = None
 
 
+def pack_entries(entries: Sequence[Entry]) -> list[tuple]:
+    """Entries as `(key, text, speaker, meta)` tuples, cheap to pickle across processes."""
+    return [(e.key, e.text, e.speaker, e.meta) for e in entries]
+
+
+def unpack_entries(rows: Sequence[tuple]) -> list[Entry]:
+    """Inverse of `pack_entries`."""
+    return [Entry(key=k, text=t, speaker=s, meta=m) for k, t, s, m in rows]
+
+
+# key -> (start, end) offsets of the entry's source line in the decoded text.
+SpanIndex = dict[str, tuple[int, int]]
+
+
+@dataclass(frozen=True, slots=True)
+class ByteSpans:
+    """Byte offsets of each entry's source line in the original (undecoded) buffer.
+
+    `encoding` is the codec replacements must be encoded with (never a BOM codec:
+    the offsets already skip the BOM).
+    """
+    encoding: str
+    spans: SpanIndex
+
+
 @dataclass(slots=True)
 class ParseResult:
+    """Entries of one file.
+
+    `spans` is only filled when parsing with `with_spans=True`; passing it back to
+    `export(spans=...)` lets the parser splice replacements without re-classifying
+    every line.
+
+    `byte_spans` comes with `spans` when the buffer decoded losslessly in an
+    ASCII-compatible encoding. `export(byte_spans=...)` then encodes only the
+    replacement lines and copies every other byte from the original buffer.
+    It is derived data: not compared, and not kept by `ColumnarParseResult`.
+
+    `source_hash` is the content hash of the parsed buffer, set together with
+    `spans`: spans only describe that exact buffer, so `export_changed` checks
+    it against the file on disk before splicing.
+    """
     engine_id: str
     entries: list[Entry]
+    spans: SpanIndex | None = None
+    byte_spans: ByteSpans | None = field(default=None, compare=False)
+    source_hash: str | None = field(default=None, compare=False)
 
 
 class Parser(Protocol):
     engine_id: str
     extensions: tuple[str, ...]
 
-    def parse(self, data: bytes, *, file_path: str | None = None) -> ParseResult: ...
+    def parse(
+        self,
+        data: bytes,
+        *,
+        file_path: str | None = None,
+        encoding: str | None = None,
+        with_spans: bool = False,
+    ) -> ParseResult: ...
     def export(
         self,
         data: bytes,
         entries: list[Entry],
         *,
         file_path: str | None = None,
-    ) -> bytes: ...
\ No newline at end of file
+        encoding: str | None = None,
+        spans: SpanIndex | None = None,
+        byte_spans: ByteSpans | None = None,
+        strict: bool = False,
+    ) -> bytes: ...
+
+    def parse_incremental(
+        self,
+        old_result: ParseResult,
+        old_data: bytes,
+        new_data: bytes,
+        *,
+        file_path: str | None = None,
+        encoding: str | None = None,
+    ) -> ParseResult: ...
+
+    def parse_stream(
+        self,
+        fp: BinaryIO,
+        *,
+        file_path: str | None = None,
+        encoding: str | None = None,
+    ) -> Iterator[Entry]: ...
+    def export_stream(
+        self,
+        src_fp: BinaryIO,
+        dst_fp: BinaryIO,
+        entries_lookup: Mapping[str, Entry],
+        *,
+        file_path: str | None = None,
+        encoding: str | None = None,
+    ) -> None: ...
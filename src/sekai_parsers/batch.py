@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import os
+import shutil
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .api import ByteSpans, Entry, ParseResult, SpanIndex, pack_entries, unpack_entries
+from .columnar import ColumnarParseResult
+from .engine_registry import get_engine
+from .utils.fs import atomic_write_bytes, atomic_write_chunks
+from .utils.text import content_hash
+
+# Arquivos por tarefa enviada ao pool; agrupar reduz o custo de IPC/pickle
+# quando o projeto tem milhares de scripts pequenos.
+_MAX_CHUNK = 64
+
+
+@dataclass(slots=True)
+class FileError:
+    """A per-file failure collected during a batch run."""
+    path: str
+    error: str
+
+
+@dataclass(slots=True)
+class BatchResult:
+    """Outcome of a batch run.
+
+    - `results` maps the file path (relative to the root, POSIX style) to the
+      `ParseResult`/`ColumnarParseResult` (for `parse_tree`) or to the written
+      output path (for `export_tree`/`export_changed`).
+    - `errors` lists files that failed; one bad file never stops the run.
+    - `clean` lists files `export_changed` found unchanged and did not export.
+    """
+    results: dict[str, Any] = field(default_factory=dict)
+    errors: list[FileError] = field(default_factory=list)
+    clean: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+def iter_script_files(root: str | os.PathLike, extensions: Iterable[str]) -> Iterator[str]:
+    """Yield script paths under `root` (relative, POSIX style) matching `extensions`."""
+    root_path = Path(root)
+    exts = tuple(e.lower() for e in extensions)
+    for dirpath, dirnames, filenames in os.walk(root_path):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(exts):
+                yield (Path(dirpath) / name).relative_to(root_path).as_posix()
+
+
+# Compact (picklable) form
+def _pack_result(result: ParseResult) -> ColumnarParseResult:
+    # Colunar: strings/meta repetidos viajam uma vez só pelo pickle.
+    return ColumnarParseResult.from_result(result)
+
+
+# Workers (rodam no processo filho; precisam ser funções de módulo)
+def _parse_chunk(
+    engine_id: str,
+    root: str,
+    encoding: str | None,
+    rel_paths: list[str],
+) -> list[tuple]:
+    parser = get_engine(engine_id, shared=True)
+    out: list[tuple] = []
+    for rel in rel_paths:
+        try:
+            data = (Path(root) / rel).read_bytes()
+            result = parser.parse(data, file_path=rel, encoding=encoding)
+            out.append((rel, _pack_result(result), None))
+        except Exception as e:
+            out.append((rel, None, repr(e)))
+    return out
+
+
+def _export_chunk(
+    engine_id: str,
+    root: str,
+    out_root: str,
+    encoding: str | None,
+    jobs: list[tuple[str, list[tuple], SpanIndex | ByteSpans | None, str | None]],
+) -> list[tuple]:
+    parser = get_engine(engine_id, shared=True)
+    out: list[tuple] = []
+    for rel, rows, spans, source_hash in jobs:
+        try:
+            data = (Path(root) / rel).read_bytes()
+            if spans is not None and content_hash(data) != source_hash:
+                # O arquivo mudou desde o parse: as spans apontam para outras
+                # linhas. Export completo, que reclassifica o arquivo atual.
+                spans = None
+            if isinstance(spans, ByteSpans):
+                # Sem decode: só as linhas editadas são codificadas (writev direto).
+                chunks = parser.export_chunks(data, unpack_entries(rows), spans)
+                dst = atomic_write_chunks(Path(out_root) / rel, chunks)
+                out.append((rel, str(dst), None))
+                continue
+            exported = parser.export(
+                data,
+                unpack_entries(rows),
+                file_path=rel,
+                encoding=encoding,
+                spans=spans,
+            )
+            dst = atomic_write_bytes(Path(out_root) / rel, exported)
+            out.append((rel, str(dst), None))
+        except Exception as e:
+            out.append((rel, None, repr(e)))
+    return out
+
+
+# Scheduling helpers
+def _resolve_workers(workers: int | None) -> int:
+    if workers is None:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def _chunks(items: list, workers: int) -> list[list]:
+    if not items:
+        return []
+    # ~4 tarefas por worker mantém o pool balanceado sem explodir o IPC.
+    size = max(1, min(_MAX_CHUNK, len(items) // (workers * 4) or 1))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _by_size_desc(root: Path, rel_paths: list[str]) -> list[str]:
+    # Arquivos grandes primeiro: evita que o último chunk seja o mais lento.
+    def size(rel: str) -> int:
+        try:
+            return (root / rel).stat().st_size
+        except OSError:
+            return 0
+
+    return sorted(rel_paths, key=size, reverse=True)
+
+
+def _run(fn, fixed_args: tuple, chunks: list[list], workers: int) -> Iterator[tuple]:
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield from fn(*fixed_args, chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+        futures = [pool.submit(fn, *fixed_args, chunk) for chunk in chunks]
+        for fut in as_completed(futures):
+            yield from fut.result()
+
+
+# Public API
+def parse_tree(
+    root: str | os.PathLike,
+    engine_id: str,
+    *,
+    workers: int | None = None,
+    extensions: Iterable[str] | None = None,
+    paths: Iterable[str] | None = None,
+    encoding: str | None = None,
+    columnar: bool = False,
+) -> BatchResult:
+    """Parse every script under `root` with `engine_id`, fanning out to a process pool.
+
+    Entry keys use the path relative to `root` as `file_path`, so they are stable
+    regardless of where the project lives on disk. `workers=1` runs in-process.
+    Pass `encoding` when the project encoding is known to skip detection.
+    With `columnar=True` results are kept as `ColumnarParseResult` (much smaller
+    for large projects) instead of being expanded back into `ParseResult`.
+    """
+    root_path = Path(root)
+    if paths is None:
+        exts = tuple(extensions) if extensions is not None else get_engine(engine_id).extensions
+        rel_paths = list(iter_script_files(root_path, exts))
+    else:
+        rel_paths = [Path(p).as_posix() for p in paths]
+
+    n = _resolve_workers(workers)
+    chunks = _chunks(_by_size_desc(root_path, rel_paths), n)
+
+    batch = BatchResult()
+    for rel, packed, err in _run(_parse_chunk, (engine_id, str(root_path), encoding), chunks, n):
+        if err is not None:
+            batch.errors.append(FileError(rel, err))
+        else:
+            batch.results[rel] = packed if columnar else packed.to_result()
+
+    batch.results = {rel: batch.results[rel] for rel in sorted(batch.results)}
+    batch.errors.sort(key=lambda e: e.path)
+    return batch
+
+
+def export_tree(
+    root: str | os.PathLike,
+    engine_id: str,
+    entries: Mapping[str, Sequence[Entry]],
+    out_root: str | os.PathLike,
+    *,
+    workers: int | None = None,
+    encoding: str | None = None,
+) -> BatchResult:
+    """Export edited `entries` (keyed by relative path) from `root` into `out_root`.
+
+    Only files present in `entries` are written. `BatchResult.results` maps each
+    relative path to the output file.
+    """
+    root_path = Path(root)
+    jobs = [(Path(rel).as_posix(), pack_entries(ents), None, None) for rel, ents in entries.items()]
+    return _export_jobs(root_path, engine_id, jobs, Path(out_root), workers, encoding, BatchResult())
+
+
+def changed_entries(
+    original: ParseResult | ColumnarParseResult,
+    edited: Iterable[Entry],
+) -> list[Entry]:
+    """Entries of `edited` whose `text` or `meta` differ from `original` (same key).
+
+    Entries whose key is not in `original` count as changed. Keys missing from
+    `edited` are left alone by `export`, so they never make a file dirty.
+    """
+    orig = original.entries if isinstance(original, ParseResult) else original
+    edited = edited if isinstance(edited, Sequence) else list(edited)
+
+    # Caminho comum: mesma ordem de keys (lista vinda do próprio parse).
+    if len(edited) == len(orig):
+        out: list[Entry] = []
+        for e, o in zip(edited, orig, strict=True):
+            if e is o:
+                continue
+            if e.key != o.key:
+                break
+            if e.text != o.text or e.meta != o.meta:
+                out.append(e)
+        else:
+            return out
+
+    by_key = {o.key: o for o in orig}
+    changed: list[Entry] = []
+    for e in edited:
+        o = by_key.get(e.key)
+        if o is None or e.text != o.text or e.meta != o.meta:
+            changed.append(e)
+    return changed
+
+
+def export_changed(
+    root: str | os.PathLike,
+    engine_id: str,
+    originals: Mapping[str, ParseResult | ColumnarParseResult],
+    edited: Mapping[str, Sequence[Entry]],
+    out_root: str | os.PathLike | None = None,
+    *,
+    workers: int | None = None,
+    encoding: str | None = None,
+    copy_clean: bool = True,
+) -> BatchResult:
+    """Export only the files whose entries changed since `originals` was parsed.
+
+    `originals` is the parse of `root` (e.g. `parse_tree(...).results`) and
+    `edited` the current entries, both keyed by relative path. Each file is
+    compared entry by entry (`changed_entries`); clean files are never read or
+    decoded and end up in `BatchResult.clean`. Dirty files get only their
+    changed entries exported and are written atomically, in parallel. When the
+    original parse kept byte spans (`with_spans=True`, not columnar) the file is
+    not decoded either: new lines are spliced into the original bytes. Spans are
+    only used while the file still hashes to the parsed content
+    (`source_hash`); a file edited on disk since the parse gets a full export.
+
+    `out_root=None` writes back into `root`. With a separate `out_root`, clean
+    files are copied byte for byte unless `copy_clean=False`.
+    """
+    root_path = Path(root)
+    out_path = root_path if out_root is None else Path(out_root)
+    in_place = out_path.resolve() == root_path.resolve()
+
+    batch = BatchResult()
+    jobs: list[tuple[str, list[tuple], SpanIndex | ByteSpans | None, str | None]] = []
+    for rel, ents in edited.items():
+        rel = Path(rel).as_posix()
+        original = originals.get(rel)
+        if original is None:
+            jobs.append((rel, pack_entries(ents), None, None))
+            continue
+        changed = changed_entries(original, ents)
+        if not changed:
+            batch.clean.append(rel)
+            continue
+        jobs.append((rel, pack_entries(changed), _job_spans(original, changed), original.source_hash))
+
+    if copy_clean and not in_place:
+        for rel in batch.clean:
+            try:
+                dst = out_path / rel
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(root_path / rel, dst)
+                batch.results[rel] = str(dst)
+            except OSError as e:
+                batch.errors.append(FileError(rel, repr(e)))
+    batch.clean.sort()
+
+    return _export_jobs(root_path, engine_id, jobs, out_path, workers, encoding, batch)
+
+
+def _job_spans(
+    original: ParseResult | ColumnarParseResult,
+    changed: list[Entry],
+) -> SpanIndex | ByteSpans | None:
+    # Só as spans das entries alteradas viajam para o worker.
+    byte_spans = original.byte_spans if isinstance(original, ParseResult) else None
+    if byte_spans is not None:
+        spans = byte_spans.spans
+        return ByteSpans(byte_spans.encoding, {e.key: spans[e.key] for e in changed if e.key in spans})
+    spans = original.spans
+    if spans is None:
+        return None
+    return {e.key: spans[e.key] for e in changed if e.key in spans}
+
+
+def _export_jobs(
+    root_path: Path,
+    engine_id: str,
+    jobs: list[tuple[str, list[tuple], SpanIndex | ByteSpans | None, str | None]],
+    out_path: Path,
+    workers: int | None,
+    encoding: str | None,
+    batch: BatchResult,
+) -> BatchResult:
+    order = {rel: i for i, rel in enumerate(_by_size_desc(root_path, [j[0] for j in jobs]))}
+    jobs.sort(key=lambda j: order[j[0]])
+
+    n = _resolve_workers(workers)
+    chunks = _chunks(jobs, n)
+
+    fixed = (engine_id, str(root_path), str(out_path), encoding)
+    for rel, dst, err in _run(_export_chunk, fixed, chunks, n):
+        if err is not None:
+            batch.errors.append(FileError(rel, err))
+        else:
+            batch.results[rel] = dst
+
+    batch.results = {rel: batch.results[rel] for rel in sorted(batch.results)}
+    batch.errors.sort(key=lambda e: e.path)
+    return batch
+
+
+__all__ = [
+    "BatchResult",
+    "FileError",
+    "iter_script_files",
+    "parse_tree",
+    "export_tree",
+    "export_changed",
+    "changed_entries",
+]
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import tempfile
+from pathlib import Path
+
+from . import __version__
+from .api import ParseResult
+from .columnar import ColumnarParseResult
+from .utils.text import content_hash
+
+# Muda quando o formato do blob ou o significado das entries muda.
+_CACHE_FORMAT = 2
+_SUFFIX = ".spc"
+DEFAULT_MAX_BYTES = 512 << 20
+
+
+def default_cache_dir() -> Path:
+    """`$SEKAI_PARSERS_CACHE`, else `$XDG_CACHE_HOME/sekai_parsers`, else `~/.cache/sekai_parsers`."""
+    env = os.environ.get("SEKAI_PARSERS_CACHE")
+    if env:
+        return Path(env)
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "sekai_parsers"
+
+
+class ParseCache:
+    """On-disk cache of parse results, keyed by content and parser identity.
+
+    The key is (content hash, engine_id, profile id, library version, encoding
+    override, with_spans), so a new release or a different profile never reuses a
+    stale result. Results are stored as `ColumnarParseResult` blobs; when the
+    directory grows past `max_bytes` the least recently used files are evicted
+    (recency is tracked through the file mtime, bumped on every hit).
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike | None = None,
+        *,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        use_mmap: bool = True,
+    ):
+        self.path = Path(path) if path is not None else default_cache_dir()
+        self.max_bytes = max_bytes
+        self.use_mmap = use_mmap
+        self._size: int | None = None
+
+    # Keys
+    def key(
+        self,
+        data: bytes,
+        engine_id: str,
+        *,
+        profile: str = "",
+        encoding: str | None = None,
+        with_spans: bool = False,
+    ) -> str:
+        parts = (
+            content_hash(data),
+            engine_id,
+            profile,
+            __version__,
+            str(_CACHE_FORMAT),
+            encoding or "",
+            "spans" if with_spans else "",
+        )
+        return hashlib.blake2b("\0".join(parts).encode("utf-8"), digest_size=20).hexdigest()
+
+    def _file(self, key: str) -> Path:
+        return self.path / key[:2] / f"{key}{_SUFFIX}"
+
+    # Read / write
+    def get(self, key: str, *, file_path: str | None = None) -> ParseResult | None:
+        col = self.get_columnar(key, file_path=file_path)
+        return col.to_result() if col is not None else None
+
+    def get_columnar(self, key: str, *, file_path: str | None = None) -> ColumnarParseResult | None:
+        p = self._file(key)
+        try:
+            col, prefix = self._read(p)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            os.utime(p)  # LRU: marca como usado agora
+        except OSError:
+            pass
+
+        # As keys embutem o file_path; o mesmo conteúdo pode estar em outro arquivo.
+        col.rebase_keys(prefix, file_path or "file")
+        return col
+
+    def _read(self, p: Path) -> tuple[ColumnarParseResult, str]:
+        with p.open("rb") as f:
+            if self.use_mmap:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return _decode(mm)
+            return _decode(f.read())
+
+    def put(self, key: str, result: ParseResult, *, file_path: str | None = None) -> None:
+        self._put_columnar(key, ColumnarParseResult.from_result(result), file_path=file_path)
+
+    def _put_columnar(
+        self,
+        key: str,
+        col: ColumnarParseResult,
+        *,
+        file_path: str | None,
+    ) -> None:
+        try:
+            blob = col.to_bytes()
+        except TypeError:
+            return  # meta com valores exóticos: não cacheia
+
+        prefix = (file_path or "file").encode("utf-8", errors="surrogatepass")
+        payload = len(prefix).to_bytes(4, "little") + prefix + blob
+
+        dst = self._file(key)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            replaced = dst.stat().st_size  # sobrescrever não pode contar o arquivo duas vezes
+        except OSError:
+            replaced = 0
+        fd, tmp = tempfile.mkstemp(dir=dst.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp, dst)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+        if self._size is not None:
+            self._size += len(payload) - replaced
+        self._evict()
+
+    def parse(
+        self,
+        parser,
+        data: bytes,
+        *,
+        file_path: str | None = None,
+        encoding: str | None = None,
+        with_spans: bool = False,
+    ) -> ParseResult:
+        """`parser.parse(...)` through the cache."""
+        return self.parse_columnar(
+            parser,
+            data,
+            file_path=file_path,
+            encoding=encoding,
+            with_spans=with_spans,
+        ).to_result()
+
+    def parse_columnar(
+        self,
+        parser,
+        data: bytes,
+        *,
+        file_path: str | None = None,
+        encoding: str | None = None,
+        with_spans: bool = False,
+    ) -> ColumnarParseResult:
+        """Like `parse`, but returns the columnar form; hits skip building `Entry` objects."""
+        profile = getattr(getattr(parser, "profile", None), "id", "")
+        key = self.key(
+            data,
+            parser.engine_id,
+            profile=profile,
+            encoding=encoding,
+            with_spans=with_spans,
+        )
+        hit = self.get_columnar(key, file_path=file_path)
+        if hit is not None:
+            return hit
+
+        result = parser.parse(data, file_path=file_path, encoding=encoding, with_spans=with_spans)
+        col = ColumnarParseResult.from_result(result)
+        self._put_columnar(key, col, file_path=file_path)
+        return col
+
+    # Housekeeping
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        out: list[tuple[float, int, Path]] = []
+        if not self.path.is_dir():
+            return out
+        for p in self.path.glob(f"*/*{_SUFFIX}"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            out.append((st.st_mtime, st.st_size, p))
+        return out
+
+    def size(self) -> int:
+        if self._size is None:
+            self._size = sum(size for _mtime, size, _p in self._entries())
+        return self._size
+
+    def _evict(self) -> None:
+        if self.size() <= self.max_bytes:
+            return
+        entries = sorted(self._entries())
+        total = sum(size for _mtime, size, _p in entries)
+        # Desce até 90% do limite para não rodar eviction a cada put.
+        target = int(self.max_bytes * 0.9)
+        for _mtime, size, p in entries:
+            if total <= target:
+                break
+            try:
+                p.unlink()
+                total -= size
+            except OSError:
+                pass
+        self._size = total
+
+    def clear(self) -> None:
+        for _mtime, _size, p in self._entries():
+            try:
+                p.unlink()
+            except OSError:
+                pass
+        self._size = 0
+
+
+def _decode(buf: bytes | mmap.mmap) -> tuple[ColumnarParseResult, str]:
+    mv = memoryview(buf)
+    try:
+        n = int.from_bytes(mv[:4], "little")
+        prefix = str(mv[4:4 + n], "utf-8", errors="surrogatepass")
+        return ColumnarParseResult.from_bytes(mv[4 + n:]), prefix
+    finally:
+        mv.release()
+
+
+__all__ = ["ParseCache", "content_hash", "default_cache_dir", "DEFAULT_MAX_BYTES"]
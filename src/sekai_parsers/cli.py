@@ -0,0 +1,450 @@
+"""`sekai-parsers` command line.
+
+    sekai-parsers parse scripts/ -e musica.sc -j 8 > entries.ndjson
+    jq -c 'select(.speaker == "Hero") | .text |= ascii_upcase' entries.ndjson \\
+        | sekai-parsers export -o out/
+    sekai-parsers roundtrip 'data/**/*.ks'
+    sekai-parsers check --encoding cp932 < entries.ndjson
+
+`parse` writes one JSON object per entry (`file`, `engine`, `key`, `text`,
+`speaker`, `meta`), flushed as each file finishes. `export` reads the same
+records from stdin (only `file`, `key` and `text` are required; missing keys
+keep their original line) and exports a file as soon as its records end, so
+the records of a file must be contiguous, as `parse` writes them.
+`roundtrip` parses and re-exports every file unchanged and reports any file
+whose bytes differ. `check` reads `parse`-style records from stdin and reports
+every entry whose text the target encoding cannot represent, before exporting.
+
+Paths may be files, directories (searched recursively for the engine's
+extensions) or glob patterns. Without `-e` each file's engine is detected.
+"""
+from __future__ import annotations
+
+import argparse
+import codecs
+import glob
+import json
+import os
+import sys
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import TextIO
+
+from .api import Entry
+from .engine_registry import ENGINE_MANIFEST, get_engine
+from .utils.fs import atomic_write_bytes
+
+
+# Entrada
+def _extensions(engine_id: str | None) -> tuple[str, ...]:
+    if engine_id is not None:
+        return tuple(get_engine(engine_id, shared=True).extensions)
+    return tuple(sorted({ext for _mod, exts in ENGINE_MANIFEST.values() for ext in exts}))
+
+
+def iter_input_files(patterns: Iterable[str], extensions: tuple[str, ...]) -> Iterator[str]:
+    """Expand files, directories and globs into file paths (POSIX style, no duplicates)."""
+    exts = tuple(e.lower() for e in extensions)
+    seen: set[str] = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates: Iterable[str] = (
+                os.path.join(dirpath, name)
+                for dirpath, dirnames, filenames in _sorted_walk(pattern)
+                for name in filenames
+                if name.lower().endswith(exts)
+            )
+        elif glob.has_magic(pattern):
+            candidates = (p for p in sorted(glob.iglob(pattern, recursive=True)) if os.path.isfile(p))
+        else:
+            candidates = (pattern,)
+        for path in candidates:
+            path = Path(path).as_posix()
+            if path not in seen:
+                seen.add(path)
+                yield path
+
+
+def _sorted_walk(root: str) -> Iterator[tuple[str, list[str], list[str]]]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        yield dirpath, dirnames, sorted(filenames)
+
+
+def _known_engine(engine_id: str) -> bool:
+    try:
+        get_engine(engine_id, shared=True)
+    except KeyError:
+        return False
+    return True
+
+
+def _resolve_engine(engine_id: str | None, path: str) -> str:
+    if engine_id is not None:
+        return engine_id
+    from .detection import detect
+
+    found = detect(path)
+    if found.engine_id is None:
+        raise ValueError("could not detect the engine (use -e)")
+    return found.engine_id
+
+
+# Jobs (funções de módulo: rodam no ProcessPoolExecutor)
+def _parse_job(path: str, engine_id: str | None, encoding: str | None) -> str:
+    engine_id = _resolve_engine(engine_id, path)
+    data = Path(path).read_bytes()
+    result = get_engine(engine_id, shared=True).parse(data, file_path=path, encoding=encoding)
+    # O NDJSON já sai pronto do worker: o processo principal só escreve.
+    return "".join(
+        json.dumps(
+            {"file": path, "engine": engine_id, "key": e.key, "text": e.text, "speaker": e.speaker, "meta": e.meta},
+            ensure_ascii=False,
+        ) + "\n"
+        for e in result.entries
+    )
+
+
+def _export_job(
+    path: str,
+    engine_id: str | None,
+    rows: list[tuple],
+    out_path: str,
+    encoding: str | None,
+) -> str:
+    engine_id = _resolve_engine(engine_id, path)
+    data = Path(path).read_bytes()
+    parser = get_engine(engine_id, shared=True)
+    if all(m is not None for _k, _t, _s, m in rows):
+        entries = [Entry(key=k, text=t, speaker=s, meta=m) for k, t, s, m in rows]
+    else:
+        # Registros enxutos (só file/key/text): speaker/meta vêm do parse do original.
+        original = {e.key: e for e in parser.parse(data, file_path=path, encoding=encoding).entries}
+        entries = []
+        for k, t, s, m in rows:
+            base = original.get(k)
+            if base is None and m is None:
+                raise ValueError(f"unknown key {k!r}")
+            entries.append(Entry(
+                key=k,
+                text=t,
+                speaker=s if s is not None or base is None else base.speaker,
+                meta=m if m is not None else base.meta,
+            ))
+    exported = parser.export(data, entries, file_path=path, encoding=encoding)
+    return str(atomic_write_bytes(out_path, exported))
+
+
+def _roundtrip_job(path: str, engine_id: str | None, encoding: str | None) -> str:
+    from .verify import check_file
+
+    engine_id = _resolve_engine(engine_id, path)
+    data = Path(path).read_bytes()
+    parser = get_engine(engine_id, shared=True)
+    result = parser.parse(data, file_path=path, encoding=encoding)
+    m = check_file(parser, data, file_path=path, encoding=encoding, result=result)
+    report: dict = {"file": path, "engine": engine_id, "entries": len(result.entries), "ok": m is None}
+    if m is not None:
+        report.update(first_diff=m.offset, line=m.line, key=m.key)
+    return json.dumps(report, ensure_ascii=False) + "\n"
+
+
+# Execução
+class _Runner:
+    """Runs jobs in-process (`-j 1`) or in a process pool, yielding results in
+    completion order. At most `2 * workers` jobs are in flight, so a huge
+    project never has all its results in memory at once.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def run(self, jobs: Iterable[tuple[str, Callable, tuple]]) -> Iterator[tuple[str, str | None, str | None]]:
+        if self._pool is None:
+            for path, fn, args in jobs:
+                try:
+                    yield path, fn(*args), None
+                except Exception as e:
+                    yield path, None, f"{type(e).__name__}: {e}"
+            return
+
+        window = 2 * self.workers
+        inflight: dict[Future, str] = {}
+        jobs = iter(jobs)
+        while True:
+            while len(inflight) < window:
+                job = next(jobs, None)
+                if job is None:
+                    break
+                path, fn, args = job
+                inflight[self._pool.submit(fn, *args)] = path
+            if not inflight:
+                return
+            done, _pending = wait(inflight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                path = inflight.pop(fut)
+                try:
+                    yield path, fut.result(), None
+                except Exception as e:
+                    yield path, None, f"{type(e).__name__}: {e}"
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+
+def _workers(value: int) -> int:
+    return (os.cpu_count() or 1) if value <= 0 else value
+
+
+def _report_error(path: str, err: str) -> None:
+    print(f"sekai-parsers: {path}: {err}", file=sys.stderr)
+
+
+def _emit(results: Iterator[tuple[str, str | None, str | None]], out: TextIO) -> int:
+    status = 0
+    for path, chunk, err in results:
+        if err is not None:
+            _report_error(path, err)
+            status = 1
+        elif chunk:
+            out.write(chunk)
+            out.flush()
+    return status
+
+
+# Subcomandos
+def cmd_parse(args: argparse.Namespace, out: TextIO) -> int:
+    files = iter_input_files(args.paths, _extensions(args.engine))
+    runner = _Runner(_workers(args.jobs))
+    try:
+        return _emit(runner.run((p, _parse_job, (p, args.engine, args.encoding)) for p in files), out)
+    finally:
+        runner.close()
+
+
+def cmd_roundtrip(args: argparse.Namespace, out: TextIO) -> int:
+    files = iter_input_files(args.paths, _extensions(args.engine))
+    runner = _Runner(_workers(args.jobs))
+    status = 0
+    try:
+        for path, line, err in runner.run((p, _roundtrip_job, (p, args.engine, args.encoding)) for p in files):
+            if err is not None:
+                _report_error(path, err)
+                status = 1
+                continue
+            out.write(line)
+            out.flush()
+            if not json.loads(line)["ok"]:
+                status = 1
+    finally:
+        runner.close()
+    return status
+
+
+def _out_path(path: str, args: argparse.Namespace) -> str:
+    if args.in_place:
+        return path
+    rel = os.path.relpath(path, args.root)
+    if rel.startswith(".."):
+        raise ValueError(f"outside --root {args.root!r}")
+    return os.path.join(args.out, rel)
+
+
+def _export_groups(
+    lines: Iterable[str],
+    args: argparse.Namespace,
+    errors: list[tuple[str, str]],
+) -> Iterator[tuple[str, Callable, tuple]]:
+    """Group consecutive stdin records by file and yield one export job per file.
+
+    A file whose records show up again after another file's is reported and
+    its late records are dropped: exporting them would overwrite the first
+    export with only part of the rows.
+    """
+    done: set[str] = set()
+    current: str | None = None
+    engine: str | None = None
+    rows: list[tuple] = []
+    skipping = False
+
+    def flush() -> tuple[str, Callable, tuple] | None:
+        if current is None or skipping:
+            return None
+        done.add(current)
+        try:
+            dst = _out_path(current, args)
+        except ValueError as e:
+            errors.append((current, str(e)))
+            return None
+        return current, _export_job, (current, args.engine or engine, rows, dst, args.encoding)
+
+    for n, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            rec = json.loads(line)
+            path, key, text = rec["file"], rec["key"], rec["text"]
+        except (ValueError, KeyError, TypeError):
+            errors.append((f"<stdin>:{n}", "expected a JSON object with 'file', 'key' and 'text'"))
+            continue
+        if path != current:
+            job = flush()
+            if job is not None:
+                yield job
+            skipping = path in done
+            if skipping:
+                errors.append((path, "records are not contiguous; later records skipped (sort the input by file)"))
+            current, engine, rows = path, rec.get("engine"), []
+        if skipping:
+            continue
+        rows.append((key, text, rec.get("speaker"), rec.get("meta")))
+    job = flush()
+    if job is not None:
+        yield job
+
+
+def cmd_export(args: argparse.Namespace, out: TextIO, stdin: TextIO) -> int:
+    if not args.in_place and args.out is None:
+        raise SystemExit("sekai-parsers export: pass -o DIR or --in-place")
+    errors: list[tuple[str, str]] = []
+    runner = _Runner(_workers(args.jobs))
+    status = 0
+    try:
+        for path, dst, err in runner.run(_export_groups(stdin, args, errors)):
+            if err is not None:
+                _report_error(path, err)
+                status = 1
+            else:
+                out.write(json.dumps({"file": path, "written": dst}, ensure_ascii=False) + "\n")
+                out.flush()
+    finally:
+        runner.close()
+    for path, err in errors:
+        _report_error(path, err)
+        status = 1
+    return status
+
+
+# Registros checados por chamada de check_entries.
+_CHECK_BATCH = 10_000
+
+
+def cmd_check(args: argparse.Namespace, out: TextIO, stdin: TextIO) -> int:
+    if args.encoding is None:
+        raise SystemExit("sekai-parsers check: pass --encoding (the encoding the export will write)")
+    from .verify import check_entries
+
+    status = 0
+    batch: list[Entry] = []
+    files: dict[str, str] = {}
+    engine: str | None = None
+
+    def flush() -> None:
+        nonlocal status
+        if not batch:
+            return
+        if engine is None:
+            _report_error("<stdin>", "records have no 'engine' (use -e)")
+            status = 1
+        elif not _known_engine(engine):
+            _report_error("<stdin>", f"unknown engine: {engine}")
+            status = 1
+        else:
+            for problem in check_entries(batch, engine, args.encoding):
+                rec = {"file": files[problem.key], "key": problem.key, "chars": "".join(problem.chars)}
+                out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                status = 1
+            out.flush()
+        batch.clear()
+        files.clear()
+
+    for n, line in enumerate(stdin, 1):
+        if not line.strip():
+            continue
+        try:
+            rec = json.loads(line)
+            entry = Entry(key=rec["key"], text=rec["text"])
+            rec_engine = args.engine or rec.get("engine")
+        except (ValueError, KeyError, TypeError):
+            _report_error(f"<stdin>:{n}", "expected a JSON object with 'key' and 'text'")
+            status = 1
+            continue
+        if rec_engine != engine or len(batch) >= _CHECK_BATCH:
+            flush()
+            engine = rec_engine
+        batch.append(entry)
+        files[entry.key] = rec.get("file", "")
+    flush()
+    return status
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(
+        prog="sekai-parsers",
+        description="Parse, export and round-trip visual novel scripts.",
+    )
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    def common(p: argparse.ArgumentParser) -> None:
+        p.add_argument("-e", "--engine", help="engine id (default: detect per file)")
+        p.add_argument("--encoding", help="source encoding (default: detect)")
+        p.add_argument("-j", "--jobs", type=int, default=1, help="parallel worker processes (0 = one per CPU)")
+
+    p_parse = sub.add_parser("parse", help="write entries of PATHS as NDJSON to stdout")
+    p_parse.add_argument("paths", nargs="+", help="files, directories or glob patterns")
+    common(p_parse)
+
+    p_export = sub.add_parser("export", help="apply NDJSON entries from stdin to their source files")
+    where = p_export.add_mutually_exclusive_group()
+    where.add_argument("-o", "--out", help="output directory (mirrors paths relative to --root)")
+    where.add_argument("--in-place", action="store_true", help="overwrite the source files")
+    p_export.add_argument("--root", default=".", help="base directory of the source paths (default: .)")
+    common(p_export)
+
+    p_rt = sub.add_parser("roundtrip", help="check that parse + export reproduces every file")
+    p_rt.add_argument("paths", nargs="+", help="files, directories or glob patterns")
+    common(p_rt)
+
+    p_check = sub.add_parser("check", help="report NDJSON entries from stdin the encoding cannot represent")
+    common(p_check)
+    return ap
+
+
+def _use_utf8(*streams: TextIO) -> None:
+    # NDJSON é sempre UTF-8: com a codificação do locale (cp1252 num pipe do
+    # Windows) texto japonês quebraria o `parse | export` no meio do stream.
+    for stream in streams:
+        reconfigure = getattr(stream, "reconfigure", None)
+        if reconfigure is not None and codecs.lookup(stream.encoding).name != "utf-8":
+            reconfigure(encoding="utf-8")
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    _use_utf8(sys.stdin, sys.stdout)
+    if args.engine is not None and not _known_engine(args.engine):
+        print(f"sekai-parsers: unknown engine: {args.engine}", file=sys.stderr)
+        return 2
+    try:
+        if args.command == "parse":
+            return cmd_parse(args, sys.stdout)
+        if args.command == "export":
+            return cmd_export(args, sys.stdout, sys.stdin)
+        if args.command == "check":
+            return cmd_check(args, sys.stdout, sys.stdin)
+        return cmd_roundtrip(args, sys.stdout)
+    except BrokenPipeError:
+        # Leitor fechou o pipe (ex.: `| head`): sai em silêncio, sem traceback no flush final.
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+
+
+__all__ = ["build_parser", "iter_input_files", "main"]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,468 @@
+from __future__ import annotations
+
+import json
+import struct
+import sys
+from array import array
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from .api import Entry, ParseResult, SpanIndex
+
+# Índice reservado para "campo ausente" nas colunas de meta.
+_ABSENT = 0xFFFFFFFF
+# Colunas só de inteiros (ex.: line_index) guardam o valor direto, sem tabela.
+_INT_ABSENT = -(1 << 63)
+_MISSING = object()
+
+_BLOB_MAGIC = b"SPC1"
+_CONST_VALUES: tuple[Any, ...] = (None, False, True)
+_CONST_TAGS = {None: 0, False: 1, True: 2}
+
+
+def _le_bytes(a: array) -> bytes:
+    # Blobs guardam arrays em little-endian; só hosts big-endian pagam a cópia.
+    if sys.byteorder == "big":
+        a = array(a.typecode, a)
+        a.byteswap()
+    return a.tobytes()
+
+
+def split_key(key: str) -> tuple[str, int]:
+    """Split `"<file_path>:<n>"` into `(file_path, n)`; other keys give `(key, -1)`."""
+    prefix, sep, num = key.rpartition(":")
+    if sep and num.isdigit() and num.isascii() and (num == "0" or num[0] != "0"):
+        return prefix, int(num)
+    return key, -1
+
+
+def join_key(prefix: str, num: int) -> str:
+    return prefix if num < 0 else f"{prefix}:{num}"
+
+
+class _Interner:
+    __slots__ = ("values", "_index")
+
+    def __init__(self, values: list[Any]):
+        self.values = values
+        self._index: dict[tuple[type, Any], int] = {}
+
+    def add(self, value: Any) -> int:
+        # (type, value): 1, True e "1" não podem colidir.
+        try:
+            k = (type(value), value)
+            idx = self._index.get(k)
+            if idx is None:
+                idx = self._index[k] = len(self.values)
+                self.values.append(value)
+            return idx
+        except TypeError:
+            # valor não-hashable (lista, dict...): guarda sem internar
+            self.values.append(value)
+            return len(self.values) - 1
+
+
+def _is_plain_int(value: Any) -> bool:
+    return type(value) is int and _INT_ABSENT < value < (1 << 63)
+
+
+def _to_index_column(col: array, interner: _Interner) -> array:
+    # Apareceu um valor não-inteiro: converte a coluna para índices na tabela.
+    return array("I", (_ABSENT if v == _INT_ABSENT else interner.add(v) for v in col))
+
+
+class ColumnarParseResult:
+    """Array-backed `ParseResult` for large projects.
+
+    Every string (key prefix, text, speaker, meta value) is stored once in a value
+    table; entries are rows of integer indices, one `array` per field. Keys of the
+    form `<file_path>:<n>` are split so the file path is not repeated per entry.
+
+    Indexing or iterating builds `Entry` objects on demand; `entries` and
+    `to_result()` give the regular list-based API.
+    """
+
+    __slots__ = (
+        "engine_id",
+        "_values",
+        "_key_prefix",
+        "_key_num",
+        "_text",
+        "_speaker",
+        "_meta_none",
+        "_meta_fields",
+        "_meta_cols",
+        "_span_start",
+        "_span_end",
+        "_row_by_key",
+        "source_hash",
+    )
+
+    def __init__(self, engine_id: str):
+        self.engine_id = engine_id
+        self._values: list[Any] = []
+        self._key_prefix = array("I")
+        self._key_num = array("q")
+        self._text = array("I")
+        self._speaker = array("I")
+        self._meta_none = bytearray()
+        self._meta_fields: list[str] = []
+        self._meta_cols: list[array] = []
+        self._span_start: array | None = None
+        self._span_end: array | None = None
+        self._row_by_key: dict[str, int] | None = None
+        self.source_hash: str | None = None
+
+    # Building
+    @classmethod
+    def from_entries(
+        cls,
+        engine_id: str,
+        entries: Iterable[Entry],
+        *,
+        spans: SpanIndex | None = None,
+        source_hash: str | None = None,
+    ) -> ColumnarParseResult:
+        """Build from any iterable of entries, e.g. a `parse_stream(...)` generator."""
+        res = cls(engine_id)
+        res.source_hash = source_hash
+        interner = _Interner(res._values)
+        field_pos: dict[str, int] = {}
+        n = 0
+
+        if spans is not None:
+            res._span_start = array("q")
+            res._span_end = array("q")
+
+        for ent in entries:
+            prefix, num = split_key(ent.key)
+            res._key_prefix.append(interner.add(prefix))
+            res._key_num.append(num)
+            res._text.append(interner.add(ent.text))
+            res._speaker.append(interner.add(ent.speaker))
+
+            meta = ent.meta
+            res._meta_none.append(meta is None)
+            if meta:
+                for name, value in meta.items():
+                    if name not in field_pos:
+                        field_pos[name] = len(res._meta_fields)
+                        res._meta_fields.append(name)
+                        if _is_plain_int(value):
+                            res._meta_cols.append(array("q", [_INT_ABSENT]) * n)
+                        else:
+                            res._meta_cols.append(array("I", [_ABSENT]) * n)
+                for j, name in enumerate(res._meta_fields):
+                    col = res._meta_cols[j]
+                    if name not in meta:
+                        col.append(_INT_ABSENT if col.typecode == "q" else _ABSENT)
+                        continue
+                    value = meta[name]
+                    if col.typecode == "q":
+                        if _is_plain_int(value):
+                            col.append(value)
+                            continue
+                        col = res._meta_cols[j] = _to_index_column(col, interner)
+                    col.append(interner.add(value))
+            else:
+                for col in res._meta_cols:
+                    col.append(_INT_ABSENT if col.typecode == "q" else _ABSENT)
+
+            if spans is not None:
+                start, end = spans.get(ent.key, (-1, -1))
+                res._span_start.append(start)
+                res._span_end.append(end)
+            n += 1
+
+        return res
+
+    @classmethod
+    def from_result(cls, result: ParseResult) -> ColumnarParseResult:
+        return cls.from_entries(
+            result.engine_id,
+            result.entries,
+            spans=result.spans,
+            source_hash=result.source_hash,
+        )
+
+    # Access
+    def __len__(self) -> int:
+        return len(self._text)
+
+    def __iter__(self) -> Iterator[Entry]:
+        for i in range(len(self._text)):
+            yield self._entry(i)
+
+    def __getitem__(self, i: int) -> Entry:
+        if i < 0:
+            i += len(self._text)
+        if not 0 <= i < len(self._text):
+            raise IndexError(i)
+        return self._entry(i)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ColumnarParseResult):
+            return NotImplemented
+        return self.to_result() == other.to_result()
+
+    def key(self, i: int) -> str:
+        return join_key(self._values[self._key_prefix[i]], self._key_num[i])
+
+    def text(self, i: int) -> str:
+        return self._values[self._text[i]]
+
+    def speaker(self, i: int) -> str | None:
+        return self._values[self._speaker[i]]
+
+    def meta(self, i: int) -> dict | None:
+        if self._meta_none[i]:
+            return None
+        values = self._values
+        out: dict[str, Any] = {}
+        for name, col in zip(self._meta_fields, self._meta_cols, strict=True):
+            v = col[i]
+            if col.typecode == "q":
+                if v != _INT_ABSENT:
+                    out[name] = v
+            elif v != _ABSENT:
+                out[name] = values[v]
+        return out
+
+    def _entry(self, i: int) -> Entry:
+        return Entry(key=self.key(i), text=self.text(i), speaker=self.speaker(i), meta=self.meta(i))
+
+    def get(self, key: str) -> Entry | None:
+        """Look up an entry by key (the key index is built on first use)."""
+        if self._row_by_key is None:
+            self._row_by_key = {self.key(i): i for i in range(len(self))}
+        i = self._row_by_key.get(key)
+        return None if i is None else self._entry(i)
+
+    def key_prefixes(self) -> list[str]:
+        """Distinct key prefixes (file paths of `<file_path>:<n>` keys), first seen first."""
+        values = self._values
+        return [values[i] for i in dict.fromkeys(self._key_prefix)]
+
+    @property
+    def spans(self) -> SpanIndex | None:
+        if self._span_start is None or self._span_end is None:
+            return None
+        return {
+            self.key(i): (self._span_start[i], self._span_end[i])
+            for i in range(len(self))
+            if self._span_start[i] >= 0
+        }
+
+    # Compatibility layer
+    @property
+    def entries(self) -> list[Entry]:
+        # Coluna a coluna: cada coluna vira uma lista de valores em C e as linhas
+        # são montadas por zip, em vez de resolver campo a campo por entry.
+        n = len(self)
+        values = self._values
+        get = values.__getitem__
+        prefixes = list(map(get, self._key_prefix))
+        keys = [p if k < 0 else f"{p}:{k}" for p, k in zip(prefixes, self._key_num, strict=True)]
+        texts = list(map(get, self._text))
+        speakers = list(map(get, self._speaker))
+
+        names = self._meta_fields
+        cols: list[list] = []
+        complete = True
+        for col in self._meta_cols:
+            if col.typecode == "q":
+                complete = complete and _INT_ABSENT not in col
+                cols.append(col.tolist())
+            else:
+                complete = complete and _ABSENT not in col
+                cols.append([_MISSING if v == _ABSENT else values[v] for v in col])
+
+        if complete:
+            metas = [dict(zip(names, row, strict=True)) for row in zip(*cols, strict=True)] if cols else [{} for _ in range(n)]
+        else:
+            metas = [
+                {name: v for name, v in zip(names, row, strict=True) if v is not _MISSING and v != _INT_ABSENT}
+                for row in zip(*cols, strict=True)
+            ] if cols else [{} for _ in range(n)]
+        for i, is_none in enumerate(self._meta_none):
+            if is_none:
+                metas[i] = None
+
+        return [
+            Entry(key=k, text=t, speaker=sp, meta=m)
+            for k, t, sp, m in zip(keys, texts, speakers, metas, strict=True)
+        ]
+
+    def to_result(self) -> ParseResult:
+        return ParseResult(
+            engine_id=self.engine_id,
+            entries=self.entries,
+            spans=self.spans,
+            source_hash=self.source_hash,
+        )
+
+    def rebase_keys(self, old_prefix: str, new_prefix: str) -> None:
+        """Rewrite keys `<old_prefix>:<n>` to `<new_prefix>:<n>` in place."""
+        if old_prefix == new_prefix or not len(self):
+            return
+        values = self._values
+        new_idx = len(values)
+        values.append(new_prefix)
+        kp = self._key_prefix
+        first = kp[0]
+        if values[first] == old_prefix and kp.count(first) == len(kp):
+            # caso comum: todas as entries vêm do mesmo arquivo
+            self._key_prefix = array("I", [new_idx]) * len(kp)
+        else:
+            self._key_prefix = array(
+                "I",
+                (new_idx if values[p] == old_prefix else p for p in kp),
+            )
+        self._row_by_key = None
+
+    # Binary form (usado pelo cache em disco)
+    def to_bytes(self) -> bytes:
+        """Serialize to a compact binary blob; see `from_bytes`.
+
+        Only None/str/int/bool/float values are supported (`TypeError` otherwise).
+        Arrays are written little-endian, so blobs load on any host.
+        """
+        strs: list[int] = []
+        ints: list[int] = []
+        floats: list[int] = []
+        consts: list[int] = []
+        for i, v in enumerate(self._values):
+            if type(v) is str:
+                strs.append(i)
+            elif _is_plain_int(v):
+                ints.append(i)
+            elif type(v) is float:
+                floats.append(i)
+            elif v is None or type(v) is bool:
+                consts.append(i)
+            else:
+                raise TypeError(f"unsupported value in ColumnarParseResult: {type(v).__name__}")
+
+        # Tabela reordenada por tipo: o load vira split/tolist em C, sem loop por valor.
+        order = strs + ints + floats + consts
+        remap = array("I", bytes(4 * len(order)))
+        for new, old in enumerate(order):
+            remap[old] = new
+
+        def remapped(col: array) -> bytes:
+            if _ABSENT in col:  # coluna de meta com campo ausente em alguma entry
+                return _le_bytes(array("I", (v if v == _ABSENT else remap[v] for v in col)))
+            return _le_bytes(array("I", (remap[v] for v in col)))
+
+        values = self._values
+        str_values = [values[i] for i in strs]
+        nul_joined = not any("\x00" in v for v in str_values)
+        str_lens = array("I") if nul_joined else array("I", map(len, str_values))
+        sep = "\x00" if nul_joined else ""
+
+        has_spans = self._span_start is not None
+        header = {
+            "engine_id": self.engine_id,
+            "byteorder": "little",
+            "meta_fields": self._meta_fields,
+            "meta_types": "".join(c.typecode for c in self._meta_cols),
+            "spans": has_spans,
+            "source_hash": self.source_hash,
+            "n_str": len(strs),
+            "nul_joined": nul_joined,
+        }
+        sections: list[bytes] = [
+            json.dumps(header).encode("utf-8"),
+            _le_bytes(str_lens),
+            sep.join(str_values).encode("utf-8", errors="surrogatepass"),
+            _le_bytes(array("q", (values[i] for i in ints))),
+            _le_bytes(array("d", (values[i] for i in floats))),
+            bytes(_CONST_TAGS[values[i]] for i in consts),
+            remapped(self._key_prefix),
+            _le_bytes(self._key_num),
+            remapped(self._text),
+            remapped(self._speaker),
+            bytes(self._meta_none),
+            *(
+                _le_bytes(c) if c.typecode == "q" else remapped(c)
+                for c in self._meta_cols
+            ),
+        ]
+        if has_spans:
+            sections += [_le_bytes(self._span_start), _le_bytes(self._span_end)]
+
+        out = [_BLOB_MAGIC, struct.pack("<I", len(sections))]
+        out += [struct.pack("<Q", len(sec)) for sec in sections]
+        out += sections
+        return b"".join(out)
+
+    @classmethod
+    def from_bytes(cls, buf: bytes | memoryview) -> ColumnarParseResult:
+        """Load a blob produced by `to_bytes` (accepts a memoryview over an mmap)."""
+        mv = memoryview(buf)
+        if bytes(mv[:4]) != _BLOB_MAGIC:
+            raise ValueError("not a ColumnarParseResult blob")
+        (count,) = struct.unpack_from("<I", mv, 4)
+        lens = struct.unpack_from(f"<{count}Q", mv, 8)
+        pos = 8 + 8 * count
+        sections: list[memoryview] = []
+        for n in lens:
+            sections.append(mv[pos:pos + n])
+            pos += n
+
+        header = json.loads(bytes(sections[0]))
+        # Blobs antigos registram a ordem nativa de quem os escreveu.
+        swap = header["byteorder"] != sys.byteorder
+
+        def arr(code: str, sec: memoryview) -> array:
+            a = array(code)
+            a.frombytes(sec)
+            if swap:
+                a.byteswap()
+            return a
+
+        blob = str(sections[2], "utf-8", errors="surrogatepass")
+        n_str = header["n_str"]
+        if not n_str:
+            values: list[Any] = []
+        elif header["nul_joined"]:
+            values = blob.split("\x00")
+        else:
+            values = []
+            p = 0
+            for n in arr("I", sections[1]):
+                values.append(blob[p:p + n])
+                p += n
+        values += arr("q", sections[3]).tolist()
+        values += arr("d", sections[4]).tolist()
+        values += [_CONST_VALUES[t] for t in bytes(sections[5])]
+
+        res = cls(header["engine_id"])
+        res._values = values
+        res._key_prefix = arr("I", sections[6])
+        res._key_num = arr("q", sections[7])
+        res._text = arr("I", sections[8])
+        res._speaker = arr("I", sections[9])
+        res._meta_none = bytearray(sections[10])
+        res._meta_fields = list(header["meta_fields"])
+        res._meta_cols = [
+            arr(code, sections[11 + j]) for j, code in enumerate(header["meta_types"])
+        ]
+        res.source_hash = header.get("source_hash")
+        if header["spans"]:
+            j = 11 + len(res._meta_cols)
+            res._span_start = arr("q", sections[j])
+            res._span_end = arr("q", sections[j + 1])
+        return res
+
+    def __getstate__(self) -> dict:
+        state = {name: getattr(self, name) for name in self.__slots__}
+        state["_row_by_key"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+__all__ = ["ColumnarParseResult", "split_key", "join_key"]
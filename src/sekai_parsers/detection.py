@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .engine_registry import engines_for_extension, get_engine, list_engines
+from .utils.encoding import detect_encoding
+
+# Bytes lidos de cada arquivo para decidir a engine; nunca o arquivo inteiro.
+DETECT_SAMPLE_SIZE = 8 << 10
+_ENCODINGS = ("utf-8", "cp932")
+
+
+@dataclass(frozen=True, slots=True)
+class Detection:
+    """Best engine for a file.
+
+    - `engine_id` is None when no engine scored above zero.
+    - `confidence` is the winning score (0..1); `scores` has every candidate.
+    - `memoized` is True when the answer came from the per-directory memo.
+    """
+    engine_id: str | None
+    confidence: float
+    scores: dict[str, float] = field(default_factory=dict)
+    memoized: bool = False
+
+
+class Detector:
+    """Scores registered engines on a bounded sample of each file.
+
+    Once a file in a directory is detected with at least `min_confidence` and a
+    clear lead over the runner-up, other files with the same extension in that
+    directory reuse the answer without being read. Use one detector per dump
+    (or call `clear()`) if directories may mix engines.
+    """
+
+    def __init__(
+        self,
+        *,
+        sample_size: int = DETECT_SAMPLE_SIZE,
+        min_confidence: float = 0.6,
+        memoize: bool = True,
+    ):
+        self.sample_size = sample_size
+        self.min_confidence = min_confidence
+        self.memoize = memoize
+        self._memo: dict[tuple[str, str], Detection] = {}
+
+    def clear(self) -> None:
+        self._memo.clear()
+
+    def _sample(self, path: str | os.PathLike, data: bytes | None) -> str:
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read(self.sample_size)
+        head = data[: self.sample_size]
+        enc = detect_encoding(head, _ENCODINGS, fallback="cp932", sample_size=self.sample_size)
+        return head.decode(enc, errors="replace")
+
+    def detect(self, path: str | os.PathLike, data: bytes | None = None) -> Detection:
+        p = Path(path)
+        ext = p.suffix.lower()
+        memo_key = (str(p.parent), ext)
+
+        if self.memoize:
+            hit = self._memo.get(memo_key)
+            if hit is not None:
+                return Detection(hit.engine_id, hit.confidence, hit.scores, memoized=True)
+
+        # Engines da extensão primeiro; sem correspondência, todas concorrem.
+        candidates = engines_for_extension(ext) or list_engines()
+        sample = self._sample(path, data)
+        file_path = p.name
+
+        scores: dict[str, float] = {}
+        for engine_id in candidates:
+            try:
+                score = get_engine(engine_id, shared=True).score(sample, file_path=file_path)
+            except (KeyError, AttributeError):
+                continue  # engine quebrada ou sem score()
+            scores[engine_id] = round(score, 4)
+
+        best_id: str | None = None
+        best = runner_up = 0.0
+        for engine_id, score in scores.items():  # empate: vence a primeira (perfil default)
+            if score > best:
+                best_id, best, runner_up = engine_id, score, best
+            elif score > runner_up:
+                runner_up = score
+
+        result = Detection(best_id, best, scores)
+        if self.memoize and best_id is not None and best >= self.min_confidence and best > runner_up:
+            self._memo[memo_key] = result
+        return result
+
+
+_DEFAULT = Detector()
+
+
+def detect(path: str | os.PathLike, data: bytes | None = None) -> Detection:
+    """Detect the engine/profile of `path` using the shared per-directory memo.
+
+    Only the first `DETECT_SAMPLE_SIZE` bytes of `data` (or of the file, when
+    `data` is None) are inspected.
+    """
+    return _DEFAULT.detect(path, data)
+
+
+__all__ = ["DETECT_SAMPLE_SIZE", "Detection", "Detector", "detect"]
@@ -1,20 +1,30 @@
 from __future__ import annotations
 
-from collections.abc import Callable
-from typing import Dict, Protocol
+# `typing` sozinho custa mais que o resto do import do pacote; só para o type checker.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import Callable
 
+    from .api import Parser
 
-class Parser(Protocol):
-    """
-    Interface mínima esperada pelos engines.
-    Ajuste/expanda depois se você tiver uma classe base real.
-    """
-    def detect(self, file_path: str, data: bytes | None = None) -> bool: ...
-    def extract(self, file_path: str) -> list[dict]: ...
-    def inject(self, file_path: str, entries: list[dict]) -> None: ...
 
+_ENGINE_FACTORIES: dict[str, Callable[[], Parser]] = {}
+# Uma instância por engine_id para get_engine(shared=True). Os parsers não
+# guardam estado entre chamadas, então a mesma instância serve a todas as threads.
+_SHARED: dict[str, Parser] = {}
 
-_ENGINE_FACTORIES: Dict[str, Callable[[], Parser]] = {}
+# engine_id -> (módulo que registra a engine via register_engine(...), extensões).
+# O módulo só é importado no primeiro get_engine(engine_id), então
+# `import sekai_parsers` não paga pelos parsers/regexes de engines não usadas.
+ENGINE_MANIFEST: dict[str, tuple[str, tuple[str, ...]]] = {
+    "kirikiri.ks": ("sekai_parsers.engines.kirikiri", (".ks",)),
+    "kirikiri.ks.yandere": ("sekai_parsers.engines.kirikiri", (".ks",)),
+    "musica.sc": ("sekai_parsers.engines.musica", (".sc",)),
+    "musica.sc.ef": ("sekai_parsers.engines.musica", (".sc",)),
+    "musica.sc.eden": ("sekai_parsers.engines.musica", (".sc",)),
+}
+
+_LOAD_ERRORS: list[tuple[str, str]] = []  # (module_name, error_str)
 
 
 def register_engine(engine_id: str, factory: Callable[[], Parser]) -> None:
@@ -23,13 +33,60 @@ def register_engine(engine_id: str, factory: Callable[[], Parser]) -> None:
     `engine_id` must be stable, e.g. `kirikiri.ks`.
     """
     _ENGINE_FACTORIES[engine_id] = factory
+    _SHARED.pop(engine_id, None)
+
 
+def load_engine_module(module_name: str) -> bool:
+    """Import an engine module so it registers its engines; False if it failed.
 
-def get_engine(engine_id: str) -> Parser:
-    if engine_id not in _ENGINE_FACTORIES:
-        raise KeyError(f"Unknown engine_id: {engine_id}")
-    return _ENGINE_FACTORIES[engine_id]()
+    A broken engine never breaks the package: the error is recorded and exposed
+    through `sekai_parsers.discovery_errors()`.
+    """
+    import importlib
+
+    try:
+        importlib.import_module(module_name)
+    except Exception as e:
+        err = (module_name, repr(e))
+        if err not in _LOAD_ERRORS:
+            _LOAD_ERRORS.append(err)
+        return False
+    return True
+
+
+def get_engine(engine_id: str, *, shared: bool = False) -> Parser:
+    """Build the parser for `engine_id`.
+
+    With `shared=True` the first instance is cached and returned on every later
+    call, so profile-derived tables are built once per process.
+    """
+    if shared:
+        parser = _SHARED.get(engine_id)
+        if parser is None:
+            # Corrida entre threads só cria uma instância a mais; setdefault fica com uma.
+            parser = _SHARED.setdefault(engine_id, get_engine(engine_id))
+        return parser
+
+    factory = _ENGINE_FACTORIES.get(engine_id)
+    if factory is None:
+        spec = ENGINE_MANIFEST.get(engine_id)
+        if spec is not None and load_engine_module(spec[0]):
+            factory = _ENGINE_FACTORIES.get(engine_id)
+        if factory is None:
+            raise KeyError(f"Unknown engine_id: {engine_id}")
+    return factory()
+
+
+def clear_shared_engines() -> None:
+    """Drop the instances cached by `get_engine(shared=True)`."""
+    _SHARED.clear()
 
 
 def list_engines() -> list[str]:
-    return sorted(_ENGINE_FACTORIES.keys())
\ No newline at end of file
+    return sorted(_ENGINE_FACTORIES.keys() | ENGINE_MANIFEST.keys())
+
+
+def engines_for_extension(ext: str) -> list[str]:
+    """Manifest engines declaring `ext` (e.g. `.ks`), without importing them."""
+    ext = ext.lower()
+    return sorted(eid for eid, (_mod, exts) in ENGINE_MANIFEST.items() if ext in exts)
@@ -1 +1 @@
-# pacote marcador; discovery é feito por pkgutil no sekai_parsers/__init__.py
+# pacote marcador; as engines são carregadas sob demanda via engine_registry.ENGINE_MANIFEST
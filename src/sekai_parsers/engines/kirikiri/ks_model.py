@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
+from ...api import ParseResult
+
 
 @dataclass(slots=True)
 class TextSpan:
@@ -10,3 +12,15 @@ class TextSpan:
     start: int
     end: int
     speaker: str | None
+
+
+def text_spans(result: ParseResult) -> list[TextSpan]:
+    """Expand the compact `result.spans` index into `TextSpan`s, in file order."""
+    if not result.spans:
+        return []
+    out: list[TextSpan] = []
+    for ent in result.entries:
+        span = result.spans.get(ent.key)
+        if span is not None:
+            out.append(TextSpan(key=ent.key, start=span[0], end=span[1], speaker=ent.speaker))
+    return out
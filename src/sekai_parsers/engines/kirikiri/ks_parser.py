@@ -1,19 +1,38 @@
 from __future__ import annotations
 
 import re
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Iterator, Mapping
 from dataclasses import dataclass
-
-from ...api import Entry, ParseResult
+from functools import cache
+from typing import BinaryIO
+
+from ... import instrument
+from ...api import ByteSpans, Entry, ParseResult, SpanIndex
+from ...utils.encoding import decode_bytes, detect_encoding, sniff_stream
+from ...utils.regex import LazyPattern, lazy_compile
+from ...utils.stream import iter_decoded_lines, make_line_writer
+from ...utils.text import (
+    byte_spans_for,
+    common_line_affixes,
+    content_hash,
+    entry_line_indices,
+    shift_entries,
+    splice_bytes,
+    splice_spans,
+)
 
 
 # Profile
 @dataclass(frozen=True, slots=True)
 class KiriKiriProfile:
     id: str
-    speaker_tag: re.Pattern
-    rx_comment: re.Pattern
-    rx_label: re.Pattern
-    rx_tag_only: re.Pattern
+    speaker_tag: re.Pattern | LazyPattern
+    rx_comment: re.Pattern | LazyPattern
+    rx_label: re.Pattern | LazyPattern
+    rx_tag_only: re.Pattern | LazyPattern
+    # Substrings (lowercase) typical of this dialect; used only by detection.
+    detect_hints: tuple[str, ...] = ()
 
 
 DEFAULT_PROFILE = KiriKiriProfile(
@@ -22,36 +41,162 @@ DEFAULT_PROFILE = KiriKiriProfile(
     # - Standard KAG: [cn name="Name"]
     # - Yandere dialect: [P_NAME s_cn="Name"]
     # Keep it anchored to full tag lines to avoid false positives.
-    speaker_tag=re.compile(
+    speaker_tag=lazy_compile(
         r'^(?:\[cn\s+name="([^"]+)"(?:[^\]]*)\]\s*$|'
         r'\[P_NAME\b[^\]]*\bs_cn="([^"]+)"[^\]]*\]\s*$)',
         re.IGNORECASE,
     ),
-    rx_comment=re.compile(r"^\s*;"),
-    rx_label=re.compile(r"^\s*\*"),
-    rx_tag_only=re.compile(r"^\s*(?:\[[^\]]+\]\s*)+$"),
+    rx_comment=lazy_compile(r"^\s*;"),
+    rx_label=lazy_compile(r"^\s*\*"),
+    rx_tag_only=lazy_compile(r"^\s*(?:\[[^\]]+\]\s*)+$"),
+    detect_hints=("[cn name=",),
 )
 
 
 # KiriKiri control suffixes often found at end of dialogue lines.
 # Examples: "Hello.[r]", "Hello?[cr]", "Line[r][cr]".
-_RX_TRAILING_CONTROLS = re.compile(r"(?:\[(?:cr|r)\])+$", re.IGNORECASE)
+_RX_TRAILING_CONTROLS = lazy_compile(r"(?:\[(?:cr|r)\])+$", re.IGNORECASE)
+
+
+# Line classifier
+# classify(stripped) -> None (texto), False (comentário/label/tag) ou o speaker (str,
+# possivelmente "") quando a linha é uma tag de speaker.
+LineClassifier = Callable[[str], "str | bool | None"]
+
+_RX_BACKREF = re.compile(r"\\[1-9]")
+_SCOPED_FLAGS = ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x"), (re.ASCII, "a"))
+
+
+def _scoped(rx: re.Pattern) -> str | None:
+    """`rx` as a group with scoped inline flags, or None if it can't be embedded."""
+    flags = rx.flags & ~re.UNICODE
+    letters = ""
+    for flag, letter in _SCOPED_FLAGS:
+        if flags & flag:
+            letters += letter
+            flags &= ~flag
+    src = rx.pattern
+    if flags or rx.groupindex or _RX_BACKREF.search(src):
+        return None  # flags sem forma inline, grupos nomeados ou backrefs numéricas
+    if src.startswith("(?") and not src.startswith(("(?:", "(?P<", "(?=", "(?!", "(?<")):
+        return None  # flags globais no início do fonte
+    return f"(?{letters}:{src})" if letters else f"(?:{src})"
+
+
+def _anchored(rx: re.Pattern) -> bool:
+    """True if `rx` can only match at the start, so `search()` == `match()`."""
+    src = rx.pattern
+    if not src.startswith(("^", "\\A")) or rx.flags & (re.MULTILINE | re.VERBOSE):
+        return False
+    # Um "|" no nível zero deixaria a alternativa seguinte sem âncora.
+    depth = 0
+    in_class = False
+    i = 0
+    while i < len(src):
+        c = src[i]
+        if c == "\\":
+            i += 2
+            continue
+        if in_class:
+            in_class = c != "]"
+        elif c == "[":
+            in_class = True
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "|" and depth == 0:
+            return False
+        i += 1
+    return True
+
+
+def _speaker_groups(m: re.Match, g1: int, n_groups: int) -> str:
+    if n_groups == 0:
+        return ""
+    sp = m.group(g1) or ""
+    if not sp and n_groups >= 2:
+        sp = m.group(g1 + 1) or ""
+    return sp
+
+
+def _sequential_classifier(profile: KiriKiriProfile) -> LineClassifier:
+    is_comment, is_label = profile.rx_comment.match, profile.rx_label.match
+    find_speaker, is_tag_only = profile.speaker_tag.search, profile.rx_tag_only.match
+    n_groups = profile.speaker_tag.groups
+
+    def classify(stripped: str) -> str | bool | None:
+        if is_comment(stripped) or is_label(stripped):
+            return False
+        # Speaker tags may appear inside a tag line; use search() for robustness.
+        m_speaker = find_speaker(stripped)
+        if m_speaker:
+            return _speaker_groups(m_speaker, 1, n_groups)
+        if is_tag_only(stripped):
+            return False
+        return None
+
+    return classify
+
+
+@cache
+def line_classifier(profile: KiriKiriProfile) -> LineClassifier:
+    """One-scan classifier for `profile`.
+
+    The four profile regexes are joined into one alternation in the order the
+    checks always ran (comment, label, speaker, tag-only), so the first branch
+    that matches decides the kind, exactly like the sequential checks.
+    `speaker_tag` is used with `search()`, so unless it is anchored its branch
+    gets a lazy `.*?` prefix. Profiles whose patterns can't be embedded (global
+    inline flags, named groups, backrefs) fall back to the sequential checks.
+    """
+    speaker = profile.speaker_tag
+    parts = {
+        "comment": _scoped(profile.rx_comment),
+        "label": _scoped(profile.rx_label),
+        "speaker": _scoped(speaker),
+        "tag": _scoped(profile.rx_tag_only),
+    }
+    if None in parts.values():
+        return _sequential_classifier(profile)
+    if not _anchored(speaker):
+        parts["speaker"] = f"(?s:.*?){parts['speaker']}"
+    try:
+        combined = re.compile("|".join(f"(?P<{name}>{src})" for name, src in parts.items()))
+    except re.error:
+        return _sequential_classifier(profile)
+
+    match = combined.match
+    g1 = combined.groupindex["speaker"] + 1
+    n_groups = speaker.groups
+
+    def classify(stripped: str) -> str | bool | None:
+        m = match(stripped)
+        if m is None:
+            return None
+        if m.lastgroup != "speaker":
+            return False
+        return _speaker_groups(m, g1, n_groups)
+
+    return classify
+
 
 
 # Helpers (encoding + EOL)
+_ENCODINGS = ("utf-8", "cp932")
+
+
 def _detect_encoding(data: bytes) -> str:
-    try:
-        data.decode("utf-8")
-        return "utf-8"
-    except UnicodeDecodeError:
-        return "cp932"
+    return detect_encoding(data, _ENCODINGS, fallback="cp932")
 
 
-def _decode_text(data: bytes) -> tuple[str, str]:
-    enc = _detect_encoding(data)
-    return data.decode(enc, errors="replace"), enc
+@instrument.hot("decode", nbytes_arg=0)
+def _decode_text(data: bytes, encoding: str | None = None) -> tuple[str, str]:
+    decoded = decode_bytes(data, _ENCODINGS, fallback="cp932", encoding=encoding)
+    return decoded.text, decoded.encoding
 
 
+@instrument.hot("encode", nbytes_arg=0)
 def _encode_text(text: str, enc: str) -> bytes:
     return text.encode(enc, errors="replace")
 
@@ -79,151 +224,381 @@ class KiriKiriKsParser:
     def __init__(self, profile: KiriKiriProfile = DEFAULT_PROFILE):
         self.profile = profile
         self.engine_id = f"kirikiri.ks.{profile.id}"
+        self._classify = line_classifier(profile)
 
     def can_parse(self, *, file_path: str | None = None, data: bytes | None = None) -> bool:
         return (file_path or "").lower().endswith(".ks")
 
-    # Parse
-    def parse(self, data: bytes, *, file_path: str | None = None) -> ParseResult:
-        text, _enc = _decode_text(data)
+    def score(self, sample: str, *, file_path: str | None = None) -> float:
+        """How likely (0..1) a decoded head of a file is a script for this profile.
 
-        entries: list[Entry] = []
-        state = _ParseState()
-        key_idx = 0
+        Extension (0.5), share of KAG tag/label/comment lines (0.3) and profile
+        hints such as `[cn name=` vs `s_cn=` (0.2).
+        """
+        score = 0.5 if self.can_parse(file_path=file_path) else 0.0
 
-        lines = text.splitlines(keepends=True)
+        lines = [ln.lstrip() for ln in sample.splitlines() if ln.strip()]
+        if lines:
+            kag = sum(1 for ln in lines if ln[0] in "[@*;" and ".message" not in ln)
+            score += 0.3 * min(1.0, 2 * kag / len(lines))
 
-        for line in lines:
+        if self.profile.detect_hints:
+            low = sample.lower()
+            hits = sum(low.count(h) for h in self.profile.detect_hints)
+            score += 0.2 * min(1.0, hits / 4)
+        return score
+
+    # Parse
+    def parse(
+        self,
+        data: bytes,
+        *,
+        file_path: str | None = None,
+        encoding: str | None = None,
+        with_spans: bool = False,
+    ) -> ParseResult:
+        with instrument.stage("parse", len(data)):
+            text, enc = _decode_text(data, encoding)
+            with instrument.stage("splitlines"):
+                lines = text.splitlines(keepends=True)
+            spans: SpanIndex | None = {} if with_spans else None
+            with instrument.stage("classify"):
+                entries = list(self._iter_entries(lines, file_path=file_path, spans=spans))
+            byte_spans = byte_spans_for(data, text, lines, spans, enc) if spans is not None else None
+        return ParseResult(
+            engine_id=self.engine_id,
+            entries=entries,
+            spans=spans,
+            byte_spans=byte_spans,
+            source_hash=content_hash(data) if spans is not None else None,
+        )
+
+    def parse_stream(
+        self,
+        fp: BinaryIO,
+        *,
+        file_path: str | None = None,
+        encoding: str | None = None,
+    ) -> Iterator[Entry]:
+        """Yield entries from a binary file object without loading the whole file."""
+        enc, head = sniff_stream(fp, _ENCODINGS, fallback="cp932", encoding=encoding)
+        yield from self._iter_entries(iter_decoded_lines(fp, enc, head=head), file_path=file_path)
+
+    def parse_incremental(
+        self,
+        old_result: ParseResult,
+        old_data: bytes,
+        new_data: bytes,
+        *,
+        file_path: str | None = None,
+        encoding: str | None = None,
+    ) -> ParseResult:
+        """Re-parse `new_data` reusing `old_result` (the parse of `old_data`).
+
+        Only the lines between the common head and tail of both versions are
+        re-classified. If that region changes the current speaker, classification
+        continues until the next speaker tag, where both versions agree again.
+        The result is identical to `parse(new_data)`.
+        """
+        old_text, _ = _decode_text(old_data, encoding)
+        new_text, new_enc = _decode_text(new_data, encoding)
+        old_lines = old_text.splitlines(keepends=True)
+        new_lines = new_text.splitlines(keepends=True)
+        with_spans = old_result.spans is not None
+
+        old_lidx = entry_line_indices(old_result.entries)
+        if old_lidx is None:
+            return self.parse(new_data, file_path=file_path, encoding=encoding, with_spans=with_spans)
+
+        head, tail = common_line_affixes(old_lines, new_lines)
+        old_tail_start = len(old_lines) - tail
+        new_tail_start = len(new_lines) - tail
+
+        n_head = bisect_left(old_lidx, head)
+        state = _ParseState(speaker=self._speaker_before(new_lines, head))
+        spans: SpanIndex | None = {} if with_spans else None
+        pos = sum(map(len, new_lines[:head]))
+
+        mid = list(
+            self._iter_entries(
+                new_lines[head:new_tail_start],
+                file_path=file_path,
+                spans=spans,
+                state=state,
+                line_offset=head,
+                key_offset=n_head,
+                pos_offset=pos,
+            )
+        )
+
+        if state.speaker != self._speaker_before(old_lines, old_tail_start):
+            # O speaker mudou na fronteira: segue até a próxima tag de speaker.
+            stop = new_tail_start
+            while stop < len(new_lines) and self._speaker_of(new_lines[stop]) is None:
+                stop += 1
+            mid += self._iter_entries(
+                new_lines[new_tail_start:stop],
+                file_path=file_path,
+                spans=spans,
+                state=state,
+                line_offset=new_tail_start,
+                key_offset=n_head + len(mid),
+                pos_offset=pos + sum(map(len, new_lines[head:new_tail_start])),
+            )
+            old_tail_start += stop - new_tail_start
+            new_tail_start = stop
+
+        n_tail_start = bisect_left(old_lidx, old_tail_start)
+        reused_tail = shift_entries(
+            old_result.entries[n_tail_start:],
+            file_path=file_path,
+            key_offset=n_head + len(mid) - n_tail_start,
+            line_offset=new_tail_start - old_tail_start,
+        )
+        reused_head = shift_entries(
+            old_result.entries[:n_head],
+            file_path=file_path,
+            key_offset=0,
+            line_offset=0,
+        )
+        entries = reused_head + mid + reused_tail
+
+        if spans is not None:
+            assert old_result.spans is not None
+            char_delta = len(new_text) - len(old_text)
+            head_spans = {
+                new.key: old_result.spans[old.key]
+                for old, new in zip(old_result.entries[:n_head], reused_head, strict=True)
+            }
+            for old, new in zip(old_result.entries[n_tail_start:], reused_tail, strict=True):
+                start, end = old_result.spans[old.key]
+                spans[new.key] = (start + char_delta, end + char_delta)
+            spans = {**head_spans, **spans}
+            byte_spans = byte_spans_for(new_data, new_text, new_lines, spans, new_enc)
+        else:
+            byte_spans = None
+
+        return ParseResult(
+            engine_id=self.engine_id,
+            entries=entries,
+            spans=spans,
+            byte_spans=byte_spans,
+            source_hash=content_hash(new_data) if spans is not None else None,
+        )
+
+    def _speaker_of(self, line: str) -> str | None:
+        """Speaker set by `line` if it is a speaker tag line, else None."""
+        stripped = line.strip()
+        if not stripped:
+            return None
+        sp = self._classify(stripped)
+        return sp or None if isinstance(sp, str) else None
+
+    def _speaker_before(self, lines: list[str], end: int) -> str | None:
+        """Speaker in effect right before `lines[end]` (scans backwards)."""
+        for i in range(end - 1, -1, -1):
+            sp = self._speaker_of(lines[i])
+            if sp is not None:
+                return sp
+        return None
+
+    def _iter_entries(
+        self,
+        lines: Iterable[str],
+        *,
+        file_path: str | None,
+        spans: SpanIndex | None = None,
+        state: _ParseState | None = None,
+        line_offset: int = 0,
+        key_offset: int = 0,
+        pos_offset: int = 0,
+    ) -> Iterator[Entry]:
+        # Os offsets permitem reclassificar só um trecho do arquivo (parse_incremental).
+        if state is None:
+            state = _ParseState()
+        key_idx = key_offset
+        pos = pos_offset
+        key_prefix = f"{file_path or 'file'}:"
+        classify = self._classify
+
+        for i, line in enumerate(lines, line_offset):
+            start = pos
+            pos += len(line)
             stripped = line.strip()
 
             if not stripped:
                 continue
 
-            if self.profile.rx_comment.match(stripped):
-                continue
-
-            if self.profile.rx_label.match(stripped):
-                continue
-
-            # Speaker tags may appear inside a tag line; use search() for robustness.
-            m_speaker = self.profile.speaker_tag.search(stripped)
-            if m_speaker:
-                # Support profiles/patterns with multiple capture groups.
-                sp = ""
-                try:
-                    sp = (m_speaker.group(1) or "")
-                    if not sp and m_speaker.lastindex and m_speaker.lastindex >= 2:
-                        sp = (m_speaker.group(2) or "")
-                except Exception:
-                    sp = ""
-                state.speaker = sp or state.speaker
+            sp = classify(stripped)
+            if sp is not None:
+                if sp is not False:
+                    state.speaker = sp or state.speaker
                 continue
 
-            if self.profile.rx_tag_only.match(stripped):
-                continue
-
-            key = f"{file_path or 'file'}:{key_idx}"
+            key = f"{key_prefix}{key_idx}"
             key_idx += 1
 
             # Strip trailing KiriKiri control tags like [r]/[cr] from the stored entry text,
             # but keep them in meta so export can restore them deterministically.
             eol = _line_eol(line)
             body = line[:-len(eol)] if eol else line
-            m_tail = _RX_TRAILING_CONTROLS.search(body)
+            # O regex exige que a linha termine em "]"; evita a busca nas outras.
+            m_tail = _RX_TRAILING_CONTROLS.search(body) if body.endswith("]") else None
             tail = m_tail.group(0) if m_tail else ""
             body_wo_tail = body[: -len(tail)] if tail else body
 
+            if spans is not None:
+                spans[key] = (start, pos)
+
             # Entry.text mantém a linha original
-            entries.append(
-                Entry(
-                    key=key,
-                    text=body_wo_tail + eol,
-                    speaker=state.speaker,
-                    meta={"kk_tail": tail},
-                )
+            yield Entry(
+                key=key,
+                text=body_wo_tail + eol,
+                speaker=state.speaker,
+                meta={"kk_tail": tail, "line_index": i},
             )
 
-        return ParseResult(engine_id=self.engine_id, entries=entries)
-
     # Export
-    def export(self, data: bytes, entries: list[Entry], *, file_path: str | None = None) -> bytes:
-        original_text, enc = _decode_text(data)
-        lines = original_text.splitlines(keepends=True)
-
-        by_key: dict[str, Entry] = {e.key: e for e in entries if getattr(e, "key", None)}
-
-        out_lines: list[str] = []
+    def export(
+        self,
+        data: bytes,
+        entries: list[Entry],
+        *,
+        file_path: str | None = None,
+        encoding: str | None = None,
+        spans: SpanIndex | None = None,
+        byte_spans: ByteSpans | None = None,
+        strict: bool = False,
+    ) -> bytes:
+        """Rebuild `data` with the text of `entries` (matched by key).
+
+        With `strict=True` the result is parsed back and `RoundTripError` is
+        raised unless every entry reads back unchanged (see `verify.check_export`).
+        """
+        out = self._export(data, entries, file_path=file_path, encoding=encoding, spans=spans, byte_spans=byte_spans)
+        if strict:
+            from ...verify import check_export
+
+            check_export(self, data, out, entries, file_path=file_path, encoding=encoding)
+        return out
+
+    def _export(
+        self,
+        data: bytes,
+        entries: list[Entry],
+        *,
+        file_path: str | None,
+        encoding: str | None,
+        spans: SpanIndex | None,
+        byte_spans: ByteSpans | None,
+    ) -> bytes:
+        if byte_spans is not None:
+            with instrument.stage("export", len(data)):
+                return b"".join(self.export_chunks(data, entries, byte_spans))
+
+        with instrument.stage("export", len(data)):
+            original_text, enc = _decode_text(data, encoding)
+            by_key: dict[str, Entry] = {e.key: e for e in entries if getattr(e, "key", None)}
+
+            if spans is not None:
+                # Caminho rápido: só as linhas das entries são tocadas.
+                out_text = splice_spans(original_text, by_key, spans, self._replace_line)
+                return _encode_text(out_text, enc)
+
+            with instrument.stage("splitlines"):
+                lines = original_text.splitlines(keepends=True)
+            with instrument.stage("render"):
+                out_text = "".join(self._iter_export(lines, by_key, file_path=file_path))
+
+            return _encode_text(out_text, enc)
+
+    def export_chunks(
+        self,
+        data: bytes,
+        entries: list[Entry],
+        byte_spans: ByteSpans,
+    ) -> list[bytes | memoryview]:
+        """Export as buffers: `memoryview` slices of `data` plus the encoded new lines.
+
+        `byte_spans` must come from `parse(data, with_spans=True)`. The file is
+        never decoded; write the chunks with `utils.fs.atomic_write_chunks`.
+        """
+        by_key = {e.key: e for e in entries if getattr(e, "key", None)}
+        return splice_bytes(data, by_key, byte_spans, self._replace_line)
+
+    def export_stream(
+        self,
+        src_fp: BinaryIO,
+        dst_fp: BinaryIO,
+        entries_lookup: Mapping[str, Entry],
+        *,
+        file_path: str | None = None,
+        encoding: str | None = None,
+    ) -> None:
+        """Stream `src_fp` into `dst_fp`, replacing lines found in `entries_lookup` (by key)."""
+        enc, head = sniff_stream(src_fp, _ENCODINGS, fallback="cp932", encoding=encoding)
+        write = make_line_writer(dst_fp, enc)
+        lines = iter_decoded_lines(src_fp, enc, head=head)
+        for out_line in self._iter_export(lines, entries_lookup, file_path=file_path):
+            write(out_line)
+
+    def _iter_export(
+        self,
+        lines: Iterable[str],
+        by_key: Mapping[str, Entry],
+        *,
+        file_path: str | None,
+    ) -> Iterator[str]:
         key_idx = 0
-        state = _ParseState()
+        key_prefix = f"{file_path or 'file'}:"
+        classify = self._classify
 
         for line in lines:
             stripped = line.strip()
 
-            if not stripped:
-                out_lines.append(line)
-                continue
-
-            if self.profile.rx_comment.match(stripped):
-                out_lines.append(line)
-                continue
-
-            if self.profile.rx_label.match(stripped):
-                out_lines.append(line)
+            # Export só precisa saber se a linha é texto; o speaker não importa aqui.
+            if not stripped or classify(stripped) is not None:
+                yield line
                 continue
 
-            m_speaker = self.profile.speaker_tag.search(stripped)
-            if m_speaker:
-                sp = ""
-                try:
-                    sp = (m_speaker.group(1) or "")
-                    if not sp and m_speaker.lastindex and m_speaker.lastindex >= 2:
-                        sp = (m_speaker.group(2) or "")
-                except Exception:
-                    sp = ""
-                state.speaker = sp or state.speaker
-                out_lines.append(line)
-                continue
-
-            if self.profile.rx_tag_only.match(stripped):
-                out_lines.append(line)
-                continue
-
-            key = f"{file_path or 'file'}:{key_idx}"
+            key = f"{key_prefix}{key_idx}"
             key_idx += 1
 
             ent = by_key.get(key)
             if ent is None:
-                out_lines.append(line)
+                yield line
                 continue
 
-            repl = ent.text
+            yield self._replace_line(line, ent)
+
+    def _replace_line(self, line: str, ent: Entry) -> str:
+        repl = ent.text
 
-            # Restore trailing KiriKiri control tags that were stripped on parse.
+        # Restore trailing KiriKiri control tags that were stripped on parse.
+        tail = ""
+        try:
+            tail = (ent.meta or {}).get("kk_tail") or ""
+        except Exception:
             tail = ""
-            try:
-                tail = (ent.meta or {}).get("kk_tail") or ""
-            except Exception:
-                tail = ""
 
-            eol = _line_eol(line)
-            # Normalize replacement to have the original EOL.
-            if eol:
-                # separate any existing eol
-                repl_body = repl
-                repl_eol = _line_eol(repl_body)
-                if repl_eol:
-                    repl_body = repl_body[:-len(repl_eol)]
-
-                # avoid duplicating tail if user kept it
-                if tail and not repl_body.endswith(tail):
-                    repl_body = repl_body + tail
-
-                repl = repl_body + eol
-            else:
-                # no original eol; still restore tail if needed
-                if tail and not repl.endswith(tail):
-                    repl = repl + tail
-
-            out_lines.append(repl)
-
-        return _encode_text("".join(out_lines), enc)
+        eol = _line_eol(line)
+        # Normalize replacement to have the original EOL.
+        if eol:
+            # separate any existing eol
+            repl_body = repl
+            repl_eol = _line_eol(repl_body)
+            if repl_eol:
+                repl_body = repl_body[:-len(repl_eol)]
+
+            # avoid duplicating tail if user kept it
+            if tail and not repl_body.endswith(tail):
+                repl_body = repl_body + tail
+
+            repl = repl_body + eol
+        else:
+            # no original eol; still restore tail if needed
+            if tail and not repl.endswith(tail):
+                repl = repl + tail
+
+        return repl
+
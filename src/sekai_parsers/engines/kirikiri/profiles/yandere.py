@@ -1,11 +1,13 @@
 from __future__ import annotations
 import re
+from ....utils.regex import lazy_compile
 from ..ks_parser import KiriKiriProfile
 
 YANDERE_PROFILE = KiriKiriProfile(
     id="yandere",
-    speaker_tag=re.compile(r'^\[P_NAME\b[^\]]*\bs_cn="([^"]+)"[^\]]*\]\s*$', re.IGNORECASE),
-    rx_comment=re.compile(r'^\s*;'),
-    rx_label=re.compile(r'^\s*\*'),
-    rx_tag_only=re.compile(r'^\s*(?:\[[^\]]+\]\s*)+$'),
+    speaker_tag=lazy_compile(r'^\[P_NAME\b[^\]]*\bs_cn="([^"]+)"[^\]]*\]\s*$', re.IGNORECASE),
+    rx_comment=lazy_compile(r'^\s*;'),
+    rx_label=lazy_compile(r'^\s*\*'),
+    rx_tag_only=lazy_compile(r'^\s*(?:\[[^\]]+\]\s*)+$'),
+    detect_hints=("[p_name", "s_cn="),
 )
\ No newline at end of file
@@ -7,4 +7,5 @@ EDEN_PROFILE = MusicaProfile(
     dialog_pairs=(
         ("“", "”"),
     ),
+    detect_hints=("“",),
 )
\ No newline at end of file
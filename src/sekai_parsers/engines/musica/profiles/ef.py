@@ -7,4 +7,5 @@ EF_PROFILE = MusicaProfile(
     dialog_pairs=(
         ("“", "”"),
     ),
+    detect_hints=("\x81",),
 )
\ No newline at end of file
@@ -1,11 +1,27 @@
 from __future__ import annotations
 
+import codecs
 import re
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Iterator, Mapping
 from dataclasses import dataclass
-from typing import Dict, Tuple
-
-from ...api import Entry, ParseResult
-
+from functools import cache, partial
+from typing import BinaryIO, Dict, Tuple
+
+from ... import instrument
+from ...api import ByteSpans, Entry, ParseResult, SpanIndex
+from ...utils.encoding import decode_bytes, detect_encoding, sniff_stream
+from ...utils.regex import lazy_compile
+from ...utils.stream import iter_decoded_lines, make_line_writer
+from ...utils.text import (
+    byte_spans_for,
+    common_line_affixes,
+    content_hash,
+    entry_line_indices,
+    shift_entries,
+    splice_bytes,
+    splice_spans,
+)
 
 MAP_ENCODE: Dict[str, str] = {
     "Á": "ﾁ",
@@ -25,31 +41,47 @@ MAP_ENCODE: Dict[str, str] = {
 }
 MAP_DECODE: Dict[str, str] = {v: k for k, v in MAP_ENCODE.items()}
 
-_RX_MESSAGE = re.compile(
+_RX_MESSAGE = lazy_compile(
     r"^(\s*)"
     r"(?:(\[[^\]]+\]\.)\s*)?"
     r"\.message(\s+)(\d+)(\s+)(.*?)(\r?\n)?$"
 )
 
-_RE_WS_LEAD = re.compile(r"^\s*")
-_RE_WS_TAIL = re.compile(r"\s*$")
-_RX_SUFFIX = re.compile(
-    r"(?s)^(.*?)(\\(?:[A-Za-z]+[0-9]*))(\\(?:[A-Za-z]+[0-9]*))*?(\s*)$"
-)
-_RX_CONTROL_ONLY = re.compile(r"^\s*(?:\\[A-Za-z]+[0-9]*)+\s*$")
+_RE_WS_LEAD = lazy_compile(r"^\s*")
+_RE_WS_TAIL = lazy_compile(r"\s*$")
+# Tokenizer do resto de `.message`: classes disjuntas, sem backtracking quadrático.
+_RX_TOKEN_WS = lazy_compile(r"(\S+)(\s+)")
+_RX_ASCII_WORD = lazy_compile(r"[A-Za-z0-9_]+")
+_DIALOG_OPENERS = ("\x81", '"', "“", "「", "『")
+_DIGITS = "0123456789"
+_RX_CONTROL_ONLY = lazy_compile(r"^\s*(?:\\[A-Za-z]+[0-9]*)+\s*$")
 
-_RX_EF_WRAPPER = re.compile(r"^\x81(.)((?:.|\n|\r)*)\x81(.)$", re.DOTALL)
+# Separadores que só str.splitlines reconhece; com eles, a contagem de linhas do
+# pré-filtro (\n, \r, \r\n) divergiria das keys do parse completo.
+_EXOTIC_EOL = ("\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029")
+_EXOTIC_EOL_BYTES = (b"\x0b", b"\x0c", b"\x1c", b"\x1d", b"\x1e", b"\xc2\x85", b"\xe2\x80\xa8", b"\xe2\x80\xa9")
+# Codecs em que b".message", b"\n" e b"\r" nunca aparecem dentro de um caractere
+# multibyte (no cp932 o segundo byte é >= 0x40), então a busca nos bytes é exata.
+_BYTE_SCAN_CODECS = frozenset({"ascii", "utf-8", "cp932", "shift_jis"})
+
+_RX_EF_WRAPPER = lazy_compile(r"^\x81(.)((?:.|\n|\r)*)\x81(.)$", re.DOTALL)
 
 
 @dataclass(frozen=True, slots=True)
 class MusicaProfile:
     id: str
     dialog_pairs: tuple[tuple[str, str], ...] = ()
+    # (caractere do editor, caractere no script) usados pela tradução para
+    # representar letras que a fonte do jogo não tem. Padrão: tabela PT-BR.
+    char_map: tuple[tuple[str, str], ...] = tuple(MAP_ENCODE.items())
+    # Substrings typical of this game's scripts; used only by detection.
+    detect_hints: tuple[str, ...] = ()
 
 
 DEFAULT_PROFILE = MusicaProfile(
     id="default",
     dialog_pairs=(),
+    detect_hints=("「", "『"),
 )
 
 _COMMON_DIALOG_PAIRS: tuple[tuple[str, str], ...] = (
@@ -60,33 +92,37 @@ _COMMON_DIALOG_PAIRS: tuple[tuple[str, str], ...] = (
 )
 
 
-def _decode_table(s: str) -> str:
-    if not s:
-        return s
-    return "".join(MAP_DECODE.get(ch, ch) for ch in s)
+@cache
+def _char_tables(char_map: tuple[tuple[str, str], ...]) -> tuple[dict[int, str], dict[int, str]]:
+    """(decode, encode) `str.translate` tables for a profile's `char_map`."""
+    encode = dict(char_map)
+    decode = {v: k for k, v in encode.items()}
+    return str.maketrans(decode), str.maketrans(encode)
+
+
+def _decode_table(s: str, table: dict[int, str]) -> str:
+    return s.translate(table) if s else s
 
 
-def _encode_table(s: str) -> str:
-    if not s:
-        return s
-    return "".join(MAP_ENCODE.get(ch, ch) for ch in s)
+def _encode_table(s: str, table: dict[int, str]) -> str:
+    return s.translate(table) if s else s
+
+
+# utf-8-sig não entra aqui: o BOM é tratado por utils.encoding.
+_ENCODINGS = ("utf-8", "cp932", "shift_jis")
 
 
 def _detect_encoding(data: bytes) -> str:
-    for enc in ("utf-8-sig", "utf-8", "cp932", "shift_jis"):
-        try:
-            data.decode(enc)
-            return enc
-        except UnicodeDecodeError:
-            pass
-    return "utf-8"
+    return detect_encoding(data, _ENCODINGS, fallback="utf-8")
 
 
-def _decode_text(data: bytes) -> tuple[str, str]:
-    enc = _detect_encoding(data)
-    return data.decode(enc, errors="replace"), enc
+@instrument.hot("decode", nbytes_arg=0)
+def _decode_text(data: bytes, encoding: str | None = None) -> tuple[str, str]:
+    decoded = decode_bytes(data, _ENCODINGS, fallback="utf-8", encoding=encoding)
+    return decoded.text, decoded.encoding
 
 
+@instrument.hot("encode", nbytes_arg=0)
 def _encode_text(text: str, enc: str) -> bytes:
     return text.encode(enc, errors="replace")
 
@@ -101,17 +137,72 @@ def _line_eol(line: str) -> str:
     return ""
 
 
-def _split_suffix(text: str) -> Tuple[str, str]:
-    if not text:
-        return text, ""
-
-    m = _RX_SUFFIX.match(text)
-    if not m:
-        return text, ""
+def _suffix_start(s: str, start: int) -> int:
+    """Start of the trailing control-code suffix of `s[start:]`, or `len(s)`.
 
-    body = m.group(1) or ""
-    suf = text[len(body):]
-    return body, suf
+    The suffix is a run of `\\code` tokens (`\\` + ASCII letters + digits)
+    followed only by whitespace. Tokens are walked backwards from the end with
+    `rfind`, so the cost is linear even for lines full of backslashes.
+    """
+    end = len(s.rstrip())
+    found = len(s)
+    j = end
+    while j > start:
+        k = s.rfind("\\", start, j)
+        if k < 0:
+            break
+        core = s[k + 1:j].rstrip(_DIGITS)
+        if not (core and core.isascii() and core.isalpha()):
+            break
+        found = j = k
+    return found
+
+
+def _message_lines(buf, needle, lf, cr) -> Iterator[tuple[int, int, int]]:
+    """`(line_index, start, end)` of each line of `buf` that contains `needle`.
+
+    Works on `str` or `bytes` (pass matching `needle`/`lf`/`cr`). Line indices
+    match `buf.splitlines()` as long as the only separators are \\n, \\r and
+    \\r\\n; `end` includes the line break. Lines without `needle` are skipped
+    with `find`/`count`, never materialized.
+    """
+    crlf = cr + lf
+    # Sem \r solto (arquivo LF ou CRLF), cada quebra de linha tem exatamente um \n.
+    lone_cr = buf.count(cr) != buf.count(crlf)
+    n = len(buf)
+    line_no = 0
+    pos = 0  # sempre um início de linha
+    while True:
+        hit = buf.find(needle, pos)
+        if hit < 0:
+            return
+        if lone_cr:
+            start = max(buf.rfind(lf, pos, hit), buf.rfind(cr, pos, hit)) + 1
+            if start > pos:
+                line_no += buf.count(lf, pos, start) + buf.count(cr, pos, start) - buf.count(crlf, pos, start)
+        else:
+            start = buf.rfind(lf, pos, hit) + 1
+            if start > pos:
+                line_no += buf.count(lf, pos, start)
+        if start < pos:
+            start = pos
+
+        e_lf = buf.find(lf, hit)
+        e_cr = buf.find(cr, hit, e_lf if e_lf >= 0 else n)
+        if e_cr >= 0 and (lone_cr or e_cr + 1 == e_lf):
+            end = e_cr + (2 if e_cr + 1 == e_lf else 1)
+        elif e_lf >= 0:
+            end = e_lf + 1
+        else:
+            end = n
+        yield line_no, start, end
+        line_no += 1
+        pos = end
+
+
+def _has_exotic_eol(buf, separators) -> bool:
+    # Um `in` por separador (memchr/busca em C) sai bem mais barato que um regex.
+    return any(sep in buf for sep in separators)
 
 
 def _is_id_like(tok: str) -> bool:
@@ -125,19 +216,25 @@ def _split_lead_tail_ws(s: str) -> Tuple[str, str, str]:
     return lead, core, tail
 
 
-def _unwrap_known_dialog(text: str, profile: MusicaProfile) -> Tuple[str, str, str]:
-    if not text:
+def _merged_dialog_pairs(profile: MusicaProfile) -> tuple[tuple[str, str], ...]:
+    """Profile pairs first, then the common ones not already listed."""
+    profile_pairs = tuple(profile.dialog_pairs or ())
+    return profile_pairs + tuple(p for p in _COMMON_DIALOG_PAIRS if p not in profile_pairs)
+
+
+def _unwrap_known_dialog(
+    text: str,
+    pairs: tuple[tuple[str, str], ...],
+    openers: tuple[str, ...],
+) -> Tuple[str, str, str]:
+    # `pairs`/`openers` vêm pré-calculados do parser (ver MusicaScParser.__init__).
+    if not text or not text.startswith(openers):
         return text, "", ""
 
     current = text
     opens: list[str] = []
     closes: list[str] = []
 
-    profile_pairs = tuple(profile.dialog_pairs or ())
-    all_pairs = profile_pairs + tuple(
-        p for p in _COMMON_DIALOG_PAIRS if p not in profile_pairs
-    )
-
     while True:
         matched = False
 
@@ -153,7 +250,7 @@ def _unwrap_known_dialog(text: str, profile: MusicaProfile) -> Tuple[str, str, s
             matched = True
 
         if not matched:
-            for op, cl in all_pairs:
+            for op, cl in pairs:
                 if current.startswith(op) and current.endswith(cl) and len(current) >= len(op) + len(cl):
                     current = current[len(op):-len(cl)]
                     opens.append(op)
@@ -167,54 +264,51 @@ def _unwrap_known_dialog(text: str, profile: MusicaProfile) -> Tuple[str, str, s
     return current, "".join(opens), "".join(closes)
 
 
+def _message_offsets(rest: str) -> Tuple[int, int, int, int]:
+    """Single-pass split of what follows `.message <n>`.
+
+    Grammar: `[spaces][<id> ][@speaker |speaker ]body[\\suffix...]`. Returns
+    `(body_start, speaker_start, speaker_end, suffix_start)` as offsets into
+    `rest` without its trailing newline. The prefix is `[:body_start]` and the
+    speaker, when present, lies inside it.
+    """
+    n = len(rest)
+    i = n - len(rest.lstrip(" "))
+    if i == n:
+        return n, n, n, n
+    if rest.startswith(_DIALOG_OPENERS, i):
+        return i, i, i, _suffix_start(rest, i)
+
+    m_id = _RX_TOKEN_WS.match(rest, i)
+    if m_id is None:
+        return i, i, i, _suffix_start(rest, i)
+    tok_end = m_id.end(1)
+    after = m_id.end()
+
+    if _is_id_like(m_id.group(1)):
+        m_next = _RX_TOKEN_WS.match(rest, after)
+        if m_next is not None:
+            c0, c1, body = m_next.start(1), m_next.end(1), m_next.end()
+            if rest.startswith(("@", "#"), c0):
+                return body, c0 + 1, c1, _suffix_start(rest, body)
+            if _RX_ASCII_WORD.fullmatch(rest, c0, c1) and rest.startswith(_DIALOG_OPENERS, body):
+                return body, c0, c1, _suffix_start(rest, body)
+        return after, after, after, _suffix_start(rest, after)
+
+    if _RX_ASCII_WORD.fullmatch(rest, i, tok_end) and rest.startswith(_DIALOG_OPENERS, after):
+        return after, i, tok_end, _suffix_start(rest, after)
+    return i, i, i, _suffix_start(rest, i)
+
+
 def _parse_rest_prefix_speaker_and_body(rest: str) -> Tuple[str, str, str, str]:
     rest_no_nl = rest.rstrip("\r\n")
-    lead_ws = rest_no_nl[: len(rest_no_nl) - len(rest_no_nl.lstrip(" "))]
-    s = rest_no_nl.lstrip(" ")
-
-    if not s:
-        return lead_ws, "", "", ""
-
-    if s.startswith(("\x81", '"', "“", "「", "『")):
-        body_raw, suf = _split_suffix(s)
-        return lead_ws, "", body_raw, suf
-
-    m_id = re.match(r"^(\S+)(\s+)(.*)$", s)
-    if m_id and _is_id_like(m_id.group(1)):
-        after_id = m_id.group(3)
-        prefix_base = lead_ws + s[: m_id.start(3)]
-
-        m_next = re.match(r"^(\S+)(\s+)(.*)$", after_id)
-        if m_next:
-            cand = m_next.group(1)
-            rest_after_cand = m_next.group(3)
-
-            if cand.startswith(("@", "#")):
-                speaker = cand[1:].strip()
-                body_raw, suf = _split_suffix(rest_after_cand)
-                prefix = lead_ws + s[: m_id.start(3) + m_next.start(3)]
-                return prefix, speaker, body_raw, suf
-
-            if re.fullmatch(r"[A-Za-z0-9_]+", cand) and rest_after_cand.startswith(("\x81", '"', "“", "「", "『")):
-                speaker = cand.strip()
-                body_raw, suf = _split_suffix(rest_after_cand)
-                prefix = lead_ws + s[: m_id.start(3) + m_next.start(3)]
-                return prefix, speaker, body_raw, suf
-
-        body_raw, suf = _split_suffix(after_id)
-        return prefix_base, "", body_raw, suf
-
-    m_sp = re.match(r"^([A-Za-z0-9_]+)(\s+)(.*)$", s)
-    if m_sp:
-        cand = m_sp.group(1)
-        rest_after = m_sp.group(3)
-        if rest_after.startswith(("\x81", '"', "“", "「", "『")):
-            prefix = lead_ws + s[: m_sp.start(3)]
-            body_raw, suf = _split_suffix(rest_after)
-            return prefix, cand.strip(), body_raw, suf
-
-    body_raw, suf = _split_suffix(s)
-    return lead_ws, "", body_raw, suf
+    body_start, sp_start, sp_end, suf_start = _message_offsets(rest_no_nl)
+    return (
+        rest_no_nl[:body_start],
+        rest_no_nl[sp_start:sp_end],
+        rest_no_nl[body_start:suf_start],
+        rest_no_nl[suf_start:],
+    )
 
 
 class MusicaScParser:
@@ -223,116 +317,424 @@ class MusicaScParser:
     def __init__(self, profile: MusicaProfile = DEFAULT_PROFILE):
         self.profile = profile
         self.engine_id = "musica.sc" if profile.id == "default" else f"musica.sc.{profile.id}"
+        self._dialog_pairs = _merged_dialog_pairs(profile)
+        self._decode_map, self._encode_map = _char_tables(profile.char_map)
+        self._dialog_openers = ("\x81",) + tuple(op for op, _cl in self._dialog_pairs)
 
     def can_parse(self, *, file_path: str | None = None, data: bytes | None = None) -> bool:
         return (file_path or "").lower().endswith(".sc")
 
-    def parse(self, data: bytes, *, file_path: str | None = None) -> ParseResult:
-        text, _enc = _decode_text(data)
+    def score(self, sample: str, *, file_path: str | None = None) -> float:
+        """How likely (0..1) a decoded head of a file is a script for this profile.
+
+        Extension (0.5), share of dot-command lines such as `.message` (0.3) and
+        profile hints such as `\\x81` wrappers vs `「」` (0.2).
+        """
+        score = 0.5 if self.can_parse(file_path=file_path) else 0.0
+
+        lines = [ln.lstrip() for ln in sample.splitlines() if ln.strip()]
+        if lines:
+            cmds = sum(1 for ln in lines if ln.startswith(".") or ".message" in ln)
+            score += 0.3 * min(1.0, 2 * cmds / len(lines))
+
+        if self.profile.detect_hints:
+            hits = sum(sample.count(h) for h in self.profile.detect_hints)
+            score += 0.2 * min(1.0, hits / 4)
+        return score
+
+    def parse(
+        self,
+        data: bytes,
+        *,
+        file_path: str | None = None,
+        encoding: str | None = None,
+        with_spans: bool = False,
+    ) -> ParseResult:
+        if not with_spans:
+            with instrument.stage("parse", len(data)):
+                entries = self._parse_prefiltered(data, file_path=file_path, encoding=encoding)
+            if entries is not None:
+                return ParseResult(engine_id=self.engine_id, entries=entries)
+
+        with instrument.stage("parse", len(data)):
+            text, enc = _decode_text(data, encoding)
+            with instrument.stage("splitlines"):
+                lines = text.splitlines(keepends=True)
+            spans: SpanIndex | None = {} if with_spans else None
+            with instrument.stage("classify"):
+                entries = list(self._iter_entries(lines, file_path=file_path, spans=spans))
+            byte_spans = byte_spans_for(data, text, lines, spans, enc) if spans is not None else None
+        return ParseResult(
+            engine_id=self.engine_id,
+            entries=entries,
+            spans=spans,
+            byte_spans=byte_spans,
+            source_hash=content_hash(data) if spans is not None else None,
+        )
+
+    def _parse_prefiltered(
+        self,
+        data: bytes,
+        *,
+        file_path: str | None,
+        encoding: str | None,
+    ) -> list[Entry] | None:
+        """Entries from the `.message` lines only, or None to use the full parse.
+
+        With an explicit byte-safe `encoding` the raw bytes are scanned and only
+        candidate lines are decoded (strictly: any error falls back). Otherwise
+        the buffer is decoded once, as in the full parse, and the scan runs on the
+        text. Either way other lines are never split out or regex-matched.
+        """
+        codec = None
+        if encoding:
+            try:
+                codec = codecs.lookup(encoding).name
+            except LookupError:
+                return None
+
+        line_entry = self._entry_builder()
         entries: list[Entry] = []
-
-        lines = text.splitlines(keepends=True)
-
-        for i, line in enumerate(lines):
-            s = line.lstrip()
-            if s.startswith(";") or s.startswith("//"):
-                continue
-
-            m = _RX_MESSAGE.match(line)
-            if not m:
-                continue
-
-            ws, chan, sp1, msgno, sp2, rest, nl = m.groups()
-            prefix, speaker, body_raw, suf = _parse_rest_prefix_speaker_and_body(rest)
-
-            visible_full = _decode_table(body_raw)
-            if visible_full == "" or visible_full.strip() == "":
-                continue
-            if _RX_CONTROL_ONLY.match(visible_full):
-                continue
-
-            body_lead, body_core_raw, body_tail = _split_lead_tail_ws(body_raw)
-            body_core_visible = _decode_table(body_core_raw)
-
-            editor_core, dialog_open, dialog_close = _unwrap_known_dialog(
-                body_core_visible,
-                self.profile,
+        if codec in _BYTE_SCAN_CODECS:
+            if _has_exotic_eol(data, _EXOTIC_EOL_BYTES):
+                return None
+            with instrument.stage("scan"):
+                try:
+                    for i, start, end in _message_lines(data, b".message", b"\n", b"\r"):
+                        ent = line_entry(str(data[start:end], codec), i, file_path)
+                        if ent is not None:
+                            entries.append(ent)
+                except UnicodeDecodeError:
+                    return None
+            return entries
+
+        text, _enc = _decode_text(data, encoding)
+        if _has_exotic_eol(text, _EXOTIC_EOL):
+            return None
+        with instrument.stage("scan"):
+            for i, start, end in _message_lines(text, ".message", "\n", "\r"):
+                ent = line_entry(text[start:end], i, file_path)
+                if ent is not None:
+                    entries.append(ent)
+        return entries
+
+    def parse_stream(
+        self,
+        fp: BinaryIO,
+        *,
+        file_path: str | None = None,
+        encoding: str | None = None,
+    ) -> Iterator[Entry]:
+        """Yield entries from a binary file object without loading the whole file."""
+        enc, head = sniff_stream(fp, _ENCODINGS, fallback="utf-8", encoding=encoding)
+        yield from self._iter_entries(iter_decoded_lines(fp, enc, head=head), file_path=file_path)
+
+    def parse_incremental(
+        self,
+        old_result: ParseResult,
+        old_data: bytes,
+        new_data: bytes,
+        *,
+        file_path: str | None = None,
+        encoding: str | None = None,
+    ) -> ParseResult:
+        """Re-parse `new_data` reusing `old_result` (the parse of `old_data`).
+
+        Lines are independent in `.sc`, so only the lines between the common head
+        and tail of both versions are re-parsed; entries after them are re-keyed
+        by the line shift. The result is identical to `parse(new_data)`.
+        """
+        old_text, _ = _decode_text(old_data, encoding)
+        new_text, new_enc = _decode_text(new_data, encoding)
+        old_lines = old_text.splitlines(keepends=True)
+        new_lines = new_text.splitlines(keepends=True)
+        with_spans = old_result.spans is not None
+
+        old_lidx = entry_line_indices(old_result.entries)
+        if old_lidx is None:
+            return self.parse(new_data, file_path=file_path, encoding=encoding, with_spans=with_spans)
+
+        head, tail = common_line_affixes(old_lines, new_lines)
+        old_tail_start = len(old_lines) - tail
+        new_tail_start = len(new_lines) - tail
+        line_delta = new_tail_start - old_tail_start
+
+        n_head = bisect_left(old_lidx, head)
+        n_tail_start = bisect_left(old_lidx, old_tail_start)
+        spans: SpanIndex | None = {} if with_spans else None
+
+        mid = list(
+            self._iter_entries(
+                new_lines[head:new_tail_start],
+                file_path=file_path,
+                spans=spans,
+                line_offset=head,
+                pos_offset=sum(map(len, new_lines[:head])),
             )
-
-            if editor_core == "" and body_core_visible != "":
-                editor_core = body_core_visible
-
-            key = f"{file_path or 'file'}:{i}"
-            entries.append(
-                Entry(
-                    key=key,
-                    text=f"{body_lead}{editor_core}{body_tail}",
-                    speaker=speaker or None,
-                    meta={
-                        "line_index": i,
-                        "ws": ws,
-                        "chan": chan or "",
-                        "sp1": sp1,
-                        "msgno": msgno,
-                        "sp2": sp2,
-                        "prefix": prefix,
-                        "suffix": suf,
-                        "newline": nl or "",
-                        "body_lead": body_lead,
-                        "body_tail": body_tail,
-                        "dialog_open": dialog_open,
-                        "dialog_close": dialog_close,
-                    },
-                )
-            )
-
-        return ParseResult(engine_id=self.engine_id, entries=entries)
-
-    def export(self, data: bytes, entries: list[Entry], *, file_path: str | None = None) -> bytes:
-        original_text, enc = _decode_text(data)
-        lines = original_text.splitlines(keepends=True)
+        )
+        reused_tail = shift_entries(
+            old_result.entries[n_tail_start:],
+            file_path=file_path,
+            key_offset=line_delta,
+            line_offset=line_delta,
+        )
+        reused_head = shift_entries(
+            old_result.entries[:n_head],
+            file_path=file_path,
+            key_offset=0,
+            line_offset=0,
+        )
+        entries = reused_head + mid + reused_tail
+
+        if spans is not None:
+            assert old_result.spans is not None
+            char_delta = len(new_text) - len(old_text)
+            head_spans = {
+                new.key: old_result.spans[old.key]
+                for old, new in zip(old_result.entries[:n_head], reused_head, strict=True)
+            }
+            for old, new in zip(old_result.entries[n_tail_start:], reused_tail, strict=True):
+                start, end = old_result.spans[old.key]
+                spans[new.key] = (start + char_delta, end + char_delta)
+            spans = {**head_spans, **spans}
+            byte_spans = byte_spans_for(new_data, new_text, new_lines, spans, new_enc)
+        else:
+            byte_spans = None
+
+        return ParseResult(
+            engine_id=self.engine_id,
+            entries=entries,
+            spans=spans,
+            byte_spans=byte_spans,
+            source_hash=content_hash(new_data) if spans is not None else None,
+        )
+
+    def _iter_entries(
+        self,
+        lines: Iterable[str],
+        *,
+        file_path: str | None,
+        spans: SpanIndex | None = None,
+        line_offset: int = 0,
+        pos_offset: int = 0,
+    ) -> Iterator[Entry]:
+        pos = pos_offset
+        line_entry = self._entry_builder()
+        for i, line in enumerate(lines, line_offset):
+            start = pos
+            pos += len(line)
+            ent = line_entry(line, i, file_path)
+            if ent is None:
+                continue
+            if spans is not None:
+                spans[ent.key] = (start, pos)
+            yield ent
+
+    def _entry_builder(self) -> Callable[[str, int, str | None], Entry | None]:
+        """`_line_entry`, with its per-line helpers timed while instrumenting."""
+        if not instrument.enabled():
+            return self._line_entry
+        return partial(
+            self._line_entry,
+            split_rest=instrument.timed(_parse_rest_prefix_speaker_and_body, "speaker_body", nbytes_arg=0),
+            decode_table=instrument.timed(_decode_table, "char_map", nbytes_arg=0),
+            unwrap_dialog=instrument.timed(_unwrap_known_dialog, "unwrap_dialog", nbytes_arg=0),
+        )
+
+    def _line_entry(
+        self,
+        line: str,
+        i: int,
+        file_path: str | None,
+        *,
+        split_rest: Callable[[str], tuple[str, str, str, str]] = _parse_rest_prefix_speaker_and_body,
+        decode_table: Callable[[str, dict[int, str]], str] = _decode_table,
+        unwrap_dialog: Callable[..., tuple[str, str, str]] = _unwrap_known_dialog,
+    ) -> Entry | None:
+        """Entry for source line `i`, or None if it is not a translatable `.message`."""
+        s = line.lstrip()
+        if s.startswith(";") or s.startswith("//"):
+            return None
+
+        m = _RX_MESSAGE.match(line)
+        if not m:
+            return None
+
+        ws, chan, sp1, msgno, sp2, rest, nl = m.groups()
+        prefix, speaker, body_raw, suf = split_rest(rest)
+
+        visible_full = decode_table(body_raw, self._decode_map)
+        if visible_full == "" or visible_full.strip() == "":
+            return None
+        if _RX_CONTROL_ONLY.match(visible_full):
+            return None
+
+        body_lead, body_core_raw, body_tail = _split_lead_tail_ws(body_raw)
+        body_core_visible = decode_table(body_core_raw, self._decode_map)
+
+        editor_core, dialog_open, dialog_close = unwrap_dialog(
+            body_core_visible,
+            self._dialog_pairs,
+            self._dialog_openers,
+        )
+
+        if editor_core == "" and body_core_visible != "":
+            editor_core = body_core_visible
+
+        return Entry(
+            key=f"{file_path or 'file'}:{i}",
+            text=f"{body_lead}{editor_core}{body_tail}",
+            speaker=speaker or None,
+            meta={
+                "line_index": i,
+                "ws": ws,
+                "chan": chan or "",
+                "sp1": sp1,
+                "msgno": msgno,
+                "sp2": sp2,
+                "prefix": prefix,
+                "suffix": suf,
+                "newline": nl or "",
+                "body_lead": body_lead,
+                "body_tail": body_tail,
+                "dialog_open": dialog_open,
+                "dialog_close": dialog_close,
+            },
+        )
+
+    def export(
+        self,
+        data: bytes,
+        entries: list[Entry],
+        *,
+        file_path: str | None = None,
+        encoding: str | None = None,
+        spans: SpanIndex | None = None,
+        byte_spans: ByteSpans | None = None,
+        strict: bool = False,
+    ) -> bytes:
+        """Rebuild `data` with the text of `entries` (matched by key).
+
+        With `strict=True` the result is parsed back and `RoundTripError` is
+        raised unless every entry reads back unchanged (see `verify.check_export`).
+        """
+        out = self._export(data, entries, file_path=file_path, encoding=encoding, spans=spans, byte_spans=byte_spans)
+        if strict:
+            from ...verify import check_export
+
+            check_export(self, data, out, entries, file_path=file_path, encoding=encoding)
+        return out
+
+    def _export(
+        self,
+        data: bytes,
+        entries: list[Entry],
+        *,
+        file_path: str | None,
+        encoding: str | None,
+        spans: SpanIndex | None,
+        byte_spans: ByteSpans | None,
+    ) -> bytes:
+        if byte_spans is not None:
+            with instrument.stage("export", len(data)):
+                return b"".join(self.export_chunks(data, entries, byte_spans))
+
+        with instrument.stage("export", len(data)):
+            original_text, enc = _decode_text(data, encoding)
+            by_key = {e.key: e for e in entries if getattr(e, "key", None)}
+
+            if spans is not None:
+                # Caminho rápido: só as linhas das entries são tocadas.
+                out_text = splice_spans(original_text, by_key, spans, self._render_line)
+                return _encode_text(out_text, enc)
+
+            with instrument.stage("splitlines"):
+                lines = original_text.splitlines(keepends=True)
+            with instrument.stage("render"):
+                out_text = "".join(self._iter_export(lines, by_key, file_path=file_path))
+
+            return _encode_text(out_text, enc)
+
+    def export_chunks(
+        self,
+        data: bytes,
+        entries: list[Entry],
+        byte_spans: ByteSpans,
+    ) -> list[bytes | memoryview]:
+        """Export as buffers: `memoryview` slices of `data` plus the encoded new lines.
+
+        `byte_spans` must come from `parse(data, with_spans=True)`. The file is
+        never decoded; write the chunks with `utils.fs.atomic_write_chunks`.
+        """
         by_key = {e.key: e for e in entries if getattr(e, "key", None)}
-
-        out_lines: list[str] = []
-
+        return splice_bytes(data, by_key, byte_spans, self._render_line)
+
+    def export_stream(
+        self,
+        src_fp: BinaryIO,
+        dst_fp: BinaryIO,
+        entries_lookup: Mapping[str, Entry],
+        *,
+        file_path: str | None = None,
+        encoding: str | None = None,
+    ) -> None:
+        """Stream `src_fp` into `dst_fp`, replacing lines found in `entries_lookup` (by key)."""
+        enc, head = sniff_stream(src_fp, _ENCODINGS, fallback="utf-8", encoding=encoding)
+        write = make_line_writer(dst_fp, enc)
+        lines = iter_decoded_lines(src_fp, enc, head=head)
+        for out_line in self._iter_export(lines, entries_lookup, file_path=file_path):
+            write(out_line)
+
+    def _iter_export(
+        self,
+        lines: Iterable[str],
+        by_key: Mapping[str, Entry],
+        *,
+        file_path: str | None,
+    ) -> Iterator[str]:
         for i, line in enumerate(lines):
             m = _RX_MESSAGE.match(line)
             if not m:
-                out_lines.append(line)
+                yield line
                 continue
 
             key = f"{file_path or 'file'}:{i}"
             ent = by_key.get(key)
             if ent is None:
-                out_lines.append(line)
+                yield line
                 continue
 
-            ws, chan, sp1, msgno, sp2, _rest, nl = m.groups()
-            meta = ent.meta or {}
+            yield self._render_line(line, ent, m)
+
+    def _render_line(self, line: str, ent: Entry, m: re.Match | None = None) -> str:
+        if m is None:
+            m = _RX_MESSAGE.match(line)
+            if not m:
+                return line
+
+        ws, chan, sp1, msgno, sp2, _rest, nl = m.groups()
+        meta = ent.meta or {}
 
-            prefix = str(meta.get("prefix") or "")
-            suf = str(meta.get("suffix") or "")
-            newline = str(meta.get("newline") or (nl or ""))
-            body_lead = str(meta.get("body_lead") or "")
-            body_tail = str(meta.get("body_tail") or "")
-            dialog_open = str(meta.get("dialog_open") or "")
-            dialog_close = str(meta.get("dialog_close") or "")
+        prefix = str(meta.get("prefix") or "")
+        suf = str(meta.get("suffix") or "")
+        newline = str(meta.get("newline") or (nl or ""))
+        body_lead = str(meta.get("body_lead") or "")
+        body_tail = str(meta.get("body_tail") or "")
+        dialog_open = str(meta.get("dialog_open") or "")
+        dialog_close = str(meta.get("dialog_close") or "")
 
-            body_txt = ent.text or ""
-            repl_eol = _line_eol(body_txt)
-            if repl_eol:
-                body_txt = body_txt[:-len(repl_eol)]
+        body_txt = ent.text or ""
+        repl_eol = _line_eol(body_txt)
+        if repl_eol:
+            body_txt = body_txt[:-len(repl_eol)]
 
-            body_core = body_txt
-            if dialog_open or dialog_close:
-                body_core = f"{dialog_open}{body_core}{dialog_close}"
+        body_core = body_txt
+        if dialog_open or dialog_close:
+            body_core = f"{dialog_open}{body_core}{dialog_close}"
 
-            body_txt_enc = _encode_table(body_core)
-            body_txt_enc = f"{body_lead}{body_txt_enc}{body_tail}"
+        body_txt_enc = _encode_table(body_core, self._encode_map)
+        body_txt_enc = f"{body_lead}{body_txt_enc}{body_tail}"
 
-            chan_s = str(meta.get("chan") or (chan or ""))
-            out_lines.append(
-                f"{ws}{chan_s}.message{sp1}{msgno}{sp2}{prefix}{body_txt_enc}{suf}{newline}"
-            )
+        chan_s = str(meta.get("chan") or (chan or ""))
+        return f"{ws}{chan_s}.message{sp1}{msgno}{sp2}{prefix}{body_txt_enc}{suf}{newline}"
 
-        return _encode_text("".join(out_lines), enc)
\ No newline at end of file
@@ -0,0 +1,207 @@
+"""Opt-in per-stage timing for parse/export.
+
+    from sekai_parsers import instrument
+
+    with instrument.collect() as rec:
+        parser.parse(data)
+    print(rec.to_json())
+    Path("parse.folded").write_text(rec.to_folded())  # flamegraph.pl / speedscope
+
+Parsers wrap coarse stages (parse, splitlines, classify...) in `stage(...)` and
+mark per-file helpers with `@hot(...)`; both cost one context-variable lookup
+when nothing is collecting. Per-line helpers are swapped for `timed(...)`
+versions once per parse, so they cost nothing otherwise. Collection is scoped
+to the context that opened `collect()`: parses running at the same time in
+other threads are not timed.
+"""
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any, TypeVar
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+# Recorder ativo no contexto atual (thread/task); None fora de collect().
+_active: ContextVar[Recorder | None] = ContextVar("sekai_parsers_instrument", default=None)
+
+
+@dataclass(slots=True)
+class StageStats:
+    calls: int = 0
+    seconds: float = 0.0
+    nbytes: int = 0
+
+
+class Recorder:
+    """Aggregated stats keyed by stage path (`"parse;decode"`)."""
+
+    def __init__(self) -> None:
+        self.stages: dict[str, StageStats] = {}
+        self._local = threading.local()
+
+    def _stack(self) -> list[str]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def add(self, path: str, seconds: float, nbytes: int = 0) -> None:
+        st = self.stages.get(path)
+        if st is None:
+            st = self.stages[path] = StageStats()
+        st.calls += 1
+        st.seconds += seconds
+        st.nbytes += nbytes
+
+    def to_dict(self) -> dict[str, dict[str, Any]]:
+        return {path: asdict(st) for path, st in self.stages.items()}
+
+    def to_json(self, **kwargs: Any) -> str:
+        import json
+
+        return json.dumps({"stages": self.to_dict()}, **kwargs)
+
+    def to_folded(self) -> str:
+        """Folded stacks (`a;b;c <microseconds>`) with self time, for flamegraph tools."""
+        child_total: dict[str, float] = {}
+        for path, st in self.stages.items():
+            parent = path.rpartition(";")[0]
+            if parent:
+                child_total[parent] = child_total.get(parent, 0.0) + st.seconds
+        lines = []
+        for path, st in self.stages.items():
+            self_us = round(max(0.0, st.seconds - child_total.get(path, 0.0)) * 1e6)
+            lines.append(f"{path} {self_us}")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+
+class _Stage:
+    __slots__ = ("_rec", "_name", "_nbytes", "_path", "_t0")
+
+    def __init__(self, rec: Recorder, name: str, nbytes: int):
+        self._rec = rec
+        self._name = name
+        self._nbytes = nbytes
+
+    def __enter__(self) -> _Stage:
+        stack = self._rec._stack()
+        self._path = f"{stack[-1]};{self._name}" if stack else self._name
+        stack.append(self._path)
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        dt = time.perf_counter() - self._t0
+        self._rec._stack().pop()
+        self._rec.add(self._path, dt, self._nbytes)
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self) -> _NullStage:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        return None
+
+
+_NULL = _NullStage()
+
+
+def enabled() -> bool:
+    return _active.get() is not None
+
+
+def stage(name: str, nbytes: int = 0) -> _Stage | _NullStage:
+    """Context manager timing one stage; a shared no-op when not collecting."""
+    rec = _active.get()
+    if rec is None:
+        return _NULL
+    return _Stage(rec, name, nbytes)
+
+
+def _timed_call(
+    rec: Recorder,
+    fn: Callable[..., Any],
+    stage_name: str,
+    nbytes_arg: int | None,
+    args: tuple,
+    kwargs: dict,
+) -> Any:
+    nbytes = len(args[nbytes_arg]) if nbytes_arg is not None and len(args) > nbytes_arg else 0
+    with _Stage(rec, stage_name, nbytes):
+        return fn(*args, **kwargs)
+
+
+def hot(stage_name: str, *, nbytes_arg: int | None = None) -> Callable[[_F], _F]:
+    """Decorator timing every call of a function as `stage_name` while collecting.
+
+    For functions called a few times per file (decode, encode, splice): outside
+    `collect()` the wrapper only checks the recorder and calls through.
+    `nbytes_arg` is the index of a positional argument whose `len()` is counted
+    as bytes processed.
+    """
+    def decorate(fn: _F) -> _F:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            rec = _active.get()
+            if rec is None:
+                return fn(*args, **kwargs)
+            return _timed_call(rec, fn, stage_name, nbytes_arg, args, kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+def timed(fn: _F, stage_name: str, *, nbytes_arg: int | None = None) -> _F:
+    """`fn` itself when not collecting, else a wrapper timing each call.
+
+    For per-line helpers: the parser fetches them once per call, so the hot
+    loop never pays for a check (see `MusicaScParser._entry_builder`).
+    """
+    rec = _active.get()
+    if rec is None:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return _timed_call(rec, fn, stage_name, nbytes_arg, args, kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
+
+@contextmanager
+def collect() -> Iterator[Recorder]:
+    """Collect stage stats for parse/export calls made inside the block.
+
+    Only the current context is instrumented (the calling thread, or the
+    asyncio task and what it awaits); other threads keep running untimed.
+    Nested `collect()` calls are not supported.
+    """
+    if _active.get() is not None:
+        raise RuntimeError("instrument.collect() is already active")
+    rec = Recorder()
+    token = _active.set(rec)
+    try:
+        yield rec
+    finally:
+        _active.reset(token)
+
+
+__all__ = [
+    "Recorder",
+    "StageStats",
+    "collect",
+    "enabled",
+    "hot",
+    "stage",
+    "timed",
+]
@@ -0,0 +1,282 @@
+"""Binary exchange format for parse results (e.g. worker -> editor).
+
+    from sekai_parsers import serialize
+
+    with open("project.spr", "wb") as f:
+        serialize.dump(batch.results, f)
+
+    with open("project.spr", "rb") as f:
+        for name, result in serialize.load(f):  # streaming, one file at a time
+            ...
+
+    with serialize.open_archive("project.spr") as archive:  # random access
+        entry = archive.get_entry("sub/b.sc:3")
+
+Layout (version 1), all integers little-endian:
+
+    header   b"SPR" version:u8 codec:u8
+    frame*   name_len:u32 payload_len:u64 name:utf-8 payload
+    index    name_len=0xFFFFFFFF payload_len:u64 payload (JSON, uncompressed)
+    trailer  index_offset:u64 b"SPRI"
+
+Each payload is a `ColumnarParseResult.to_bytes()` blob (string table +
+little-endian index columns), compressed per frame so random access only inflates the file
+it needs. Frames are written as results arrive; the index comes last, so
+`dump` never holds more than one file in memory and `load` needs no seeking.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from collections.abc import Iterable, Iterator, Mapping
+from typing import BinaryIO
+
+from .api import Entry, ParseResult
+from .columnar import ColumnarParseResult, split_key
+
+FORMAT_VERSION = 1
+
+_MAGIC = b"SPR"
+_TRAILER_MAGIC = b"SPRI"
+_FRAME = struct.Struct("<IQ")
+_TRAILER = struct.Struct("<Q4s")
+_INDEX_FRAME = 0xFFFFFFFF
+
+# codec -> id no header; só módulos da stdlib, importados sob demanda.
+_CODECS = {None: 0, "zlib": 1, "lzma": 2}
+_CODEC_NAMES = {v: k for k, v in _CODECS.items()}
+
+
+def _compressor(codec: str | None, level: int | None):
+    if codec is None:
+        return lambda b: b
+    if codec == "zlib":
+        import zlib
+
+        lvl = 1 if level is None else level  # nível 1: ~3x menor, quase sem custo de CPU
+        return lambda b: zlib.compress(b, lvl)
+    import lzma
+
+    preset = 0 if level is None else level
+    return lambda b: lzma.compress(b, preset=preset)
+
+
+def _decompressor(codec: str | None):
+    if codec is None:
+        return bytes
+    if codec == "zlib":
+        import zlib
+
+        return zlib.decompress
+    import lzma
+
+    return lzma.decompress
+
+
+def _as_columnar(result: ParseResult | ColumnarParseResult) -> ColumnarParseResult:
+    return result if isinstance(result, ColumnarParseResult) else ColumnarParseResult.from_result(result)
+
+
+def dump(
+    results: Mapping[str, ParseResult | ColumnarParseResult]
+    | Iterable[tuple[str, ParseResult | ColumnarParseResult]],
+    fp: BinaryIO,
+    *,
+    codec: str | None = "zlib",
+    level: int | None = None,
+) -> int:
+    """Write `results` (name -> result, e.g. `BatchResult.results`) to `fp`.
+
+    `results` may also be a lazy iterable of `(name, result)` pairs; each one is
+    encoded and written before the next is pulled. `codec` is "zlib" (default),
+    "lzma" or None. Returns the number of bytes written.
+    """
+    if codec not in _CODECS:
+        raise ValueError(f"unknown codec: {codec!r}")
+    compress = _compressor(codec, level)
+    pairs = results.items() if isinstance(results, Mapping) else results
+
+    pos = fp.write(_MAGIC + bytes((FORMAT_VERSION, _CODECS[codec])))
+    index: list[dict] = []
+    for name, result in pairs:
+        col = _as_columnar(result)
+        payload = compress(col.to_bytes())
+        raw_name = name.encode("utf-8")
+        index.append({
+            "name": name,
+            "offset": pos,
+            "entries": len(col),
+            "prefixes": col.key_prefixes(),
+        })
+        pos += fp.write(_FRAME.pack(len(raw_name), len(payload)))
+        pos += fp.write(raw_name)
+        pos += fp.write(payload)
+
+    index_offset = pos
+    raw_index = json.dumps(index, ensure_ascii=False).encode("utf-8")
+    pos += fp.write(_FRAME.pack(_INDEX_FRAME, len(raw_index)))
+    pos += fp.write(raw_index)
+    pos += fp.write(_TRAILER.pack(index_offset, _TRAILER_MAGIC))
+    return pos
+
+
+def dumps(
+    results: Mapping[str, ParseResult | ColumnarParseResult]
+    | Iterable[tuple[str, ParseResult | ColumnarParseResult]],
+    *,
+    codec: str | None = "zlib",
+    level: int | None = None,
+) -> bytes:
+    import io
+
+    buf = io.BytesIO()
+    dump(results, buf, codec=codec, level=level)
+    return buf.getvalue()
+
+
+def _read_header(head: bytes) -> str | None:
+    if len(head) < 5 or head[:3] != _MAGIC:
+        raise ValueError("not a sekai_parsers result archive")
+    if head[3] != FORMAT_VERSION:
+        raise ValueError(f"unsupported archive version: {head[3]}")
+    try:
+        return _CODEC_NAMES[head[4]]
+    except KeyError:
+        raise ValueError(f"unknown codec id: {head[4]}") from None
+
+
+def _read_exact(fp: BinaryIO, n: int) -> bytes:
+    data = fp.read(n)
+    if len(data) != n:
+        raise ValueError("truncated archive")
+    return data
+
+
+def load(
+    fp: BinaryIO,
+    *,
+    columnar: bool = False,
+) -> Iterator[tuple[str, ParseResult | ColumnarParseResult]]:
+    """Yield `(name, result)` from an archive, reading `fp` front to back.
+
+    Works on pipes and sockets (no seeking). With `columnar=True` results stay
+    as `ColumnarParseResult`, which skips building an `Entry` per row.
+    """
+    decompress = _decompressor(_read_header(_read_exact(fp, 5)))
+    while True:
+        name_len, payload_len = _FRAME.unpack(_read_exact(fp, _FRAME.size))
+        if name_len == _INDEX_FRAME:
+            return
+        name = _read_exact(fp, name_len).decode("utf-8")
+        col = ColumnarParseResult.from_bytes(decompress(_read_exact(fp, payload_len)))
+        yield name, col if columnar else col.to_result()
+
+
+def loads(data: bytes, *, columnar: bool = False) -> dict[str, ParseResult | ColumnarParseResult]:
+    import io
+
+    return dict(load(io.BytesIO(data), columnar=columnar))
+
+
+class ResultArchive:
+    """Random access to an archive written by `dump`.
+
+    The file is memory-mapped; only the trailing index is parsed up front. A
+    file's frame is inflated and decoded the first time it is requested and kept
+    as a `ColumnarParseResult`.
+    """
+
+    def __init__(self, path: str | os.PathLike):
+        self._fp = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._fp.close()
+            raise
+        self._offsets: dict[str, int] = {}
+        self._counts: dict[str, int] = {}
+        self._by_prefix: dict[str, str] = {}
+        try:
+            self._decompress = _decompressor(_read_header(self._mm[:5]))
+            self._read_index()
+        except BaseException:
+            self.close()
+            raise
+        self._loaded: dict[str, ColumnarParseResult] = {}
+
+    def _read_index(self) -> None:
+        mm = self._mm
+        if len(mm) < 5 + _TRAILER.size:
+            raise ValueError("truncated archive")
+        index_offset, magic = _TRAILER.unpack_from(mm, len(mm) - _TRAILER.size)
+        if magic != _TRAILER_MAGIC:
+            raise ValueError("archive has no index (incomplete write?)")
+        name_len, index_len = _FRAME.unpack_from(mm, index_offset)
+        if name_len != _INDEX_FRAME:
+            raise ValueError("corrupt archive index")
+        start = index_offset + _FRAME.size
+        for item in json.loads(mm[start:start + index_len]):
+            self._offsets[item["name"]] = item["offset"]
+            self._counts[item["name"]] = item["entries"]
+            for prefix in item["prefixes"]:
+                self._by_prefix.setdefault(prefix, item["name"])
+
+    def __enter__(self) -> ResultArchive:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._mm.close()
+        self._fp.close()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._offsets
+
+    def names(self) -> list[str]:
+        return list(self._offsets)
+
+    def entry_count(self, name: str) -> int:
+        """Number of entries in `name`, without decoding its frame."""
+        return self._counts[name]
+
+    def __getitem__(self, name: str) -> ColumnarParseResult:
+        col = self._loaded.get(name)
+        if col is None:
+            offset = self._offsets[name]
+            name_len, payload_len = _FRAME.unpack_from(self._mm, offset)
+            start = offset + _FRAME.size + name_len
+            col = ColumnarParseResult.from_bytes(self._decompress(self._mm[start:start + payload_len]))
+            self._loaded[name] = col
+        return col
+
+    def result(self, name: str) -> ParseResult:
+        return self[name].to_result()
+
+    def get_entry(self, key: str) -> Entry | None:
+        """Look up one entry by key, decoding only the file that contains it."""
+        name = self._by_prefix.get(split_key(key)[0])
+        if name is None:
+            return None
+        return self[name].get(key)
+
+
+def open_archive(path: str | os.PathLike) -> ResultArchive:
+    return ResultArchive(path)
+
+
+__all__ = [
+    "FORMAT_VERSION",
+    "ResultArchive",
+    "dump",
+    "dumps",
+    "load",
+    "loads",
+    "open_archive",
+]
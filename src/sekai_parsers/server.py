@@ -0,0 +1,416 @@
+"""Long-running parse server with warm parsers (JSON-RPC 2.0).
+
+    python -m sekai_parsers.server --socket /tmp/sekai.sock
+    python -m sekai_parsers.server --stdio
+
+Messages are newline-delimited JSON-RPC 2.0 objects (or batches). Methods:
+
+- `list_engines()` -> `["kirikiri.ks", ...]`
+- `detect(path)` -> `{"engine_id", "confidence"}`
+- `parse(path | data_b64, engine_id=None, file_path=None, encoding=None,
+  with_spans=False)` -> `{"engine_id", "entries", "spans", "cached"}`.
+  `engine_id` defaults to detection; `file_path` (used in keys) defaults to `path`.
+- `export(path | data_b64, engine_id, entries, out_path=None, file_path=None,
+  encoding=None)` -> `{"path"}` (written atomically) or `{"data_b64"}`.
+
+Parsers come from `get_engine(..., shared=True)` and stay warm for the life of
+the process; recent parse results are kept in an in-memory LRU keyed by file
+identity (path + mtime + size) or content hash. Requests on a connection are
+handled concurrently and answered as they finish, so match responses by `id`.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import socket
+import stat
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from .api import Entry, ParseResult
+from .engine_registry import get_engine, list_engines
+from .utils.fs import atomic_write_bytes
+from .utils.text import content_hash
+
+DEFAULT_CACHE_SIZE = 256
+# Linhas maiores que isso derrubam a conexão (asyncio.StreamReader.readline).
+_LINE_LIMIT = 256 << 20
+
+# Códigos de erro do JSON-RPC 2.0
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class _ResultCache:
+    """Thread-safe LRU of recent `ParseResult`s (handlers run in a thread pool)."""
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._items: OrderedDict[tuple, ParseResult] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> ParseResult | None:
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is not None:
+                self._items.move_to_end(key)
+            return hit
+
+    def put(self, key: tuple, result: ParseResult) -> None:
+        if self.max_items <= 0:
+            return
+        with self._lock:
+            self._items[key] = result
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+def _entry_dicts(entries: list[Entry]) -> list[dict]:
+    return [{"key": e.key, "text": e.text, "speaker": e.speaker, "meta": e.meta} for e in entries]
+
+
+def _entries_from(rows: Any) -> list[Entry]:
+    if not isinstance(rows, list):
+        raise RpcError(INVALID_PARAMS, "entries must be a list")
+    try:
+        return [
+            Entry(key=r["key"], text=r["text"], speaker=r.get("speaker"), meta=r.get("meta"))
+            for r in rows
+        ]
+    except (KeyError, TypeError, AttributeError):
+        raise RpcError(INVALID_PARAMS, "each entry needs at least 'key' and 'text'") from None
+
+
+def _remove_stale_socket(path: str) -> None:
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(st.st_mode):
+        raise FileExistsError(f"{path} exists and is not a socket")
+    os.unlink(path)  # socket velho de uma execução anterior
+
+
+class ParseServer:
+    """JSON-RPC front-end over warm parsers.
+
+    - `cache_size`: parse results kept in memory (0 disables the cache).
+    - `max_workers`: threads running parse/export jobs; the event loop only
+      does framing, so slow requests never block the others.
+    """
+
+    def __init__(self, *, cache_size: int = DEFAULT_CACHE_SIZE, max_workers: int | None = None):
+        self.cache = _ResultCache(cache_size)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sekai-server")
+        self._methods: dict[str, Callable[[dict], Any]] = {
+            "list_engines": self.rpc_list_engines,
+            "detect": self.rpc_detect,
+            "parse": self.rpc_parse,
+            "export": self.rpc_export,
+        }
+
+    def warm(self) -> None:
+        """Instantiate every known engine now instead of on the first request."""
+        for engine_id in list_engines():
+            try:
+                get_engine(engine_id, shared=True)
+            except KeyError:
+                pass  # engine do manifesto que não carregou: aparece em discovery_errors()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # Métodos RPC (rodam no executor)
+    def rpc_list_engines(self, params: dict) -> list[str]:
+        return list_engines()
+
+    def rpc_detect(self, params: dict) -> dict:
+        from .detection import detect
+
+        found = detect(_require(params, "path", str))
+        return {"engine_id": found.engine_id, "confidence": found.confidence}
+
+    def rpc_parse(self, params: dict) -> dict:
+        path = _optional(params, "path", str)
+        encoding = _optional(params, "encoding", str)
+        with_spans = bool(params.get("with_spans", False))
+        file_path = _optional(params, "file_path", str)
+        if file_path is None:
+            file_path = path
+
+        data: bytes | None = None
+        if path is None:
+            data = _data_param(params)
+        engine_id = _optional(params, "engine_id", str) or self._detect(path, data)
+
+        options = (engine_id, encoding, with_spans, file_path)
+        if path is not None:
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                raise RpcError(SERVER_ERROR, f"cannot stat {path!r}: {e.strerror}") from None
+            key: tuple = ("path", os.path.abspath(path), st.st_mtime_ns, st.st_size, *options)
+        else:
+            key = ("data", content_hash(data), *options)
+
+        result = self.cache.get(key)
+        cached = result is not None
+        if result is None:
+            if data is None:
+                data, st = _read_with_stat(path)
+                # Chave pelo stat do descritor lido: uma escrita concorrente não
+                # deixa conteúdo novo no cache sob o mtime antigo.
+                key = ("path", os.path.abspath(path), st.st_mtime_ns, st.st_size, *options)
+            parser = _engine(engine_id)
+            result = parser.parse(data, file_path=file_path, encoding=encoding, with_spans=with_spans)
+            self.cache.put(key, result)
+
+        return {
+            "engine_id": result.engine_id,
+            "entries": _entry_dicts(result.entries),
+            "spans": result.spans,
+            "cached": cached,
+        }
+
+    def rpc_export(self, params: dict) -> dict:
+        path = _optional(params, "path", str)
+        data = _read(path) if path is not None else _data_param(params)
+        engine_id = _require(params, "engine_id", str)
+        entries = _entries_from(params.get("entries"))
+        file_path = _optional(params, "file_path", str)
+        out_path = _optional(params, "out_path", str)
+
+        exported = _engine(engine_id).export(
+            data,
+            entries,
+            file_path=path if file_path is None else file_path,
+            encoding=_optional(params, "encoding", str),
+        )
+        if out_path is not None:
+            return {"path": str(atomic_write_bytes(out_path, exported))}
+        return {"data_b64": base64.b64encode(exported).decode("ascii")}
+
+    def _detect(self, path: str | None, data: bytes | None) -> str:
+        from .detection import Detector, detect
+
+        # Sem path não há diretório para memoizar: cada buffer é avaliado sozinho.
+        found = detect(path, data) if path is not None else Detector(memoize=False).detect("data", data)
+        if found.engine_id is None:
+            raise RpcError(INVALID_PARAMS, "could not detect the engine; pass engine_id")
+        return found.engine_id
+
+    # Dispatch
+    async def handle(self, message: Any) -> dict | list | None:
+        """Answer one decoded JSON-RPC message (request, notification or batch)."""
+        if isinstance(message, list):
+            if not message:
+                return _error(None, INVALID_REQUEST, "empty batch")
+            replies = await asyncio.gather(*(self._handle_one(m) for m in message))
+            return [r for r in replies if r is not None] or None
+        return await self._handle_one(message)
+
+    async def _handle_one(self, msg: Any) -> dict | None:
+        if not isinstance(msg, dict) or msg.get("jsonrpc") != "2.0" or not isinstance(msg.get("method"), str):
+            return _error(msg.get("id") if isinstance(msg, dict) else None, INVALID_REQUEST, "invalid request")
+        req_id = msg.get("id")
+        is_notification = "id" not in msg
+
+        fn = self._methods.get(msg["method"])
+        params = msg.get("params", {})
+        try:
+            if fn is None:
+                raise RpcError(METHOD_NOT_FOUND, f"unknown method: {msg['method']}")
+            if not isinstance(params, dict):
+                raise RpcError(INVALID_PARAMS, "params must be an object")
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, fn, params)
+        except RpcError as e:
+            return None if is_notification else _error(req_id, e.code, e.message)
+        except Exception as e:
+            return None if is_notification else _error(req_id, SERVER_ERROR, f"{type(e).__name__}: {e}")
+        return None if is_notification else {"jsonrpc": "2.0", "id": req_id, "result": result}
+
+    async def _serve_stream(self, reader: asyncio.StreamReader, write: Callable[[bytes], Any]) -> None:
+        pending: set[asyncio.Task] = set()
+
+        async def answer(line: bytes) -> None:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                reply: Any = _error(None, PARSE_ERROR, "invalid JSON")
+            else:
+                reply = await self.handle(message)
+            if reply is not None:
+                # Uma linha por resposta; write() é atômico dentro do event loop.
+                try:
+                    await write(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+                except (ConnectionError, BrokenPipeError):
+                    pass  # cliente foi embora antes da resposta
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            task = asyncio.create_task(answer(line))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    # Transports
+    async def serve_unix(self, path: str | os.PathLike, *, ready: Callable[[], Any] | None = None) -> None:
+        """Serve on a Unix socket at `path` until cancelled.
+
+        The socket is created with mode 0600: requests read and write arbitrary
+        paths, so only the owner may connect. A leftover socket at `path` is
+        replaced; any other kind of file raises `FileExistsError`.
+        """
+        async def on_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            async def write(data: bytes) -> None:
+                writer.write(data)
+                await writer.drain()
+
+            try:
+                await self._serve_stream(reader, write)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            finally:
+                writer.close()
+
+        path = os.fspath(path)
+        _remove_stale_socket(path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.bind(path)
+            # Antes do listen() ninguém conecta: o socket nunca fica aberto a outros usuários.
+            os.chmod(path, 0o600)
+        except BaseException:
+            sock.close()
+            raise
+        try:
+            server = await asyncio.start_unix_server(on_client, sock=sock, limit=_LINE_LIMIT)
+            async with server:
+                if ready is not None:
+                    ready()
+                await server.serve_forever()
+        finally:
+            sock.close()
+            _remove_stale_socket(path)
+
+    async def serve_stdio(self) -> None:
+        """Serve requests from stdin, replies on stdout, until stdin closes."""
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=_LINE_LIMIT)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        out = sys.stdout.buffer
+
+        async def write(data: bytes) -> None:
+            out.write(data)
+            out.flush()
+
+        await self._serve_stream(reader, write)
+
+
+# Params
+def _require(params: dict, name: str, typ: type) -> Any:
+    value = params.get(name)
+    if not isinstance(value, typ):
+        raise RpcError(INVALID_PARAMS, f"'{name}' is required ({typ.__name__})")
+    return value
+
+
+def _optional(params: dict, name: str, typ: type) -> Any:
+    value = params.get(name)
+    if value is not None and not isinstance(value, typ):
+        raise RpcError(INVALID_PARAMS, f"'{name}' must be {typ.__name__}")
+    return value
+
+
+def _data_param(params: dict) -> bytes:
+    raw = params.get("data_b64")
+    if not isinstance(raw, str):
+        raise RpcError(INVALID_PARAMS, "pass 'path' or 'data_b64'")
+    try:
+        return base64.b64decode(raw, validate=True)
+    except ValueError:
+        raise RpcError(INVALID_PARAMS, "'data_b64' is not valid base64") from None
+
+
+def _read(path: str) -> bytes:
+    return _read_with_stat(path)[0]
+
+
+def _read_with_stat(path: str) -> tuple[bytes, os.stat_result]:
+    try:
+        with open(path, "rb") as f:
+            return f.read(), os.fstat(f.fileno())
+    except OSError as e:
+        raise RpcError(SERVER_ERROR, f"cannot read {path!r}: {e.strerror}") from None
+
+
+def _engine(engine_id: str):
+    try:
+        return get_engine(engine_id, shared=True)
+    except KeyError:
+        raise RpcError(INVALID_PARAMS, f"unknown engine: {engine_id}") from None
+
+
+def _error(req_id: Any, code: int, message: str) -> dict:
+    return {"jsonrpc": "2.0", "id": req_id, "error": {"code": code, "message": message}}
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m sekai_parsers.server", description=__doc__.split("\n\n")[0])
+    where = ap.add_mutually_exclusive_group(required=True)
+    where.add_argument("--socket", help="Unix socket path to listen on")
+    where.add_argument("--stdio", action="store_true", help="read requests from stdin, reply on stdout")
+    ap.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE, help="parse results kept in memory")
+    ap.add_argument("--workers", type=int, default=None, help="threads running parse/export jobs")
+    args = ap.parse_args(argv)
+
+    server = ParseServer(cache_size=args.cache_size, max_workers=args.workers)
+    server.warm()
+    try:
+        if args.stdio:
+            asyncio.run(server.serve_stdio())
+        else:
+            asyncio.run(server.serve_unix(args.socket))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+
+__all__ = ["DEFAULT_CACHE_SIZE", "ParseServer", "RpcError", "main"]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
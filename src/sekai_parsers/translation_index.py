@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import json
+import os
+import struct
+import sys
+from array import array
+from collections import Counter
+from collections.abc import Iterable, Iterator, Mapping
+from pathlib import Path
+
+from .api import Entry, ParseResult
+from .columnar import ColumnarParseResult, join_key, split_key
+from .utils.fs import atomic_write_bytes
+
+_INDEX_MAGIC = b"STI1"
+
+
+def split_text(text: str) -> tuple[str, str, str]:
+    """`(lead, core, trail)`: surrounding whitespace/EOL and the text between."""
+    core = text.strip()
+    if not core:
+        return text, "", ""
+    lead = text[: len(text) - len(text.lstrip())]
+    return lead, core, text[len(lead) + len(core):]
+
+
+def normalize_text(text: str) -> str:
+    """Identity used to match repeated lines across files.
+
+    Parsers already strip dialog wrappers (Musica) and `[r]`/`[cr]` tails
+    (KiriKiri) from `Entry.text`; this also drops the EOL and surrounding
+    whitespace so the same line matches wherever it appears.
+    """
+    return text.strip()
+
+
+class TranslationIndex:
+    """Every entry text across many files, with the keys where it occurs.
+
+    Unique texts are stored once; each occurrence costs three array slots (text
+    id, file id, line number) instead of an `Entry`, so millions of entries fit
+    in a few tens of MB. Translations are set per unique text and applied to
+    every occurrence with `apply()` before `export`.
+    """
+
+    def __init__(self) -> None:
+        self._texts: list[str] = []
+        self._text_ids: dict[str, int] = {}
+        self._files: list[str] = []
+        self._file_ids: dict[str, int] = {}
+        self._occ_text = array("I")
+        self._occ_file = array("I")
+        self._occ_num = array("q")
+        self._translations: dict[int, str] = {}
+        # CSR (texto -> ocorrências), montado sob demanda e descartado a cada add.
+        self._order: array | None = None
+        self._offsets: array | None = None
+
+    # Build
+    @classmethod
+    def from_results(
+        cls,
+        results: Iterable[ParseResult | ColumnarParseResult] | Mapping[str, ParseResult | ColumnarParseResult],
+    ) -> TranslationIndex:
+        """Index many results (a `BatchResult.results` mapping works as-is)."""
+        index = cls()
+        for result in results.values() if isinstance(results, Mapping) else results:
+            index.add(result)
+        return index
+
+    def add(self, result: ParseResult | ColumnarParseResult) -> None:
+        self.add_entries(result.entries if isinstance(result, ParseResult) else result)
+
+    def add_entries(self, entries: Iterable[Entry]) -> None:
+        texts, text_ids = self._texts, self._text_ids
+        files, file_ids = self._files, self._file_ids
+        occ_text, occ_file, occ_num = self._occ_text, self._occ_file, self._occ_num
+        last_prefix: str | None = None
+        fid = 0
+        for e in entries:
+            core = e.text.strip()  # normalize_text, inline no laço quente
+            if not core:
+                continue
+            tid = text_ids.get(core)
+            if tid is None:
+                tid = text_ids[core] = len(texts)
+                texts.append(core)
+            prefix, num = split_key(e.key)
+            if prefix != last_prefix:  # entries do mesmo arquivo vêm em sequência
+                fid = file_ids.get(prefix, -1)
+                if fid < 0:
+                    fid = file_ids[prefix] = len(files)
+                    files.append(prefix)
+                last_prefix = prefix
+            occ_text.append(tid)
+            occ_file.append(fid)
+            occ_num.append(num)
+        self._order = self._offsets = None
+
+    # Lookup
+    def __len__(self) -> int:
+        """Number of unique texts."""
+        return len(self._texts)
+
+    def __contains__(self, text: object) -> bool:
+        return isinstance(text, str) and normalize_text(text) in self._text_ids
+
+    @property
+    def occurrences(self) -> int:
+        return len(self._occ_text)
+
+    def texts(self) -> Iterator[str]:
+        return iter(self._texts)
+
+    def _csr(self) -> tuple[array, array]:
+        if self._order is None or self._offsets is None:
+            occ_text = self._occ_text
+            per_text = Counter(occ_text)
+            counts = array("q", bytes(8 * (len(self._texts) + 1)))
+            total = 0
+            for tid in range(len(self._texts)):
+                total += per_text[tid]
+                counts[tid + 1] = total
+            # sort estável: ocorrências de um texto ficam na ordem em que foram vistas
+            self._order = array("I", sorted(range(len(occ_text)), key=occ_text.__getitem__))
+            self._offsets = counts
+        return self._order, self._offsets
+
+    def count(self, text: str) -> int:
+        tid = self._text_ids.get(normalize_text(text))
+        if tid is None:
+            return 0
+        _order, offsets = self._csr()
+        return offsets[tid + 1] - offsets[tid]
+
+    def keys(self, text: str) -> list[str]:
+        """Every entry key whose text normalizes to `text`, in insertion order."""
+        tid = self._text_ids.get(normalize_text(text))
+        if tid is None:
+            return []
+        order, offsets = self._csr()
+        files, occ_file, occ_num = self._files, self._occ_file, self._occ_num
+        return [
+            join_key(files[occ_file[j]], occ_num[j])
+            for j in order[offsets[tid]:offsets[tid + 1]]
+        ]
+
+    def duplicates(self, min_count: int = 2) -> list[tuple[str, int]]:
+        """`(text, count)` for texts occurring at least `min_count` times, most frequent first."""
+        _order, offsets = self._csr()
+        out = [
+            (text, offsets[tid + 1] - offsets[tid])
+            for tid, text in enumerate(self._texts)
+            if offsets[tid + 1] - offsets[tid] >= min_count
+        ]
+        out.sort(key=lambda item: -item[1])
+        return out
+
+    # Translations
+    def set_translation(self, text: str, translation: str) -> int:
+        """Translate every occurrence of `text`; returns how many entries it covers."""
+        tid = self._text_ids.get(normalize_text(text))
+        if tid is None:
+            raise KeyError(text)
+        self._translations[tid] = translation
+        return self.count(text)
+
+    def update(self, translations: Mapping[str, str]) -> None:
+        for text, translation in translations.items():
+            self.set_translation(text, translation)
+
+    def translation(self, text: str) -> str | None:
+        tid = self._text_ids.get(normalize_text(text))
+        return None if tid is None else self._translations.get(tid)
+
+    def apply(self, entries: Iterable[Entry]) -> list[Entry]:
+        """Entries with translated text where the index has a translation.
+
+        The original EOL and surrounding whitespace are kept around the
+        translation; untranslated entries are returned unchanged (same objects).
+        """
+        text_ids, translations = self._text_ids, self._translations
+        out: list[Entry] = []
+        for e in entries:
+            lead, core, trail = split_text(e.text)
+            tid = text_ids.get(core)
+            tr = translations.get(tid) if tid is not None else None
+            if tr is None:
+                out.append(e)
+            else:
+                out.append(Entry(key=e.key, text=f"{lead}{tr}{trail}", speaker=e.speaker, meta=e.meta))
+        return out
+
+    # Persistence
+    def save(self, path: str | os.PathLike) -> Path:
+        """Write the index (texts, occurrences, translations) to `path` atomically."""
+        tr_ids = array("I", self._translations)
+        tr_texts = list(self._translations.values())
+        header = {
+            "byteorder": sys.byteorder,
+            "n_texts": len(self._texts),
+            "n_files": len(self._files),
+            "n_translations": len(tr_texts),
+        }
+        sections = [
+            json.dumps(header).encode("utf-8"),
+            *_pack_strings(self._texts),
+            *_pack_strings(self._files),
+            *_pack_strings(tr_texts),
+            tr_ids.tobytes(),
+            self._occ_text.tobytes(),
+            self._occ_file.tobytes(),
+            self._occ_num.tobytes(),
+        ]
+        out = [_INDEX_MAGIC, struct.pack("<I", len(sections))]
+        out += [struct.pack("<Q", len(sec)) for sec in sections]
+        out += sections
+        return atomic_write_bytes(path, b"".join(out))
+
+    @classmethod
+    def load(cls, path: str | os.PathLike) -> TranslationIndex:
+        mv = memoryview(Path(path).read_bytes())
+        if bytes(mv[:4]) != _INDEX_MAGIC:
+            raise ValueError("not a TranslationIndex file")
+        (count,) = struct.unpack_from("<I", mv, 4)
+        lens = struct.unpack_from(f"<{count}Q", mv, 8)
+        pos = 8 + 8 * count
+        sections: list[memoryview] = []
+        for n in lens:
+            sections.append(mv[pos:pos + n])
+            pos += n
+
+        header = json.loads(bytes(sections[0]))
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError("index was written with a different byte order")
+
+        index = cls()
+        index._texts = _unpack_strings(sections[1], sections[2], header["n_texts"])
+        index._files = _unpack_strings(sections[3], sections[4], header["n_files"])
+        tr_texts = _unpack_strings(sections[5], sections[6], header["n_translations"])
+        index._text_ids = {t: i for i, t in enumerate(index._texts)}
+        index._file_ids = {f: i for i, f in enumerate(index._files)}
+        index._translations = dict(zip(_arr("I", sections[7]), tr_texts, strict=True))
+        index._occ_text = _arr("I", sections[8])
+        index._occ_file = _arr("I", sections[9])
+        index._occ_num = _arr("q", sections[10])
+        return index
+
+
+def _arr(code: str, sec: memoryview) -> array:
+    a = array(code)
+    a.frombytes(sec)
+    return a
+
+
+def _pack_strings(values: list[str]) -> tuple[bytes, bytes]:
+    # NUL-joined quando possível: o load vira um único split em C.
+    if not any("\x00" in v for v in values):
+        return b"", "\x00".join(values).encode("utf-8", errors="surrogatepass")
+    return array("I", map(len, values)).tobytes(), "".join(values).encode("utf-8", errors="surrogatepass")
+
+
+def _unpack_strings(lens_sec: memoryview, blob_sec: memoryview, n: int) -> list[str]:
+    if not n:
+        return []
+    blob = str(blob_sec, "utf-8", errors="surrogatepass")
+    if not len(lens_sec):
+        return blob.split("\x00")
+    out: list[str] = []
+    p = 0
+    for size in _arr("I", lens_sec):
+        out.append(blob[p:p + size])
+        p += size
+    return out
+
+
+__all__ = ["TranslationIndex", "normalize_text", "split_text"]
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import codecs
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import BinaryIO
+
+# Amostra usada para decidir o encoding; o decode completo acontece uma vez só.
+SAMPLE_SIZE = 1 << 16
+
+_BOMS: tuple[tuple[bytes, str], ...] = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16-le-sig"),
+    (codecs.BOM_UTF16_BE, "utf-16-be-sig"),
+)
+
+# parse() seguido de export() sobre o mesmo buffer reaproveita o decode.
+_CACHE_SLOTS = 4
+_CACHE_MAX_BYTES = 16 << 20
+_CACHE: deque[tuple[bytes, tuple, str | None, Decoded]] = deque(maxlen=_CACHE_SLOTS)
+# aio, server e batch chamam decode_bytes de várias threads.
+_CACHE_LOCK = threading.Lock()
+
+
+# UTF-16 com BOM e ordem de bytes fixa, no molde do utf-8-sig: o decode tira o
+# BOM e o encode o recoloca. O "utf-16" genérico reescreveria na ordem nativa,
+# e um script BE voltaria LE.
+def _sig_codec(base: str, bom: bytes) -> codecs.CodecInfo:
+    info = codecs.lookup(base)
+
+    def encode(text: str, errors: str = "strict") -> tuple[bytes, int]:
+        return bom + info.encode(text, errors)[0], len(text)
+
+    def decode(data: bytes, errors: str = "strict") -> tuple[str, int]:
+        skip = len(bom) if bytes(data[:len(bom)]) == bom else 0
+        text, n = info.decode(memoryview(data)[skip:], errors)
+        return text, n + skip
+
+    class IncrementalEncoder(codecs.IncrementalEncoder):
+        def __init__(self, errors: str = "strict"):
+            super().__init__(errors)
+            self._inner = info.incrementalencoder(errors)
+            self._first = True
+
+        def encode(self, text: str, final: bool = False) -> bytes:
+            out = self._inner.encode(text, final)
+            if self._first and (text or final):
+                self._first = False
+                return bom + out
+            return out
+
+        def reset(self) -> None:
+            self._inner.reset()
+            self._first = True
+
+    class IncrementalDecoder(codecs.BufferedIncrementalDecoder):
+        def __init__(self, errors: str = "strict"):
+            super().__init__(errors)
+            self._inner = info.incrementaldecoder(errors)
+            self._first = True
+
+        def _buffer_decode(self, data: bytes, errors: str, final: bool) -> tuple[str, int]:
+            skip = 0
+            if self._first:
+                if len(data) < len(bom) and bom.startswith(data) and not final:
+                    return "", 0  # BOM ainda incompleto: espera mais bytes
+                self._first = False
+                skip = len(bom) if data.startswith(bom) else 0
+            return self._inner.decode(data[skip:], final), len(data)
+
+        def reset(self) -> None:
+            super().reset()
+            self._inner.reset()
+            self._first = True
+
+    return codecs.CodecInfo(
+        name=f"{base}-sig",
+        encode=encode,
+        decode=decode,
+        incrementalencoder=IncrementalEncoder,
+        incrementaldecoder=IncrementalDecoder,
+    )
+
+
+_SIG_CODECS = {
+    "utf_16_le_sig": ("utf-16-le", codecs.BOM_UTF16_LE),
+    "utf_16_be_sig": ("utf-16-be", codecs.BOM_UTF16_BE),
+}
+
+
+def _search_codec(name: str) -> codecs.CodecInfo | None:
+    spec = _SIG_CODECS.get(name.replace("-", "_"))
+    return _sig_codec(*spec) if spec else None
+
+
+codecs.register(_search_codec)
+
+
+@dataclass(frozen=True, slots=True)
+class Decoded:
+    """Result of decoding a script buffer.
+
+    `lossless` is False when the bytes had to be decoded with `errors="replace"`,
+    i.e. re-encoding the text will not reproduce the original buffer.
+    """
+    text: str
+    encoding: str
+    lossless: bool
+
+
+def bom_encoding(data: bytes) -> str | None:
+    """Return the codec implied by a leading BOM, if any."""
+    for bom, enc in _BOMS:
+        if data.startswith(bom):
+            return enc
+    return None
+
+
+def _sample_encoding(sample: bytes, candidates: tuple[str, ...], *, final: bool) -> str | None:
+    for enc in candidates:
+        try:
+            # Incremental decode tolera um caractere multibyte cortado no fim da amostra.
+            codecs.getincrementaldecoder(enc)().decode(sample, final=final)
+            return enc
+        except UnicodeDecodeError:
+            pass
+    return None
+
+
+def detect_encoding(
+    data: bytes,
+    candidates: tuple[str, ...],
+    *,
+    fallback: str,
+    sample_size: int = SAMPLE_SIZE,
+) -> str:
+    """Pick the first of `candidates` that decodes a bounded prefix of `data`.
+
+    A BOM always wins. Only `sample_size` bytes are inspected, so the answer is a
+    best guess for the rest of the buffer; `decode_bytes` verifies it.
+    """
+    enc = bom_encoding(data)
+    if enc:
+        return enc
+    final = len(data) <= sample_size
+    return _sample_encoding(data[:sample_size], candidates, final=final) or fallback
+
+
+def decode_bytes(
+    data: bytes,
+    candidates: tuple[str, ...],
+    *,
+    fallback: str,
+    encoding: str | None = None,
+) -> Decoded:
+    """Decode `data` once, detecting the encoding unless `encoding` is given.
+
+    The detected codec is verified with a single strict decode; later candidates
+    are only tried if that fails. The last few results are cached by buffer
+    identity so `export` on the same bytes skips detection and decoding.
+    """
+    key = (candidates, fallback)
+    with _CACHE_LOCK:
+        for c_data, c_key, c_enc, c_decoded in _CACHE:
+            if c_data is data and c_key == key and c_enc == encoding:
+                return c_decoded
+
+    # O decode em si roda fora do lock: threads com buffers diferentes não se esperam.
+    decoded = _decode_uncached(data, candidates, fallback=fallback, encoding=encoding)
+    if len(data) <= _CACHE_MAX_BYTES:
+        with _CACHE_LOCK:
+            _CACHE.append((data, key, encoding, decoded))
+    return decoded
+
+
+def _decode_uncached(
+    data: bytes,
+    candidates: tuple[str, ...],
+    *,
+    fallback: str,
+    encoding: str | None,
+) -> Decoded:
+    if encoding:
+        try:
+            return Decoded(data.decode(encoding), encoding, True)
+        except UnicodeDecodeError:
+            return Decoded(data.decode(encoding, errors="replace"), encoding, False)
+
+    first = detect_encoding(data, candidates, fallback=fallback)
+    if first in candidates:
+        order = candidates[candidates.index(first):]
+    else:
+        order = (first,)
+
+    for enc in order:
+        try:
+            return Decoded(data.decode(enc), enc, True)
+        except UnicodeDecodeError:
+            pass
+
+    enc = first if first not in candidates else fallback
+    return Decoded(data.decode(enc, errors="replace"), enc, False)
+
+
+def sniff_stream(
+    fp: BinaryIO,
+    candidates: tuple[str, ...],
+    *,
+    fallback: str,
+    encoding: str | None = None,
+    sample_size: int = SAMPLE_SIZE,
+) -> tuple[str, bytes]:
+    """Detect the encoding of a binary stream from its head.
+
+    Returns the encoding and the bytes consumed, which must be fed back to
+    `utils.stream.iter_decoded_lines(head=...)`.
+    """
+    head = fp.read(sample_size)
+    if encoding:
+        return encoding, head
+    enc = bom_encoding(head)
+    if enc:
+        return enc, head
+    final = len(head) < sample_size
+    return _sample_encoding(head, candidates, final=final) or fallback, head
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import os
+import stat
+import tempfile
+import threading
+from collections.abc import Callable, Sequence
+from pathlib import Path
+
+# Limite de buffers por chamada de writev (POSIX garante pelo menos 16; Linux usa 1024).
+try:
+    _IOV_MAX = max(16, os.sysconf("SC_IOV_MAX"))
+except (AttributeError, OSError, ValueError):
+    _IOV_MAX = 16
+
+
+_UMASK_LOCK = threading.Lock()
+
+
+def _umask() -> int:
+    # /proc evita o os.umask(0) temporário, que afetaria arquivos criados por outras threads.
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    with _UMASK_LOCK:
+        mask = os.umask(0o022)
+        os.umask(mask)
+    return mask
+
+
+def _target_mode(dst: Path) -> int:
+    """Mode for the file replacing `dst`: its current mode, or what `open()` would give."""
+    try:
+        return stat.S_IMODE(os.stat(dst).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_umask()
+
+
+def _atomic_write(path: str | os.PathLike, write: Callable[[int], None]) -> Path:
+    dst = Path(path)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    mode = _target_mode(dst)
+    fd, tmp = tempfile.mkstemp(dir=dst.parent, prefix=f".{dst.name}.", suffix=".tmp")
+    try:
+        try:
+            write(fd)
+            # mkstemp cria com 0600; sem isto todo arquivo exportado perderia o modo original.
+            if hasattr(os, "fchmod"):
+                os.fchmod(fd, mode)
+            else:
+                os.chmod(tmp, mode)
+        finally:
+            os.close(fd)
+        os.replace(tmp, dst)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return dst
+
+
+def atomic_write_bytes(path: str | os.PathLike, data: bytes) -> Path:
+    """Write `data` to `path` through a temp file + `os.replace`.
+
+    Readers never see a half-written file, and an interrupted write leaves the
+    previous content in place.
+    """
+    return _atomic_write(path, lambda fd: _write_all(fd, [data]))
+
+
+def atomic_write_chunks(path: str | os.PathLike, chunks: Sequence[bytes | memoryview]) -> Path:
+    """`atomic_write_bytes` for a list of buffers, written with scatter I/O.
+
+    Uses `os.writev` where available, so the chunks (e.g. from
+    `utils.text.splice_bytes`) are never joined into one buffer.
+    """
+    return _atomic_write(path, lambda fd: _write_all(fd, chunks))
+
+
+def _write_all(fd: int, chunks: Sequence[bytes | memoryview]) -> None:
+    pending = [memoryview(c).cast("B") for c in chunks if len(c)]
+    writev = getattr(os, "writev", None)
+    i = 0
+    while i < len(pending):
+        if writev is not None:
+            n = writev(fd, pending[i:i + _IOV_MAX])
+        else:
+            n = os.write(fd, pending[i])
+        # Escrita parcial: descarta os buffers completos e corta o seguinte.
+        while i < len(pending) and n >= len(pending[i]):
+            n -= len(pending[i])
+            i += 1
+        if n:
+            pending[i] = pending[i][n:]
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import re
+from typing import Any
+
+
+class LazyPattern:
+    """A `re.Pattern` stand-in that compiles on first use.
+
+    After the first attribute access the compiled pattern's attributes are cached
+    on the instance, so `rx.match(...)` costs the same as on a real pattern.
+    """
+
+    def __init__(self, pattern: str, flags: int = 0):
+        self._source = pattern
+        self._flags = flags
+        self._compiled: re.Pattern | None = None
+
+    def compiled(self) -> re.Pattern:
+        if self._compiled is None:
+            self._compiled = re.compile(self._source, self._flags)
+        return self._compiled
+
+    def __getattr__(self, name: str) -> Any:
+        # Só é chamado para atributos ausentes: depois disso fica no __dict__.
+        if name.startswith("__"):
+            raise AttributeError(name)
+        value = getattr(self.compiled(), name)
+        setattr(self, name, value)
+        return value
+
+    def __repr__(self) -> str:
+        return f"LazyPattern({self._source!r}, {self._flags!r})"
+
+
+def lazy_compile(pattern: str, flags: int = 0) -> LazyPattern:
+    """Like `re.compile`, but deferred until the pattern is first used."""
+    return LazyPattern(pattern, flags)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import codecs
+from collections.abc import Callable, Iterator
+from typing import BinaryIO
+
+# Tamanho do bloco lido do arquivo; memória fica limitada a ~1 bloco + 1 linha.
+CHUNK_SIZE = 1 << 16
+
+
+def iter_decoded_lines(
+    fp: BinaryIO,
+    encoding: str,
+    *,
+    head: bytes = b"",
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[str]:
+    """Yield lines (with their EOL) from a binary stream, like `str.splitlines(keepends=True)`.
+
+    Decoding is incremental; only the current chunk and the pending partial line
+    are kept in memory.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    pending = ""
+    raw = head or fp.read(chunk_size)
+
+    while True:
+        final = not raw
+        text = decoder.decode(raw, final=final)
+        if pending:
+            text = pending + text
+            pending = ""
+
+        if text:
+            lines = text.splitlines(keepends=True)
+            if not final:
+                # A última linha pode estar incompleta (ou terminar em "\r" com
+                # o "\n" ainda no próximo bloco); segura até o próximo read.
+                pending = lines.pop()
+            yield from lines
+
+        if final:
+            return
+        raw = fp.read(chunk_size)
+
+
+def make_line_writer(fp: BinaryIO, encoding: str) -> Callable[[str], None]:
+    """Return a `write(str)` that encodes incrementally into `fp`."""
+    encoder = codecs.getincrementalencoder(encoding)(errors="replace")
+
+    def write(s: str) -> None:
+        if s:
+            fp.write(encoder.encode(s))
+
+    return write
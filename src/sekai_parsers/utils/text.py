@@ -1,5 +1,198 @@
 from __future__ import annotations
 
+import codecs
+import hashlib
+from bisect import bisect_left
+from collections.abc import Callable, Mapping, Sequence
+from itertools import accumulate
+from operator import itemgetter
+
+from .. import instrument
+from ..api import ByteSpans, Entry, SpanIndex
+from ..errors import ParserError
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
 
 def normalize_newlines(text: str) -> str:
     return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+@instrument.hot("splice", nbytes_arg=0)
+def splice_spans(
+    text: str,
+    by_key: Mapping[str, Entry],
+    spans: SpanIndex,
+    render: Callable[[str, Entry], str],
+) -> str:
+    """Rebuild `text` replacing each span in `spans` whose key is in `by_key`.
+
+    `render(original_segment, entry)` produces the replacement. Cost is proportional
+    to the number of entries, not to the number of lines in the file.
+    """
+    edits: list[tuple[int, int, Entry]] = []
+    for key, ent in by_key.items():
+        span = spans.get(key)
+        if span is not None:
+            edits.append((span[0], span[1], ent))
+    edits.sort(key=itemgetter(0))
+
+    out: list[str] = []
+    pos = 0
+    for start, end, ent in edits:
+        if start < pos or end > len(text):
+            raise ParserError("span index does not match the original text")
+        out.append(text[pos:start])
+        out.append(render(text[start:end], ent))
+        pos = end
+    out.append(text[pos:])
+    return "".join(out)
+
+
+# Codecs sem estado em que os bytes \n e \r só aparecem como fim de linha (nunca
+# dentro de um caractere multibyte): as linhas em bytes e em str coincidem.
+_BYTE_SPLICE_CODECS = frozenset(
+    {"ascii", "utf-8", "utf-8-sig", "cp932", "shift_jis", "euc_jp", "iso8859-1", "cp1252"}
+)
+
+
+def byte_spans_for(
+    data: bytes,
+    text: str,
+    lines: Sequence[str],
+    spans: SpanIndex,
+    encoding: str,
+) -> ByteSpans | None:
+    """Translate line `spans` (offsets in `text`) into offsets in `data`.
+
+    `text`/`lines` are the decode of `data` and its `splitlines(keepends=True)`.
+    Returns None when byte-level splicing would be unsafe: a lossy decode
+    (replacement characters), a codec outside `_BYTE_SPLICE_CODECS`, or line
+    separators that only `str.splitlines` knows about (U+2028, \x85, ...).
+    """
+    try:
+        name = codecs.lookup(encoding).name
+    except LookupError:
+        return None
+    if name not in _BYTE_SPLICE_CODECS or "\ufffd" in text:
+        return None
+
+    skip = 0
+    if name == "utf-8-sig":
+        name = "utf-8"
+        if data.startswith(codecs.BOM_UTF8):
+            skip = len(codecs.BOM_UTF8)
+    blines = data[skip:].splitlines(keepends=True) if skip else data.splitlines(keepends=True)
+    if len(blines) != len(lines):
+        return None
+
+    cstarts = [0, *accumulate(map(len, lines))]
+    bstarts = list(accumulate(map(len, blines), initial=skip))
+    out: SpanIndex = {}
+    for key, (start, end) in spans.items():
+        i = bisect_left(cstarts, start)
+        if i >= len(lines) or cstarts[i] != start or cstarts[i + 1] != end:
+            return None  # span que não é exatamente uma linha
+        out[key] = (bstarts[i], bstarts[i + 1])
+    return ByteSpans(name, out)
+
+
+@instrument.hot("splice", nbytes_arg=0)
+def splice_bytes(
+    data: bytes,
+    by_key: Mapping[str, Entry],
+    byte_spans: ByteSpans,
+    render: Callable[[str, Entry], str],
+) -> list[bytes | memoryview]:
+    """Chunks of `data` with the line of each entry in `by_key` re-rendered.
+
+    Only the replaced lines are decoded and encoded; everything else is a
+    `memoryview` slice of `data`, so unchanged bytes are copied verbatim (or not
+    at all, when the chunks go to `os.writev`). `b"".join(chunks)` is the file.
+    """
+    enc = byte_spans.encoding
+    spans = byte_spans.spans
+    edits: list[tuple[int, int, Entry]] = []
+    for key, ent in by_key.items():
+        span = spans.get(key)
+        if span is not None:
+            edits.append((span[0], span[1], ent))
+    edits.sort(key=itemgetter(0))
+
+    mv = memoryview(data)
+    out: list[bytes | memoryview] = []
+    pos = 0
+    for start, end, ent in edits:
+        if start < pos or end > len(data):
+            raise ParserError("byte span index does not match the original data")
+        if start > pos:
+            out.append(mv[pos:start])
+        line = str(mv[start:end], enc)
+        out.append(render(line, ent).encode(enc, errors="replace"))
+        pos = end
+    if pos < len(data):
+        out.append(mv[pos:])
+    return out
+
+
+def common_line_affixes(old: Sequence[str], new: Sequence[str]) -> tuple[int, int]:
+    """Number of leading and trailing lines shared by `old` and `new` (never overlapping)."""
+    limit = min(len(old), len(new))
+    head = 0
+    while head < limit and old[head] == new[head]:
+        head += 1
+    tail = 0
+    while tail < limit - head and old[-1 - tail] == new[-1 - tail]:
+        tail += 1
+    return head, tail
+
+
+def entry_line_indices(entries: Sequence[Entry]) -> list[int] | None:
+    """`meta["line_index"]` of each entry, or None if any entry lacks it."""
+    out: list[int] = []
+    for e in entries:
+        li = (e.meta or {}).get("line_index")
+        if not isinstance(li, int):
+            return None
+        out.append(li)
+    return out
+
+
+def shift_entries(
+    entries: Sequence[Entry],
+    *,
+    file_path: str | None,
+    key_offset: int,
+    line_offset: int,
+) -> list[Entry]:
+    """Re-key entries reused from a previous parse after lines were inserted/removed.
+
+    Keys `<file_path>:<n>` become `<file_path>:<n + key_offset>` and
+    `meta["line_index"]` moves by `line_offset`. Untouched entries are returned as is.
+    """
+    prefix = file_path or "file"
+    if not key_offset and not line_offset and (
+        not entries or entries[0].key.rpartition(":")[0] == prefix
+    ):
+        return list(entries)
+
+    out: list[Entry] = []
+    for e in entries:
+        old_prefix, _, num = e.key.rpartition(":")
+        if not key_offset and not line_offset and old_prefix == prefix:
+            out.append(e)
+            continue
+        meta = e.meta
+        if line_offset and meta is not None:
+            meta = {**meta, "line_index": meta["line_index"] + line_offset}
+        out.append(
+            Entry(
+                key=f"{prefix}:{int(num) + key_offset}",
+                text=e.text,
+                speaker=e.speaker,
+                meta=meta,
+            )
+        )
+    return out
@@ -0,0 +1,311 @@
+"""Round-trip checks: `export(parse(data), unchanged) == data`, file by file.
+
+    from sekai_parsers.verify import verify_roundtrip
+
+    report = verify_roundtrip("game/scripts", "musica.sc", workers=8)
+    for m in report.mismatches:
+        print(f"{m.path}:{m.line} ({m.key}): {m.expected!r} -> {m.actual!r}")
+    report.raise_for_mismatch()  # RoundTripError if any file differs
+
+`check_export` is the check behind `export(..., strict=True)`, and
+`check_entries` validates translated text against the target encoding before
+any file is touched.
+"""
+from __future__ import annotations
+
+import codecs
+import os
+import threading
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from functools import cache
+from pathlib import Path
+
+from .api import Entry, Parser, ParseResult
+from .batch import FileError, _by_size_desc, _chunks, _resolve_workers, _run, iter_script_files
+from .engine_registry import get_engine
+from .errors import RoundTripError
+
+# Bloco comparado de uma vez ao procurar o primeiro byte diferente.
+_DIFF_BLOCK = 1 << 16
+
+
+@dataclass(frozen=True, slots=True)
+class RoundTripMismatch:
+    """First difference between a file and its unchanged re-export.
+
+    `line` is 1-based; `expected`/`actual` are that line in the original and in
+    the export. `key` is the entry parsed from that line, if any.
+    """
+    path: str
+    offset: int
+    line: int
+    key: str | None
+    expected: bytes
+    actual: bytes
+
+    def __str__(self) -> str:
+        where = f"{self.path}:{self.line}" + (f" ({self.key})" if self.key else "")
+        return f"{where}: expected {self.expected!r}, got {self.actual!r}"
+
+
+@dataclass(slots=True)
+class VerifyReport:
+    """Outcome of `verify_roundtrip`.
+
+    - `checked` counts files that were parsed and re-exported.
+    - `mismatches` lists files whose export differs, sorted by path.
+    - `errors` lists files that failed to read, parse or export.
+    """
+    checked: int = 0
+    mismatches: list[RoundTripMismatch] = field(default_factory=list)
+    errors: list[FileError] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.mismatches and not self.errors
+
+    def raise_for_mismatch(self) -> None:
+        if self.mismatches:
+            more = len(self.mismatches) - 1
+            raise RoundTripError(str(self.mismatches[0]) + (f" (and {more} more files)" if more else ""))
+
+
+@dataclass(frozen=True, slots=True)
+class EncodingProblem:
+    """An entry whose text would not survive export.
+
+    `chars` are the offending characters, in order of first appearance: either
+    not representable in the encoding (export writes `?`) or reserved by the
+    profile's `char_map` (they would read back as another letter).
+    """
+    key: str
+    chars: tuple[str, ...]
+
+
+# Encodability
+class _Repertoire:
+    """Characters known to be safe/unsafe for one (encoding, char_map).
+
+    Filled lazily: each distinct character is encoded once, ever, so checking
+    millions of entries costs one `issuperset` per entry. Shared between
+    threads: `classify` publishes new `ok`/`bad` sets under a lock instead of
+    mutating the ones readers may be iterating.
+    """
+
+    __slots__ = ("encoding", "table", "ok", "bad", "_lock")
+
+    def __init__(self, encoding: str, char_map: tuple[tuple[str, str], ...]):
+        self.encoding = encoding
+        self.table = str.maketrans(dict(char_map)) if char_map else {}
+        self.ok: frozenset[str] = frozenset()
+        # Destinos do char_map ("&" para "ç"...) voltam como a letra no parse.
+        self.bad: frozenset[str] = frozenset(
+            {v for _k, v in char_map if len(v) == 1} - {k for k, _v in char_map}
+        )
+        self._lock = threading.Lock()
+
+    def classify(self, chars: set[str]) -> None:
+        enc, table = self.encoding, self.table
+        with self._lock:
+            new_ok: set[str] = set()
+            new_bad: set[str] = set()
+            for ch in chars - self.ok - self.bad:
+                try:
+                    ch.translate(table).encode(enc)
+                except UnicodeEncodeError:
+                    new_bad.add(ch)
+                else:
+                    new_ok.add(ch)
+            if new_ok:
+                self.ok = self.ok | new_ok
+            if new_bad:
+                self.bad = self.bad | new_bad
+
+
+@cache
+def _repertoire(encoding: str, char_map: tuple[tuple[str, str], ...]) -> _Repertoire:
+    return _Repertoire(encoding, char_map)
+
+
+def check_entries(
+    entries: Iterable[Entry],
+    engine_id: str,
+    encoding: str,
+) -> list[EncodingProblem]:
+    """Entries whose text cannot be exported faithfully in `encoding`.
+
+    Uses the engine's profile `char_map` (Musica) the way `export` does, so a
+    letter the map covers passes and one it misses is reported. The known-good
+    and known-bad character sets are cached per (encoding, char_map) across
+    calls. Empty result means the export will not write any `?`.
+    """
+    profile = getattr(get_engine(engine_id, shared=True), "profile", None)
+    rep = _repertoire(codecs.lookup(encoding).name, tuple(getattr(profile, "char_map", ())))
+    ok, bad = rep.ok, rep.bad
+
+    problems: list[EncodingProblem] = []
+    for e in entries:
+        text = e.text
+        if ok.issuperset(text):
+            continue
+        chars = set(text)
+        unknown = chars - ok - bad
+        if unknown:
+            rep.classify(unknown)
+            ok, bad = rep.ok, rep.bad
+        if chars.isdisjoint(bad):
+            continue
+        problems.append(EncodingProblem(e.key, tuple(dict.fromkeys(ch for ch in text if ch in bad))))
+    return problems
+
+
+# Diff
+def first_difference(a: bytes, b: bytes) -> int:
+    """Offset of the first byte where `a` and `b` differ (`min(len)` if one is a prefix)."""
+    n = min(len(a), len(b))
+    ma, mb = memoryview(a), memoryview(b)
+    pos = 0
+    # Blocos inteiros via memcmp; byte a byte só dentro do bloco que difere.
+    while pos < n:
+        end = min(pos + _DIFF_BLOCK, n)
+        if ma[pos:end] != mb[pos:end]:
+            return next(i for i in range(pos, end) if a[i] != b[i])
+        pos = end
+    return n
+
+
+def _line_bounds(data: bytes, offset: int, nl: bytes) -> tuple[int, int]:
+    start = data.rfind(nl, 0, offset) + 1
+    end = data.find(nl, offset)
+    return start, len(data) if end < 0 else end + 1
+
+
+def _mismatch(path: str, data: bytes, out: bytes, result: ParseResult) -> RoundTripMismatch:
+    offset = first_difference(data, out)
+    nl = b"\n" if b"\n" in data else b"\r"
+    line = data.count(nl, 0, offset) + 1
+    key = next(
+        (e.key for e in result.entries if e.meta and e.meta.get("line_index") == line - 1),
+        None,
+    )
+    start, end = _line_bounds(data, offset, nl)
+    out_start, out_end = _line_bounds(out, offset, nl)
+    return RoundTripMismatch(path, offset, line, key, data[start:end], out[out_start:out_end])
+
+
+def check_file(
+    parser: Parser,
+    data: bytes,
+    *,
+    file_path: str,
+    encoding: str | None = None,
+    result: ParseResult | None = None,
+) -> RoundTripMismatch | None:
+    """Parse `data`, export it unchanged and return the first difference, if any.
+
+    Pass `result` when `data` was already parsed with the same arguments.
+    """
+    if result is None:
+        result = parser.parse(data, file_path=file_path, encoding=encoding)
+    out = parser.export(data, result.entries, file_path=file_path, encoding=encoding)
+    if out == data:
+        return None
+    return _mismatch(file_path, data, out, result)
+
+
+def check_export(
+    parser: Parser,
+    data: bytes,
+    out: bytes,
+    entries: Sequence[Entry],
+    *,
+    file_path: str | None = None,
+    encoding: str | None = None,
+) -> None:
+    """Raise `RoundTripError` unless `parse(out)` reads back what was exported.
+
+    Every entry in `entries` must come back with the same text (up to the line
+    ending the parser keeps in `text`), and `out` must have as many entries as
+    `data`: an edit that cannot be encoded, or that the parser would read as
+    markup, fails here instead of shipping.
+    """
+    before = parser.parse(data, file_path=file_path, encoding=encoding).entries
+    after = parser.parse(out, file_path=file_path, encoding=encoding).entries
+    where = file_path or "<data>"
+    if len(after) != len(before):
+        raise RoundTripError(f"{where}: export has {len(after)} entries, source has {len(before)}")
+    by_key = {e.key: e for e in after}
+    for e in entries:
+        got = by_key.get(e.key)
+        if got is None:
+            raise RoundTripError(f"{where}: entry {e.key!r} is missing from the export")
+        expected = e.text.rstrip("\r\n")
+        # KiriKiri: um texto que já traz o "[r]" do kk_tail não o recebe de novo.
+        tail = (e.meta or {}).get("kk_tail")
+        if tail and expected.endswith(tail):
+            expected = expected[:-len(tail)]
+        if got.text.rstrip("\r\n") != expected:
+            raise RoundTripError(f"{where}: entry {e.key!r} wrote {e.text!r} but reads back {got.text!r}")
+
+
+# Worker (roda no processo filho; precisa ser função de módulo)
+def _verify_chunk(engine_id: str, encoding: str | None, paths: list[str]) -> list[tuple]:
+    parser = get_engine(engine_id, shared=True)
+    out: list[tuple] = []
+    for path in paths:
+        try:
+            data = Path(path).read_bytes()
+            out.append((path, check_file(parser, data, file_path=path, encoding=encoding), None))
+        except Exception as e:
+            out.append((path, None, repr(e)))
+    return out
+
+
+def verify_roundtrip(
+    paths: str | os.PathLike | Iterable[str | os.PathLike],
+    engine_id: str,
+    *,
+    workers: int | None = None,
+    encoding: str | None = None,
+) -> VerifyReport:
+    """Check that every script in `paths` survives an unchanged parse + export.
+
+    `paths` is a directory (searched recursively for the engine's extensions)
+    or an iterable of files. Files run in a process pool (`workers=1` runs
+    in-process); only mismatching files are diffed, and only up to the first
+    differing byte.
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        root = Path(paths)
+        files = [(root / rel).as_posix() for rel in iter_script_files(root, get_engine(engine_id).extensions)]
+    else:
+        files = [Path(p).as_posix() for p in paths]
+
+    n = _resolve_workers(workers)
+    chunks = _chunks(_by_size_desc(Path("."), files), n)
+
+    report = VerifyReport()
+    for path, mismatch, err in _run(_verify_chunk, (engine_id, encoding), chunks, n):
+        if err is not None:
+            report.errors.append(FileError(path, err))
+            continue
+        report.checked += 1
+        if mismatch is not None:
+            report.mismatches.append(mismatch)
+
+    report.mismatches.sort(key=lambda m: m.path)
+    report.errors.sort(key=lambda e: e.path)
+    return report
+
+
+__all__ = [
+    "EncodingProblem",
+    "RoundTripMismatch",
+    "VerifyReport",
+    "check_entries",
+    "check_export",
+    "check_file",
+    "first_difference",
+    "verify_roundtrip",
+]
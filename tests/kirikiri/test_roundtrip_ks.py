@@ -1,8 +1,20 @@
 from __future__ import annotations
 
+import codecs
+import io
+import random
+import re
 from pathlib import Path
 
-from sekai_parsers.engines.kirikiri.ks_parser import KiriKiriKsParser
+from sekai_parsers.engines.kirikiri.ks_model import text_spans
+from sekai_parsers.engines.kirikiri.ks_parser import (
+    DEFAULT_PROFILE,
+    KiriKiriKsParser,
+    KiriKiriProfile,
+    _sequential_classifier,
+    line_classifier,
+)
+from sekai_parsers.engines.kirikiri.profiles.yandere import YANDERE_PROFILE
 
 
 def test_roundtrip_fixture():
@@ -35,3 +47,174 @@ def test_translation_edit_applies_and_keeps_structure():
     out = parser.export(data, parsed.entries)
     assert b"A couple days later" in out
     assert b"[cn name=" in out
+
+
+def test_parse_stream_and_export_stream_match_in_memory_api():
+    parser = KiriKiriKsParser()
+    p = Path(__file__).parent.parent / "fixtures" / "forbidden_love_wife_sister" / "01_01_01.ks"
+    data = p.read_bytes()
+
+    with p.open("rb") as fp:
+        streamed = list(parser.parse_stream(fp, file_path="x.ks"))
+    assert streamed == parser.parse(data, file_path="x.ks").entries
+
+    e0 = streamed[0]
+    lookup = {e0.key: type(e0)(key=e0.key, speaker=e0.speaker, meta=e0.meta, text="Later.\n")}
+    out = io.BytesIO()
+    with p.open("rb") as fp:
+        parser.export_stream(fp, out, lookup, file_path="x.ks")
+    assert out.getvalue() == parser.export(data, list(lookup.values()), file_path="x.ks")
+
+
+def test_utf16_bom_fixture_roundtrips():
+    parser = KiriKiriKsParser()
+    data = (Path(__file__).parent / "fixtures" / "01_01_01.ks").read_bytes()
+
+    parsed = parser.parse(data, file_path="01_01_01.ks")
+    assert parsed.entries[0].speaker == "ト書き"
+    assert parser.export(data, parsed.entries, file_path="01_01_01.ks") == data
+
+
+def test_utf16_be_bom_roundtrips_in_big_endian():
+    parser = KiriKiriKsParser()
+    data = codecs.BOM_UTF16_BE + "[cn name=\"A\"]\r\n「テスト」[r]\r\n".encode("utf-16-be")
+
+    parsed = parser.parse(data, file_path="be.ks")
+    assert parsed.entries[0].text == "「テスト」\r\n"
+    assert parser.export(data, parsed.entries, file_path="be.ks") == data
+
+    e0 = parsed.entries[0]
+    edited = [type(e0)(key=e0.key, speaker=e0.speaker, meta=e0.meta, text="Teste\r\n")]
+    out = parser.export(data, edited, file_path="be.ks")
+    assert out.startswith(codecs.BOM_UTF16_BE)
+    assert out == codecs.BOM_UTF16_BE + "[cn name=\"A\"]\r\nTeste[r]\r\n".encode("utf-16-be")
+
+    streamed = io.BytesIO()
+    parser.export_stream(io.BytesIO(data), streamed, {e.key: e for e in edited}, file_path="be.ks")
+    assert streamed.getvalue() == out
+
+
+def test_explicit_encoding_is_used_for_parse_and_export():
+    parser = KiriKiriKsParser()
+    data = "[cn name=\"A\"]\r\n「テスト」[r]\r\n".encode("cp932")
+
+    parsed = parser.parse(data, encoding="cp932")
+    assert parsed.entries[0].text == "「テスト」\r\n"
+    assert parser.export(data, parsed.entries, encoding="cp932") == data
+
+
+def test_export_with_span_index_matches_full_export():
+    parser = KiriKiriKsParser()
+    p = Path(__file__).parent.parent / "fixtures" / "forbidden_love_wife_sister" / "01_01_01.ks"
+    data = p.read_bytes()
+
+    parsed = parser.parse(data, file_path="x.ks", with_spans=True)
+    assert set(parsed.spans) == {e.key for e in parsed.entries}
+
+    edited = [
+        type(e)(key=e.key, speaker=e.speaker, meta=e.meta, text=e.text.upper())
+        for e in parsed.entries[::3]
+    ]
+    full = parser.export(data, edited, file_path="x.ks")
+    assert parser.export(data, edited, file_path="x.ks", spans=parsed.spans) == full
+    assert parser.export(data, parsed.entries, spans=parsed.spans) == data
+
+    spans = text_spans(parsed)
+    assert [s.key for s in spans] == [e.key for e in parsed.entries]
+    text = data.decode("utf-8")
+    assert text[spans[0].start:spans[0].end].startswith(parsed.entries[0].text.rstrip("\r\n"))
+
+
+def test_byte_span_export_matches_full_export():
+    parser = KiriKiriKsParser()
+    p = Path(__file__).parent.parent / "fixtures" / "forbidden_love_wife_sister" / "01_01_01.ks"
+    for data in (p.read_bytes(), b"\xef\xbb\xbf" + p.read_bytes()):
+        parsed = parser.parse(data, file_path="x.ks", with_spans=True)
+        assert parsed.byte_spans is not None
+        assert parsed.byte_spans.encoding == "utf-8"
+
+        edited = [
+            type(e)(key=e.key, speaker=e.speaker, meta=e.meta, text="Tradução " + e.text)
+            for e in parsed.entries[::3]
+        ]
+        full = parser.export(data, edited, file_path="x.ks")
+        assert parser.export(data, edited, byte_spans=parsed.byte_spans) == full
+        assert parser.export(data, parsed.entries, byte_spans=parsed.byte_spans) == data
+
+        chunks = parser.export_chunks(data, edited[:1], parsed.byte_spans)
+        assert sum(isinstance(c, memoryview) for c in chunks) == len(chunks) - 1
+
+
+def test_byte_spans_are_skipped_when_byte_lines_differ():
+    parser = KiriKiriKsParser()
+    utf16 = (Path(__file__).parent / "fixtures" / "01_01_01.ks").read_bytes()
+    exotic = "Line one\u2028still one for bytes\nTwo\n".encode("utf-8")
+    lossy = b"Line \xff\nTwo\n"
+
+    for data, encoding in ((utf16, None), (exotic, None), (lossy, "ascii")):
+        parsed = parser.parse(data, encoding=encoding, with_spans=True)
+        assert parsed.spans is not None
+        assert parsed.byte_spans is None
+
+
+def test_parse_incremental_matches_full_parse_on_random_edits():
+    parser = KiriKiriKsParser()
+    p = Path(__file__).parent.parent / "fixtures" / "forbidden_love_wife_sister" / "01_01_01.ks"
+    base = p.read_text(encoding="utf-8").splitlines(keepends=True)
+    pool = base + ['[cn name="Novo"]\n', "Inserted line.[r]\n", "; comment\n", "\n"]
+    rng = random.Random(1234)
+
+    old_lines = list(base)
+    old_data = "".join(old_lines).encode()
+    old = parser.parse(old_data, file_path="x.ks", with_spans=True)
+    for _ in range(60):
+        new_lines = list(old_lines)
+        for _ in range(rng.randint(1, 3)):
+            i = rng.randrange(len(new_lines) + 1)
+            op = rng.choice(("ins", "del", "sub"))
+            if op == "ins" or not new_lines:
+                new_lines.insert(i, rng.choice(pool))
+            elif op == "del":
+                del new_lines[min(i, len(new_lines) - 1)]
+            else:
+                new_lines[min(i, len(new_lines) - 1)] = rng.choice(pool)
+        new_data = "".join(new_lines).encode()
+
+        inc = parser.parse_incremental(old, old_data, new_data, file_path="x.ks")
+
+        assert inc == parser.parse(new_data, file_path="x.ks", with_spans=True)
+        old, old_data, old_lines = inc, new_data, new_lines
+
+
+def test_parse_incremental_reuses_unchanged_entries():
+    parser = KiriKiriKsParser()
+    p = Path(__file__).parent.parent / "fixtures" / "forbidden_love_wife_sister" / "01_01_01.ks"
+    data = p.read_bytes()
+    old = parser.parse(data)
+    new_data = data.replace(b"A few days later", b"Some days later", 1)
+
+    inc = parser.parse_incremental(old, data, new_data)
+
+    assert inc.entries[0].text.startswith("　Some days later")
+    assert all(a is b for a, b in zip(inc.entries[1:], old.entries[1:], strict=True))
+
+
+def test_combined_classifier_matches_sequential_checks():
+    unanchored = KiriKiriProfile(
+        id="unanchored",
+        speaker_tag=re.compile(r"【([^】]+)】|name=(\w+)"),
+        rx_comment=re.compile(r"\s*;"),
+        rx_label=re.compile(r"\s*\*"),
+        rx_tag_only=re.compile(r"^\s*(?:\[[^\]]+\]\s*)+$"),
+    )
+    samples = [
+        "; comment", "*label|skip", '[cn name="Alice"]', '[CN NAME="Bob" x]', '[P_NAME s_cn="Yui"]',
+        "[r]", "[wait time=10][r]", "Hello.[r]", "【Alice】Hello", "text name=Bob", "[l][p]tail",
+        "plain text", "[unterminated", '[cn name=""]',
+    ]
+    rng = random.Random(7)
+    samples += ["".join(rng.choice(samples)) + rng.choice(["", "[r]", " ;", "*"]) for _ in range(200)]
+    for profile in (DEFAULT_PROFILE, YANDERE_PROFILE, unanchored):
+        combined, sequential = line_classifier(profile), _sequential_classifier(profile)
+        for s in samples:
+            assert combined(s) == sequential(s), (profile.id, s)
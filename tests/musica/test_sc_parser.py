@@ -1,6 +1,16 @@
 from __future__ import annotations
 
-from sekai_parsers.engines.musica.sc_parser import MusicaScParser
+import io
+import random
+import re
+import time
+
+from sekai_parsers.engines.musica.sc_parser import (
+    _RX_MESSAGE,
+    MusicaProfile,
+    MusicaScParser,
+    _parse_rest_prefix_speaker_and_body,
+)
 
 
 def test_roundtrip_preserves_original_bytes_for_unmodified_script():
@@ -42,3 +52,217 @@ def test_translation_edit_reencodes_custom_portuguese_map_and_preserves_suffix()
     out_text = out.decode("cp932")
     assert "&$^%)(" in out_text
     assert out_text.endswith("\\a\r\n")
+
+
+def test_profile_char_map_replaces_default_table():
+    parser = MusicaScParser(MusicaProfile(id="es", char_map=(("ñ", "~"), ("¿", "#"))))
+    data = ".message 0 001-01 @Hero 「#Qu~e?」\\a\r\n".encode("cp932")
+
+    parsed = parser.parse(data, file_path="scene.sc")
+    assert parsed.entries[0].text == "¿Quñe?"
+
+    e0 = parsed.entries[0]
+    parsed.entries[0] = type(e0)(key=e0.key, speaker=e0.speaker, meta=e0.meta, text="¿Año?")
+    out_text = parser.export(data, parsed.entries, file_path="scene.sc").decode("cp932")
+    assert "「#A~o?」" in out_text
+
+
+def test_parse_stream_and_export_stream_match_in_memory_api():
+    parser = MusicaScParser()
+    text = (
+        ".stage bg001\r\n"
+        ".message 0 001-01 @Hero 「Ola」\\a\r\n"
+        ".message 0 001-02 「Narration」\r\n"
+    )
+    data = text.encode("cp932")
+
+    streamed = list(parser.parse_stream(io.BytesIO(data), file_path="scene.sc"))
+    assert streamed == parser.parse(data, file_path="scene.sc").entries
+
+    e0 = streamed[0]
+    lookup = {e0.key: type(e0)(key=e0.key, speaker=e0.speaker, meta=e0.meta, text="Oi")}
+    out = io.BytesIO()
+    parser.export_stream(io.BytesIO(data), out, lookup, file_path="scene.sc")
+    assert out.getvalue() == parser.export(data, list(lookup.values()), file_path="scene.sc")
+
+
+def test_export_with_span_index_matches_full_export():
+    parser = MusicaScParser()
+    text = (
+        ".stage bg001\r\n"
+        ".message 0 001-01 @Hero 「Ola」\\a\r\n"
+        ".se 3\r\n"
+        ".message 0 001-02 「Narration」\r\n"
+    )
+    data = text.encode("cp932")
+
+    parsed = parser.parse(data, file_path="scene.sc", with_spans=True)
+    e1 = parsed.entries[1]
+    edited = [type(e1)(key=e1.key, speaker=e1.speaker, meta=e1.meta, text="Narração")]
+
+    full = parser.export(data, edited, file_path="scene.sc")
+    assert parser.export(data, edited, file_path="scene.sc", spans=parsed.spans) == full
+    assert parser.export(data, parsed.entries, file_path="scene.sc", spans=parsed.spans) == data
+
+
+def test_byte_span_export_leaves_unchanged_bytes_untouched():
+    parser = MusicaScParser()
+    text = (
+        ".stage bg001\r\n"
+        ".message 0 001-01 @Hero 「Ola」\\a\r\n"
+        ".se 3 ∵\r\n"
+        ".message 0 001-02 「Narration」\r\n"
+    )
+    # 0xFA 0x9A e 0xED 0xEF são o mesmo "∵" em cp932: decode+encode não preserva o byte.
+    data = text.encode("cp932").replace("∵".encode("cp932"), b"\xfa\x9a")
+    assert data.decode("cp932").encode("cp932") != data
+
+    parsed = parser.parse(data, file_path="scene.sc", with_spans=True)
+    assert parsed.byte_spans is not None
+    e1 = parsed.entries[1]
+    edited = [type(e1)(key=e1.key, speaker=e1.speaker, meta=e1.meta, text="Narração")]
+
+    out = parser.export(data, edited, byte_spans=parsed.byte_spans)
+    assert out.startswith(data[: data.index(b".message 0 001-02")])
+    assert out.endswith("「Narra&^o」\r\n".encode("cp932"))
+    assert parser.export(data, parsed.entries, byte_spans=parsed.byte_spans) == data
+
+
+def test_prefiltered_parse_matches_full_parse():
+    parser = MusicaScParser()
+    pieces = [
+        ".message 0 001-01 @Hero 「Ola」\\a", "  .message 1 x 「a」", "[ch].message 0 002-01 \"Oi\"",
+        "; .message 0 1-1 「c」", ".stage bg", "ソ.message", "表", " ", "", ".message", ".message 0 \\w\\a",
+        ".messagex 0 1 a", "x.message 0 1 t", "\x0b", "\u2028",
+    ]
+    eols = ["\n", "\r\n", "\r", ""]
+    rng = random.Random(21)
+    for _ in range(1500):
+        text = "".join(rng.choice(pieces) + rng.choice(eols) for _ in range(rng.randint(0, 12)))
+        for enc in ("utf-8", "cp932"):
+            try:
+                data = text.encode(enc)
+            except UnicodeEncodeError:
+                continue
+            for explicit in (None, enc):
+                # with_spans=True sempre passa pelo parse completo (linha a linha).
+                full = parser.parse(data, file_path="f.sc", encoding=explicit, with_spans=True)
+                fast = parser.parse(data, file_path="f.sc", encoding=explicit)
+                assert fast.entries == full.entries, (text, enc, explicit)
+
+
+def test_parse_incremental_matches_full_parse_on_random_edits():
+    parser = MusicaScParser()
+    pool = [
+        ".stage bg001\r\n",
+        ".message 0 001-01 @Hero 「Ola」\\a\r\n",
+        ".message 0 \\w\\a\r\n",
+        ".message 1 002-07 「Narration」\r\n",
+        "; .message 0 001-09 「comentario」\r\n",
+        ".se 3\r\n",
+    ]
+    rng = random.Random(99)
+    old_lines = [rng.choice(pool) for _ in range(40)]
+    old_data = "".join(old_lines).encode("cp932")
+    old = parser.parse(old_data, file_path="s.sc", with_spans=True)
+
+    for _ in range(60):
+        new_lines = list(old_lines)
+        i = rng.randrange(len(new_lines))
+        op = rng.choice(("ins", "del", "sub"))
+        if op == "ins":
+            new_lines.insert(i, rng.choice(pool))
+        elif op == "del" and len(new_lines) > 1:
+            del new_lines[i]
+        else:
+            new_lines[i] = rng.choice(pool)
+        new_data = "".join(new_lines).encode("cp932")
+
+        inc = parser.parse_incremental(old, old_data, new_data, file_path="s.sc")
+
+        assert inc == parser.parse(new_data, file_path="s.sc", with_spans=True)
+        old, old_data, old_lines = inc, new_data, new_lines
+
+
+# Implementação anterior (regex), mantida só como referência para o teste diferencial.
+_OLD_RX_SUFFIX = re.compile(r"(?s)^(.*?)(\\(?:[A-Za-z]+[0-9]*))(\\(?:[A-Za-z]+[0-9]*))*?(\s*)$")
+_OPENERS = ("\x81", '"', "“", "「", "『")
+
+
+def _old_split_suffix(text):
+    if not text:
+        return text, ""
+    m = _OLD_RX_SUFFIX.match(text)
+    if not m:
+        return text, ""
+    body = m.group(1) or ""
+    return body, text[len(body):]
+
+
+def _old_is_id_like(tok):
+    return bool(tok and "-" in tok and any(ch.isdigit() for ch in tok))
+
+
+def _old_parse_rest(rest):
+    rest_no_nl = rest.rstrip("\r\n")
+    lead_ws = rest_no_nl[: len(rest_no_nl) - len(rest_no_nl.lstrip(" "))]
+    s = rest_no_nl.lstrip(" ")
+    if not s:
+        return lead_ws, "", "", ""
+    if s.startswith(_OPENERS):
+        return (lead_ws, "", *_old_split_suffix(s))
+
+    m_id = re.match(r"^(\S+)(\s+)(.*)$", s)
+    if m_id and _old_is_id_like(m_id.group(1)):
+        after_id = m_id.group(3)
+        prefix_base = lead_ws + s[: m_id.start(3)]
+        m_next = re.match(r"^(\S+)(\s+)(.*)$", after_id)
+        if m_next:
+            cand = m_next.group(1)
+            rest_after_cand = m_next.group(3)
+            prefix = lead_ws + s[: m_id.start(3) + m_next.start(3)]
+            if cand.startswith(("@", "#")):
+                return (prefix, cand[1:].strip(), *_old_split_suffix(rest_after_cand))
+            if re.fullmatch(r"[A-Za-z0-9_]+", cand) and rest_after_cand.startswith(_OPENERS):
+                return (prefix, cand.strip(), *_old_split_suffix(rest_after_cand))
+        return (prefix_base, "", *_old_split_suffix(after_id))
+
+    m_sp = re.match(r"^([A-Za-z0-9_]+)(\s+)(.*)$", s)
+    if m_sp and m_sp.group(3).startswith(_OPENERS):
+        return (lead_ws + s[: m_sp.start(3)], m_sp.group(1).strip(), *_old_split_suffix(m_sp.group(3)))
+    return (lead_ws, "", *_old_split_suffix(s))
+
+
+def _message_rests():
+    from benchmarks.corpus import CorpusSpec, generate
+
+    for engine_id in ("musica.sc", "musica.sc.ef", "musica.sc.eden"):
+        data = generate(CorpusSpec(engine_id, encoding="utf-8", eol="\r\n", lines=3000))
+        for line in data.decode("utf-8").splitlines(keepends=True):
+            m = _RX_MESSAGE.match(line)
+            if m:
+                yield m.group(6)
+
+    pieces = [
+        " ", "  ", "\t", "\u3000", "@", "#", "Hero", "hero_2", "001-01", "a-1", "-", "1", "_",
+        "\\", "\\a", "\\w12", "\\N", "\\a1b", "\\1", "「", "」", "『", "“", "”", '"',
+        "\x81u", "\x81v", "x", "Olá", "ç",
+    ]
+    rng = random.Random(15)
+    for _ in range(20000):
+        # Linhas já vêm de splitlines(): quebra de linha só no fim.
+        body = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+        yield body + rng.choice(("", "", "\r\n", "\n"))
+
+
+def test_message_tokenizer_matches_previous_regex_implementation():
+    for rest in _message_rests():
+        assert _parse_rest_prefix_speaker_and_body(rest) == _old_parse_rest(rest), repr(rest)
+
+
+def test_message_tokenizer_is_linear_on_pathological_lines():
+    for rest in ("001-01 @A " + "\\a" * 50000 + " x", "\\" * 100000, "x " + "\\a1" * 50000 + "\\"):
+        t0 = time.perf_counter()
+        prefix, _speaker, body, suf = _parse_rest_prefix_speaker_and_body(rest)
+        assert time.perf_counter() - t0 < 0.5
+        assert prefix + body + suf == rest
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from sekai_parsers import aio, get_engine
+from sekai_parsers.columnar import ColumnarParseResult
+
+_SC = ".stage 1\r\n.message 0 001-01 @Hero 「Ola」\\a\r\n".encode("cp932")
+
+
+def _write_scripts(root, n):
+    paths = []
+    for i in range(n):
+        p = root / f"{i:03}.sc"
+        p.write_bytes(_SC.replace(b"Ola", f"Ola {i}".encode()))
+        paths.append(p)
+    return paths
+
+
+def test_parse_file_matches_sync_parse(tmp_path):
+    paths = _write_scripts(tmp_path, 20)
+    parser = get_engine("musica.sc")
+
+    async def main():
+        return await asyncio.gather(*(aio.parse_file(p, "musica.sc") for p in paths))
+
+    results = asyncio.run(main())
+    for p, res in zip(paths, results, strict=True):
+        assert res == parser.parse(p.read_bytes(), file_path=str(p))
+
+
+def test_export_file_roundtrip(tmp_path):
+    (src,) = _write_scripts(tmp_path, 1)
+    out = tmp_path / "out" / "000.sc"
+
+    async def main():
+        res = await aio.parse_file(src, "musica.sc")
+        return await aio.export_file(src, "musica.sc", res.entries, out)
+
+    assert asyncio.run(main()) == out
+    assert out.read_bytes() == src.read_bytes()
+
+
+def test_process_executor_and_columnar(tmp_path):
+    paths = _write_scripts(tmp_path, 4)
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        runner = aio.AsyncParsers(pool, max_concurrency=2)
+
+        async def main():
+            a = await runner.parse_file(paths[0], "musica.sc")
+            b = await runner.parse_file(paths[1], "musica.sc", columnar=True)
+            return a, b
+
+        a, b = asyncio.run(main())
+    assert a.entries[0].text == "Ola 0"
+    assert isinstance(b, ColumnarParseResult)
+
+
+class _GatedJob:
+    """Stand-in for `aio._parse_job` that blocks until released and counts jobs in flight."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.release = threading.Event()
+        self.calls = self.running = self.max_running = 0
+
+    def __call__(self, engine_id, path, *args):
+        with self.lock:
+            self.calls += 1
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            self.release.wait(5)
+            return path
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+def test_max_concurrency_bounds_jobs_in_flight(monkeypatch):
+    job = _GatedJob()
+    monkeypatch.setattr(aio, "_parse_job", job)
+    # Pool maior que o limite: só o limite do AsyncParsers segura os jobs.
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        runner = aio.AsyncParsers(pool, max_concurrency=2)
+
+        async def main():
+            tasks = [asyncio.create_task(runner.parse_file(f"{i}.sc", "musica.sc")) for i in range(6)]
+            await asyncio.sleep(0.05)
+            started = job.calls
+            job.release.set()
+            await asyncio.gather(*tasks)
+            return started
+
+        assert asyncio.run(main()) == 2
+    assert job.calls == 6
+    assert job.max_running == 2
+
+
+def test_cancelled_waiter_releases_its_slot(monkeypatch):
+    job = _GatedJob()
+    monkeypatch.setattr(aio, "_parse_job", job)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        runner = aio.AsyncParsers(pool, max_concurrency=1)
+
+        async def main():
+            first = asyncio.create_task(runner.parse_file("a.sc", "musica.sc"))
+            await asyncio.sleep(0.05)  # ocupa o único slot
+            waiter = asyncio.create_task(runner.parse_file("b.sc", "musica.sc"))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            job.release.set()
+            await first
+            return await asyncio.wait_for(runner.parse_file("c.sc", "musica.sc"), timeout=5)
+
+        assert asyncio.run(main()) == "c.sc"
+    # O job cancelado antes de começar nunca rodou.
+    assert job.calls == 2
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from sekai_parsers.api import Entry
+from sekai_parsers.batch import changed_entries, export_changed, export_tree, parse_tree
+from sekai_parsers.columnar import ColumnarParseResult
+from sekai_parsers.engines.musica.sc_parser import MusicaScParser
+
+_SC = b".stage 1\r\n.message 0 abc-01 @Alice \"Ol$ mundo\"\\a\r\n"
+
+
+def _make_tree(root: Path) -> None:
+    (root / "sub").mkdir()
+    (root / "a.sc").write_bytes(_SC)
+    (root / "sub" / "b.sc").write_bytes(_SC.replace(b"Alice", b"Bob"))
+    (root / "notes.txt").write_bytes(b"ignored")
+
+
+def test_parse_tree_matches_single_file_parse(tmp_path):
+    _make_tree(tmp_path)
+
+    batch = parse_tree(tmp_path, "musica.sc", workers=2)
+
+    assert batch.ok
+    assert list(batch.results) == ["a.sc", "sub/b.sc"]
+    expected = MusicaScParser().parse(_SC, file_path="a.sc")
+    assert batch.results["a.sc"] == expected
+    assert batch.results["sub/b.sc"].entries[0].speaker == "Bob"
+
+
+def test_parse_tree_reports_failures_without_stopping(tmp_path):
+    _make_tree(tmp_path)
+    (tmp_path / "broken.sc").mkdir()  # unreadable as a file
+
+    batch = parse_tree(tmp_path, "musica.sc", workers=1, paths=["a.sc", "broken.sc"])
+
+    assert list(batch.results) == ["a.sc"]
+    assert [e.path for e in batch.errors] == ["broken.sc"]
+
+
+def test_export_tree_writes_edited_files(tmp_path):
+    _make_tree(tmp_path)
+    parsed = parse_tree(tmp_path, "musica.sc", workers=1)
+    e0 = parsed.results["a.sc"].entries[0]
+    edits = {
+        "a.sc": [Entry(key=e0.key, text='"Tradu&$o"', speaker=e0.speaker, meta=e0.meta)],
+        "sub/b.sc": parsed.results["sub/b.sc"].entries,
+    }
+
+    out = tmp_path / "out"
+    batch = export_tree(tmp_path, "musica.sc", edits, out, workers=2)
+
+    assert batch.ok
+    assert b"Tradu&$o" in (out / "a.sc").read_bytes()
+    src = (tmp_path / "sub" / "b.sc").read_bytes()
+    expected = MusicaScParser().export(src, edits["sub/b.sc"], file_path="sub/b.sc")
+    assert (out / "sub" / "b.sc").read_bytes() == expected
+
+
+def test_changed_entries_compares_text_and_meta_by_key():
+    parsed = MusicaScParser().parse(_SC, file_path="a.sc")
+    e0 = parsed.entries[0]
+    assert changed_entries(parsed, list(parsed.entries)) == []
+
+    edited = Entry(key=e0.key, text='"Oi"', speaker=e0.speaker, meta=e0.meta)
+    assert changed_entries(parsed, [edited]) == [edited]
+    assert changed_entries(parsed, [Entry(key=e0.key, text=e0.text, speaker="X", meta=e0.meta)]) == []
+
+
+def test_export_changed_skips_clean_files(tmp_path, monkeypatch):
+    _make_tree(tmp_path)
+    parsed = parse_tree(tmp_path, "musica.sc", workers=1, paths=["a.sc", "sub/b.sc"])
+    e0 = parsed.results["a.sc"].entries[0]
+    edits = {
+        "a.sc": [Entry(key=e0.key, text='"Tradu&$o"', speaker=e0.speaker, meta=e0.meta)],
+        "sub/b.sc": list(parsed.results["sub/b.sc"].entries),
+    }
+    expected = MusicaScParser().export(_SC, edits["a.sc"], file_path="a.sc")
+
+    exported: list[str] = []
+    real_export = MusicaScParser.export
+
+    def spy(self, data, entries, **kwargs):
+        exported.append(kwargs["file_path"])
+        return real_export(self, data, entries, **kwargs)
+
+    monkeypatch.setattr(MusicaScParser, "export", spy)
+    batch = export_changed(tmp_path, "musica.sc", parsed.results, edits, workers=1)
+
+    assert batch.ok
+    assert exported == ["a.sc"]
+    assert batch.clean == ["sub/b.sc"]
+    assert list(batch.results) == ["a.sc"]
+    assert (tmp_path / "a.sc").read_bytes() == expected
+    assert (tmp_path / "sub" / "b.sc").read_bytes() == _SC.replace(b"Alice", b"Bob")
+
+
+def test_export_changed_to_out_root_copies_clean_files_verbatim(tmp_path):
+    _make_tree(tmp_path)
+    parsed = parse_tree(tmp_path, "musica.sc", workers=1, columnar=True)
+    e0 = parsed.results["sub/b.sc"].entries[0]
+    edits = {
+        "a.sc": parsed.results["a.sc"].entries,
+        "sub/b.sc": [Entry(key=e0.key, text='"Oi"', speaker=e0.speaker, meta=e0.meta)],
+    }
+
+    out = tmp_path / "out"
+    batch = export_changed(tmp_path, "musica.sc", parsed.results, edits, out, workers=1)
+
+    assert batch.ok
+    assert batch.clean == ["a.sc"]
+    assert list(batch.results) == ["a.sc", "sub/b.sc"]
+    assert (out / "a.sc").read_bytes() == _SC
+    assert b'"Oi"' in (out / "sub" / "b.sc").read_bytes()
+
+
+def test_export_changed_splices_bytes_when_parse_kept_byte_spans(tmp_path):
+    _make_tree(tmp_path)
+    parser = MusicaScParser()
+    original = parser.parse(_SC, file_path="a.sc", with_spans=True)
+    assert original.byte_spans is not None
+    e0 = original.entries[0]
+    edits = {"a.sc": [Entry(key=e0.key, text='"Tradu&$o"', speaker=e0.speaker, meta=e0.meta)]}
+
+    batch = export_changed(tmp_path, "musica.sc", {"a.sc": original}, edits, tmp_path / "out", workers=1)
+
+    assert batch.ok
+    assert (tmp_path / "out" / "a.sc").read_bytes() == parser.export(_SC, edits["a.sc"], file_path="a.sc")
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_export_changed_reparses_files_edited_since_parse(tmp_path, columnar):
+    _make_tree(tmp_path)
+    parser = MusicaScParser()
+    original = parser.parse(_SC, file_path="a.sc", with_spans=True)
+    if columnar:
+        original = ColumnarParseResult.from_result(original)
+    # Linha anterior ao diálogo mudou de tamanho: as spans guardadas deixam de valer.
+    current = _SC.replace(b".stage 1", b".stage 10")
+    (tmp_path / "a.sc").write_bytes(current)
+    e0 = original.entries[0]
+    edits = {"a.sc": [Entry(key=e0.key, text='"Oi"', speaker=e0.speaker, meta=e0.meta)]}
+
+    batch = export_changed(tmp_path, "musica.sc", {"a.sc": original}, edits, tmp_path / "out", workers=1)
+
+    assert batch.ok
+    assert (tmp_path / "out" / "a.sc").read_bytes() == parser.export(current, edits["a.sc"], file_path="a.sc")
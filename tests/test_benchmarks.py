@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import pytest
+
+from benchmarks.corpus import CorpusSpec, generate
+from benchmarks.run import bench_engine, compare
+from sekai_parsers import get_engine, list_engines
+
+
+@pytest.mark.parametrize("engine_id", list_engines())
+@pytest.mark.parametrize("encoding,eol", [("cp932", "\r\n"), ("utf-8", "\n")])
+def test_synthetic_corpus_roundtrips(engine_id, encoding, eol):
+    spec = CorpusSpec(engine_id, encoding=encoding, eol=eol, lines=400, seed=7)
+    data = generate(spec)
+    parser = get_engine(engine_id)
+
+    parsed = parser.parse(data, file_path="bench")
+
+    assert parsed.entries
+    assert parser.export(data, parsed.entries, file_path="bench") == data
+
+
+def test_compare_flags_slowdowns_only():
+    spec = CorpusSpec("musica.sc", lines=200)
+    res = bench_engine("musica.sc", spec, repeat=1)
+    baseline = {"results": {"musica.sc": {spec.variant: res}}}
+    slower = {
+        "results": {
+            "musica.sc": {
+                spec.variant: {**res, "parse": {**res["parse"], "seconds": res["parse"]["seconds"] * 3}}
+            }
+        }
+    }
+
+    assert compare(baseline, baseline, threshold=0.1) == []
+    assert [r.split(":")[0] for r in compare(baseline, slower, threshold=0.1)] == [
+        f"musica.sc {spec.variant} parse"
+    ]
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import os
+
+from sekai_parsers.cache import ParseCache
+from sekai_parsers.engines.kirikiri.ks_parser import KiriKiriKsParser
+from sekai_parsers.engines.musica.sc_parser import MusicaScParser
+
+_SC = ".stage 1\r\n.message 0 001-01 @Hero 「Ola」\\a\r\n".encode("cp932")
+
+
+class _CountingParser(MusicaScParser):
+    calls = 0
+
+    def parse(self, data, **kwargs):
+        type(self).calls += 1
+        return super().parse(data, **kwargs)
+
+
+def test_second_parse_is_served_from_disk(tmp_path):
+    cache = ParseCache(tmp_path)
+    parser = _CountingParser()
+
+    first = cache.parse(parser, _SC, file_path="a.sc")
+    second = cache.parse(parser, _SC, file_path="a.sc")
+
+    assert _CountingParser.calls == 1
+    assert second == first
+
+
+def test_hit_rebases_keys_to_requested_file_path(tmp_path):
+    cache = ParseCache(tmp_path, use_mmap=False)
+    parser = MusicaScParser()
+    cache.parse(parser, _SC, file_path="a.sc")
+
+    other = cache.parse(parser, _SC, file_path="copy/b.sc")
+
+    assert other == parser.parse(_SC, file_path="copy/b.sc")
+
+
+def test_key_depends_on_engine_profile_and_spans(tmp_path):
+    cache = ParseCache(tmp_path)
+    base = cache.key(_SC, "musica.sc")
+    assert cache.key(_SC, "musica.sc.ef", profile="ef") != base
+    assert cache.key(_SC, "musica.sc", with_spans=True) != base
+    assert cache.key(_SC + b"\n", "musica.sc") != base
+
+    parser = KiriKiriKsParser()
+    data = '[cn name="A"]\n「Hi」[r]\n'.encode()
+    with_spans = cache.parse(parser, data, with_spans=True)
+    assert cache.parse(parser, data, with_spans=True).spans == with_spans.spans
+    assert cache.parse(parser, data).spans is None
+
+
+def test_lru_eviction_keeps_recently_used_files(tmp_path):
+    cache = ParseCache(tmp_path, max_bytes=10**9)
+    parser = MusicaScParser()
+    blobs = [_SC + f".se {i}\r\n".encode() for i in range(4)]
+    keys = [cache.key(b, parser.engine_id, profile="default") for b in blobs]
+    for i, b in enumerate(blobs):
+        cache.parse(parser, b)
+        os.utime(cache._file(keys[i]), (1000 + i, 1000 + i))
+
+    cache.get(keys[0])  # bump the oldest one
+    one = cache._file(keys[0]).stat().st_size
+    cache.max_bytes = one * 3
+    cache._size = None
+    cache._evict()
+
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.size() <= cache.max_bytes
+
+
+def test_overwriting_an_entry_keeps_the_size_accurate(tmp_path):
+    cache = ParseCache(tmp_path)
+    parser = MusicaScParser()
+    key = cache.key(_SC, parser.engine_id, profile="default")
+    result = parser.parse(_SC, file_path="a.sc")
+    cache.size()  # começa a contabilidade
+
+    for _ in range(3):
+        cache.put(key, result, file_path="a.sc")
+
+    assert cache.size() == cache._file(key).stat().st_size
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import io
+import json
+
+import pytest
+
+from sekai_parsers import cli, get_engine
+from sekai_parsers.api import Entry
+
+SC = ".stage bg\r\n.message 0 001-01 @Hero 「Ola」\\a\r\n.message 0 001-02 「Narration」\r\n".encode("cp932")
+KS = b'[cn name="A"]\nHello.[r]\n*label\nWorld.\n'
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    (tmp_path / "proj" / "sub").mkdir(parents=True)
+    (tmp_path / "proj" / "a.sc").write_bytes(SC)
+    (tmp_path / "proj" / "sub" / "b.ks").write_bytes(KS)
+    (tmp_path / "proj" / "notes.txt").write_bytes(b"ignored")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _records(out: str) -> list[dict]:
+    return [json.loads(line) for line in out.splitlines()]
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_parse_directory_writes_ndjson_per_entry(project, capsys, jobs):
+    assert cli.main(["parse", "proj", "-j", jobs]) == 0
+    records = _records(capsys.readouterr().out)
+
+    by_file: dict[str, list[dict]] = {}
+    for rec in records:
+        by_file.setdefault(rec["file"], []).append(rec)
+    assert set(by_file) == {"proj/a.sc", "proj/sub/b.ks"}
+    assert [r["engine"] for r in by_file["proj/a.sc"]] == ["musica.sc", "musica.sc"]
+    assert [r["speaker"] for r in by_file["proj/a.sc"]] == ["Hero", None]
+    assert by_file["proj/sub/b.ks"][0]["key"] == "proj/sub/b.ks:0"
+    assert by_file["proj/sub/b.ks"][0]["text"] == "Hello.\n"
+    # Registros de um arquivo saem juntos.
+    files = [r["file"] for r in records]
+    assert files == sorted(files, key=files.index)
+
+
+def test_parse_glob_and_explicit_file(project, capsys):
+    assert cli.main(["parse", "proj/**/*.ks", "proj/sub/b.ks", "proj/a.sc"]) == 0
+    files = [r["file"] for r in _records(capsys.readouterr().out)]
+    assert files == ["proj/sub/b.ks", "proj/sub/b.ks", "proj/a.sc", "proj/a.sc"]
+
+
+def test_parse_reports_undetectable_file(project, capsys):
+    assert cli.main(["parse", "proj/notes.txt"]) == 1
+    assert "proj/notes.txt" in capsys.readouterr().err
+
+
+def test_export_applies_edited_records(project, capsys, monkeypatch):
+    cli.main(["parse", "proj"])
+    records = _records(capsys.readouterr().out)
+    for rec in records:
+        if rec["text"] == "Hello.\n":
+            rec["text"] = "Oi.\n"
+    stdin = "".join(json.dumps({k: rec[k] for k in ("file", "key", "text")}) + "\n" for rec in records)
+    monkeypatch.setattr("sys.stdin", io.StringIO(stdin))
+
+    assert cli.main(["export", "-o", "out", "--root", "proj", "-j", "2"]) == 0
+    written = {r["file"]: r["written"] for r in _records(capsys.readouterr().out)}
+    assert written == {"proj/a.sc": "out/a.sc", "proj/sub/b.ks": "out/sub/b.ks"}
+    assert (project / "out" / "a.sc").read_bytes() == SC
+    assert (project / "out" / "sub" / "b.ks").read_bytes() == KS.replace(b"Hello.", b"Oi.")
+
+
+def test_ndjson_is_utf8_under_a_non_utf8_locale(project, monkeypatch):
+    # Pipes com a codificação do locale (cp1252 no Windows): o NDJSON continua UTF-8.
+    (project / "proj" / "a.sc").write_bytes(SC.replace("Ola".encode("cp932"), "こんにちは".encode("cp932")))
+    out = io.TextIOWrapper(io.BytesIO(), encoding="cp1252")
+    monkeypatch.setattr("sys.stdout", out)
+    assert cli.main(["parse", "proj/a.sc"]) == 0
+    out.flush()
+    records = _records(out.buffer.getvalue().decode("utf-8"))
+    assert records[0]["text"] == "こんにちは"
+
+    records[0]["text"] = "さようなら"
+    stdin = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+    monkeypatch.setattr("sys.stdin", io.TextIOWrapper(io.BytesIO(stdin), encoding="cp1252"))
+    monkeypatch.setattr("sys.stdout", io.TextIOWrapper(io.BytesIO(), encoding="cp1252"))
+    assert cli.main(["export", "-o", "out", "--root", "proj"]) == 0
+    assert "さようなら".encode("cp932") in (project / "out" / "a.sc").read_bytes()
+
+
+def test_export_rejects_non_contiguous_records(project, capsys, monkeypatch):
+    cli.main(["parse", "proj", "-e", "musica.sc"])
+    records = _records(capsys.readouterr().out)
+    records[0]["text"] = "Primeiro"
+    records[1]["text"] = "Segundo"
+    stdin = "".join(json.dumps(rec) + "\n" for rec in (records[0], {"file": "proj/sub/b.ks", "key": "proj/sub/b.ks:0", "text": "x"}, records[1]))
+    monkeypatch.setattr("sys.stdin", io.StringIO(stdin + "not json\n"))
+
+    assert cli.main(["export", "-o", "out", "--root", "proj"]) == 1
+    err = capsys.readouterr().err
+    assert "not contiguous" in err
+    assert "<stdin>:4" in err
+    # A volta de a.sc é descartada: a export feita com o primeiro bloco fica intacta.
+    parser = get_engine("musica.sc")
+    entries = parser.parse(SC, file_path="proj/a.sc").entries
+    first = [Entry(e.key, "Primeiro" if e.key == records[0]["key"] else e.text, e.speaker, e.meta) for e in entries]
+    assert (project / "out" / "a.sc").read_bytes() == parser.export(SC, first, file_path="proj/a.sc")
+
+
+def test_roundtrip_reports_each_file(project, capsys):
+    assert cli.main(["roundtrip", "proj", "-j", "0"]) == 0
+    reports = {r["file"]: r for r in _records(capsys.readouterr().out)}
+    assert reports["proj/a.sc"] == {"file": "proj/a.sc", "engine": "musica.sc", "entries": 2, "ok": True}
+    assert reports["proj/sub/b.ks"]["ok"]
+
+
+def test_roundtrip_reports_first_difference(project, capsys):
+    # 0xFA 0x9A volta do cp932 como 0x81 0xE6: a export difere na linha 3.
+    (project / "proj" / "a.sc").write_bytes(SC.replace(b"Narration", b"\xfa\x9a"))
+    assert cli.main(["roundtrip", "proj/a.sc"]) == 1
+    [report] = _records(capsys.readouterr().out)
+    assert report["ok"] is False
+    assert (report["line"], report["key"]) == (3, "proj/a.sc:2")
+    assert report["first_diff"] == SC.index(b"Narration")
+
+
+def test_unknown_engine_exits_2(project, capsys):
+    assert cli.main(["parse", "proj", "-e", "nope"]) == 2
+    assert "unknown engine" in capsys.readouterr().err
+
+
+def test_key_errors_are_not_reported_as_unknown_engine(project, monkeypatch):
+    def boom(*args):
+        raise KeyError("meta")
+
+    monkeypatch.setattr(cli, "cmd_roundtrip", boom)
+    with pytest.raises(KeyError):
+        cli.main(["roundtrip", "proj", "-e", "musica.sc"])
+
+
+def test_check_reports_unencodable_text(project, capsys, monkeypatch):
+    records = [
+        {"file": "a.sc", "engine": "musica.sc", "key": "a.sc:0", "text": "Ação"},
+        {"file": "a.sc", "engine": "musica.sc", "key": "a.sc:1", "text": "Você"},
+        {"file": "b.ks", "engine": "kirikiri.ks", "key": "b.ks:0", "text": "Ação"},
+    ]
+    monkeypatch.setattr("sys.stdin", io.StringIO("".join(json.dumps(r) + "\n" for r in records)))
+    assert cli.main(["check", "--encoding", "cp932"]) == 1
+    assert _records(capsys.readouterr().out) == [
+        {"file": "a.sc", "key": "a.sc:1", "chars": "ê"},
+        {"file": "b.ks", "key": "b.ks:0", "chars": "çã"},
+    ]
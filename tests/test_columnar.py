@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import json
+import pickle
+import struct
+import tracemalloc
+
+from sekai_parsers import columnar
+from sekai_parsers.api import Entry, ParseResult
+from sekai_parsers.columnar import ColumnarParseResult, join_key, split_key
+from sekai_parsers.engines.musica.sc_parser import MusicaScParser
+
+
+def _script(n: int) -> bytes:
+    lines = [".stage bg001\r\n"]
+    for i in range(n):
+        lines.append(f".message 0 001-{i:02d} @Hero 「Linha {i}」\\a\r\n")
+    return "".join(lines).encode("cp932")
+
+
+def test_roundtrips_parse_result_including_meta_and_spans():
+    parser = MusicaScParser()
+    result = parser.parse(_script(20), file_path="scene.sc", with_spans=True)
+
+    col = ColumnarParseResult.from_result(result)
+
+    assert len(col) == 20
+    assert col.to_result() == result
+    assert col[3] == result.entries[3]
+    assert col[-1] == result.entries[-1]
+    assert list(col) == result.entries
+    assert col.get(result.entries[5].key) == result.entries[5]
+    assert col.get("missing:1") is None
+
+
+def test_keeps_types_and_heterogeneous_meta():
+    entries = [
+        Entry(key="a.ks:0", text="1", speaker=None, meta={"n": 1, "flag": "1"}),
+        Entry(key="odd-key", text="x", speaker="A", meta=None),
+        Entry(key="a.ks:2", text="y", speaker="A", meta={"late": True}),
+        Entry(key="a.ks:03", text="z", meta={}),
+    ]
+    col = ColumnarParseResult.from_entries("e", entries)
+
+    assert col.entries == entries
+    assert col[0].meta == {"n": 1, "flag": "1"}
+    assert col[2].meta["late"] is True
+    assert pickle.loads(pickle.dumps(col)) == col
+
+
+def test_split_and_join_key():
+    assert split_key("dir/a.sc:12") == ("dir/a.sc", 12)
+    assert split_key("a:b") == ("a:b", -1)
+    assert split_key("a:01") == ("a:01", -1)
+    for key in ("dir/a.sc:12", "a:b", "a:01", "plain"):
+        assert join_key(*split_key(key)) == key
+
+
+def test_uses_much_less_memory_than_entry_lists():
+    data = _script(5000)
+
+    tracemalloc.start()
+    result = MusicaScParser().parse(data, file_path="some/long/path/scene.sc")
+    listed = tracemalloc.get_traced_memory()[0]
+    col = ColumnarParseResult.from_result(result)
+    del result
+    columnar = tracemalloc.get_traced_memory()[0] - listed
+    tracemalloc.stop()
+
+    assert len(col) == 5000
+    assert columnar * 4 < listed
+
+
+def test_from_entries_accepts_stream():
+    parser = MusicaScParser()
+    data = _script(3)
+    import io
+
+    col = ColumnarParseResult.from_entries(
+        parser.engine_id, parser.parse_stream(io.BytesIO(data), file_path="s.sc")
+    )
+    assert col.to_result() == ParseResult(parser.engine_id, parser.parse(data, file_path="s.sc").entries)
+
+
+def test_int_column_falls_back_to_value_table():
+    entries = [
+        Entry(key="a:0", text="t", meta={"n": 1}),
+        Entry(key="a:1", text="t", meta={"n": "two"}),
+        Entry(key="a:2", text="t", meta={}),
+    ]
+    assert ColumnarParseResult.from_entries("e", entries).entries == entries
+
+
+def test_binary_blob_roundtrip_and_rebase():
+    parser = MusicaScParser()
+    result = parser.parse(_script(5), file_path="a.sc", with_spans=True)
+    col = ColumnarParseResult.from_result(result)
+    col._values.append(1.5)  # exercise the float tag
+
+    loaded = ColumnarParseResult.from_bytes(memoryview(col.to_bytes()))
+    assert loaded.to_result() == result
+    assert loaded.source_hash == result.source_hash is not None
+
+    loaded.rebase_keys("a.sc", "b/a.sc")
+    assert loaded.to_result().entries == parser.parse(_script(5), file_path="b/a.sc").entries
+
+
+def _split_blob(blob: bytes) -> tuple[dict, list[bytes]]:
+    (count,) = struct.unpack_from("<I", blob, 4)
+    lens = struct.unpack_from(f"<{count}Q", blob, 8)
+    pos, sections = 8 + 8 * count, []
+    for n in lens:
+        sections.append(blob[pos:pos + n])
+        pos += n
+    return json.loads(sections[0]), sections[1:]
+
+
+def _join_blob(header: dict, sections: list[bytes]) -> bytes:
+    sections = [json.dumps(header).encode(), *sections]
+    lens = struct.pack(f"<{len(sections)}Q", *map(len, sections))
+    return b"SPC1" + struct.pack("<I", len(sections)) + lens + b"".join(sections)
+
+
+def test_blob_is_little_endian_and_loads_from_either_byte_order(monkeypatch):
+    parser = MusicaScParser()
+    result = parser.parse(_script(5), file_path="a.sc", with_spans=True)
+    col = ColumnarParseResult.from_result(result)
+    header, sections = _split_blob(col.to_bytes())
+    assert header["byteorder"] == "little"
+    assert sections[6] == struct.pack(f"<{len(col)}q", *col._key_num)  # key_num
+
+    # Blob antigo de um host big-endian: arrays e header na ordem nativa dele.
+    monkeypatch.setattr(columnar.sys, "byteorder", "big")
+    _, be_sections = _split_blob(col.to_bytes())
+    monkeypatch.undo()
+    assert be_sections != sections
+    big = _join_blob({**header, "byteorder": "big"}, be_sections)
+    assert ColumnarParseResult.from_bytes(big).to_result() == result
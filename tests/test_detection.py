@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from sekai_parsers import detect
+from sekai_parsers.detection import Detector
+
+_KS = '*start\n[cn name="Alice"]\nHello.[r]\n[cn name="Bob"]\nHi.[r]\n'.encode("cp932")
+_KS_YANDERE = '*start\n[P_NAME s_cn="Alice"]\nHello.[r]\n[P_NAME s_cn="Bob"]\nHi.[r]\n'.encode("cp932")
+_SC = '.stage 1\n.message 10 "" @Alice 「こんにちは」\n.message 20 "" 「やあ」\n'.encode("cp932")
+_SC_EDEN = '.stage 1\n.message 10 "" @Alice “Hello”\n.message 20 "" “Hi”\n'.encode()
+_SC_EF = '.stage 1\n.message 10 "" @Alice \x81uHello\x81v\n.message 20 "" \x81uHi\x81v\n'.encode()
+
+
+def test_detect_picks_profile_from_content():
+    d = Detector(memoize=False)
+    assert d.detect("a/x.ks", _KS).engine_id == "kirikiri.ks"
+    assert d.detect("a/x.ks", _KS_YANDERE).engine_id == "kirikiri.ks.yandere"
+    assert d.detect("b/x.sc", _SC).engine_id == "musica.sc"
+    assert d.detect("b/x.sc", _SC_EDEN).engine_id == "musica.sc.eden"
+    assert d.detect("b/x.sc", _SC_EF).engine_id == "musica.sc.ef"
+
+
+def test_detect_without_known_extension_sniffs_content():
+    res = Detector(memoize=False).detect("dump/unknown.txt", _SC_EF)
+    assert res.engine_id == "musica.sc.ef"
+    assert 0 < res.confidence < 0.6
+    assert set(res.scores) >= {"kirikiri.ks", "musica.sc"}
+
+
+def test_detect_memoizes_per_directory(tmp_path):
+    game = tmp_path / "game"
+    game.mkdir()
+    (game / "01.sc").write_bytes(_SC_EDEN)
+    (game / "02.sc").write_bytes(b".stage 2\n")
+
+    d = Detector()
+    first = d.detect(game / "01.sc")
+    second = d.detect(game / "02.sc")
+    assert not first.memoized
+    assert second.memoized
+    assert second.engine_id == "musica.sc.eden"
+
+    d.clear()
+    assert d.detect(game / "02.sc").engine_id == "musica.sc"
+
+
+def test_package_level_detect(tmp_path):
+    p = tmp_path / "x.ks"
+    p.write_bytes(_KS_YANDERE)
+    assert detect(p).engine_id == "kirikiri.ks.yandere"
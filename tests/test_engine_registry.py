@@ -0,0 +1,52 @@
+import subprocess
+import sys
+
+import pytest
+
+import sekai_parsers
+from sekai_parsers import engine_registry
+from sekai_parsers.utils.regex import lazy_compile
+
+
+def test_import_does_not_load_engines():
+    code = (
+        "import sys, sekai_parsers\n"
+        "assert not [m for m in sys.modules if m.startswith('sekai_parsers.engines')]\n"
+        "assert 'kirikiri.ks' in sekai_parsers.list_engines()\n"
+        "p = sekai_parsers.get_engine('kirikiri.ks')\n"
+        "assert 'sekai_parsers.engines.kirikiri' in sys.modules\n"
+        "assert 'sekai_parsers.engines.musica' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_manifest_lists_every_engine():
+    sekai_parsers.discover_engines()
+    assert set(engine_registry._ENGINE_FACTORIES) == set(engine_registry.ENGINE_MANIFEST)
+
+
+def test_unknown_and_broken_engines(monkeypatch):
+    with pytest.raises(KeyError):
+        sekai_parsers.get_engine("nope.nope")
+
+    monkeypatch.setitem(engine_registry.ENGINE_MANIFEST, "broken.x", ("sekai_parsers.engines._missing", (".x",)))
+    with pytest.raises(KeyError):
+        sekai_parsers.get_engine("broken.x")
+    assert any(mod == "sekai_parsers.engines._missing" for mod, _err in sekai_parsers.discovery_errors())
+
+
+def test_lazy_pattern_compiles_on_first_use():
+    rx = lazy_compile(r"^(\d+)$")
+    assert rx._compiled is None
+    assert rx.match("42").group(1) == "42"
+    assert rx._compiled is not None
+    assert rx.pattern == r"^(\d+)$"
+
+
+def test_shared_instances_are_reused():
+    a = sekai_parsers.get_engine("musica.sc.ef", shared=True)
+    assert sekai_parsers.get_engine("musica.sc.ef", shared=True) is a
+    assert sekai_parsers.get_engine("musica.sc.ef") is not a
+
+    engine_registry.clear_shared_engines()
+    assert sekai_parsers.get_engine("musica.sc.ef", shared=True) is not a
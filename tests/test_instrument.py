@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+import threading
+
+import pytest
+
+from sekai_parsers import instrument
+from sekai_parsers.api import Entry
+from sekai_parsers.engines.kirikiri import ks_parser
+from sekai_parsers.engines.kirikiri.ks_parser import KiriKiriKsParser
+from sekai_parsers.engines.musica.sc_parser import MusicaScParser
+
+SC = ".message 10 \"\" @Alice 「こんにちは」\r\n.message 20 \"\" Narration line.\r\n".encode("cp932")
+
+
+def test_disabled_by_default():
+    assert not instrument.enabled()
+    assert instrument.stage("parse") is instrument.stage("export")
+
+
+def test_collect_records_stage_paths():
+    p = MusicaScParser()
+    with instrument.collect() as rec:
+        assert instrument.enabled()
+        res = p.parse(SC, file_path="a.sc")
+        p.export(SC, res.entries, file_path="a.sc")
+
+    assert not instrument.enabled()
+    stages = rec.stages
+    assert stages["parse"].calls == 1
+    assert stages["parse"].nbytes == len(SC)
+    assert stages["parse;decode"].nbytes == len(SC)
+    assert stages["parse;scan;speaker_body"].calls == 2
+    assert stages["parse;scan;char_map"].calls == 4
+    assert "export;encode" in stages
+
+    doc = json.loads(rec.to_json())
+    assert doc["stages"]["parse"]["calls"] == 1
+
+
+def test_folded_output_uses_self_time():
+    p = KiriKiriKsParser()
+    data = b"[Alice]\nHello.[r]\n"
+    with instrument.collect() as rec:
+        p.parse(data, file_path="a.ks")
+
+    rows = dict(line.rsplit(" ", 1) for line in rec.to_folded().splitlines())
+    assert {"parse", "parse;decode", "parse;classify"} <= set(rows)
+    assert all(int(us) >= 0 for us in rows.values())
+
+
+def test_collect_is_scoped_to_the_calling_thread():
+    p = MusicaScParser()
+    started, release = threading.Event(), threading.Event()
+    results: list[object] = []
+
+    def other_thread() -> None:
+        started.set()
+        release.wait()
+        results.append(instrument.enabled())
+        results.extend(p.parse(SC, file_path="b.sc").entries)
+
+    t = threading.Thread(target=other_thread)
+    t.start()
+    started.wait()
+    with instrument.collect() as rec:
+        release.set()
+        t.join()
+        p.parse(SC, file_path="a.sc")
+        # Nada é trocado nos módulos dos parsers durante a coleta.
+        assert ks_parser.Entry is Entry
+
+    assert results[0] is False
+    assert all(isinstance(e, Entry) for e in results[1:])
+    assert rec.stages["parse"].calls == 1
+
+
+def test_nested_collect_is_rejected():
+    with instrument.collect():
+        with pytest.raises(RuntimeError):
+            with instrument.collect():
+                pass
+    assert not instrument.enabled()
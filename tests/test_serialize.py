@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import io
+
+import pytest
+
+from sekai_parsers import serialize
+from sekai_parsers.api import Entry, ParseResult
+from sekai_parsers.engines.kirikiri.ks_parser import KiriKiriKsParser
+from sekai_parsers.engines.musica.sc_parser import MusicaScParser
+
+_KS = '[cn name="A"]\n「テスト」[r]\n; comment\nNarração\n'.encode()
+_SC = '.message 0 001-01 @Hero 「Ola」\\a\r\n.message 0 001-02 「Narration」\r\n'.encode("cp932")
+
+
+def _results() -> dict[str, ParseResult]:
+    return {
+        "a.ks": KiriKiriKsParser().parse(_KS, file_path="a.ks", with_spans=True),
+        "sub/b.sc": MusicaScParser().parse(_SC, file_path="sub/b.sc"),
+        "odd.ks": ParseResult(
+            engine_id="kirikiri.ks",
+            entries=[
+                Entry(key="odd.ks:0", text="nul\x00inside", meta=None),
+                Entry(key="custom", text="", speaker="", meta={"x": 1.5, "y": True, "z": None}),
+            ],
+        ),
+    }
+
+
+@pytest.mark.parametrize("codec", [None, "zlib", "lzma"])
+def test_dump_load_roundtrips_both_parsers(codec):
+    results = _results()
+    buf = io.BytesIO()
+
+    written = serialize.dump(results, buf, codec=codec)
+
+    assert written == len(buf.getvalue())
+    buf.seek(0)
+    loaded = dict(serialize.load(buf))
+    assert loaded == results
+    assert loaded["a.ks"].spans == results["a.ks"].spans
+
+
+def test_dump_accepts_lazy_pairs_and_load_can_stay_columnar():
+    results = _results()
+    data = serialize.dumps((name, r) for name, r in results.items())
+
+    loaded = serialize.loads(data, columnar=True)
+
+    assert list(loaded) == list(results)
+    assert loaded["sub/b.sc"].to_result() == results["sub/b.sc"]
+
+
+def test_archive_random_access_decodes_only_requested_file(tmp_path):
+    results = _results()
+    path = tmp_path / "project.spr"
+    with path.open("wb") as f:
+        serialize.dump(results, f)
+
+    with serialize.open_archive(path) as archive:
+        assert archive.names() == list(results)
+        assert archive.entry_count("sub/b.sc") == 2
+        assert archive.get_entry("sub/b.sc:1") == results["sub/b.sc"].entries[1]
+        assert list(archive._loaded) == ["sub/b.sc"]
+        assert archive.get_entry("custom") == results["odd.ks"].entries[1]
+        assert archive.get_entry("missing.ks:0") is None
+        assert archive.result("a.ks") == results["a.ks"]
+
+
+def test_rejects_foreign_or_truncated_data(tmp_path):
+    with pytest.raises(ValueError):
+        serialize.loads(b"SPC1....")
+    data = serialize.dumps(_results())
+    with pytest.raises(ValueError):
+        serialize.loads(data[: len(data) // 2])
+
+    path = tmp_path / "cut.spr"
+    path.write_bytes(data[:-4])
+    with pytest.raises(ValueError):
+        serialize.open_archive(path)
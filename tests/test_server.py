@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import os
+import socket
+import stat
+import subprocess
+import sys
+
+import pytest
+
+from sekai_parsers.engines.musica.sc_parser import MusicaScParser
+from sekai_parsers.server import (
+    INVALID_PARAMS,
+    INVALID_REQUEST,
+    METHOD_NOT_FOUND,
+    PARSE_ERROR,
+    ParseServer,
+)
+
+_SC = '.message 0 001-01 @Hero 「Ola」\\a\r\n.se 3\r\n.message 0 001-02 「Narration」\r\n'.encode("cp932")
+
+
+def _call(server: ParseServer, method: str, req_id: int = 1, **params):
+    return asyncio.run(server.handle({"jsonrpc": "2.0", "id": req_id, "method": method, "params": params}))
+
+
+def test_parse_caches_by_file_identity_and_matches_parser(tmp_path):
+    path = tmp_path / "a.sc"
+    path.write_bytes(_SC)
+    server = ParseServer()
+    try:
+        first = _call(server, "parse", path=str(path), engine_id="musica.sc", file_path="a.sc")["result"]
+        second = _call(server, "parse", path=str(path), engine_id="musica.sc", file_path="a.sc")["result"]
+
+        expected = MusicaScParser().parse(_SC, file_path="a.sc").entries
+        assert [e["key"] for e in first["entries"]] == [e.key for e in expected]
+        assert first["entries"][0]["meta"] == expected[0].meta
+        assert (first["cached"], second["cached"]) == (False, True)
+
+        path.write_bytes(_SC.replace(b"Hero", b"Heroine"))
+        third = _call(server, "parse", path=str(path), engine_id="musica.sc")["result"]
+        assert not third["cached"]
+        assert third["entries"][0]["speaker"] == "Heroine"
+    finally:
+        server.close()
+
+
+def test_export_writes_atomically_or_returns_bytes(tmp_path):
+    server = ParseServer()
+    data_b64 = base64.b64encode(_SC).decode("ascii")
+    try:
+        parsed = _call(server, "parse", data_b64=data_b64, file_path="a.sc")["result"]
+        assert parsed["engine_id"] == "musica.sc"
+        rows = parsed["entries"]
+        rows[1]["text"] = "Narração"
+
+        inline = _call(server, "export", data_b64=data_b64, engine_id="musica.sc", entries=rows, file_path="a.sc")
+        out = tmp_path / "out" / "a.sc"
+        written = _call(
+            server, "export", data_b64=data_b64, engine_id="musica.sc", entries=rows,
+            file_path="a.sc", out_path=str(out),
+        )
+    finally:
+        server.close()
+
+    data = base64.b64decode(inline["result"]["data_b64"])
+    assert "「Narra&^o」".encode("cp932") in data
+    assert written["result"] == {"path": str(out)}
+    assert out.read_bytes() == data
+
+
+def test_errors_follow_json_rpc():
+    server = ParseServer()
+    try:
+        assert _call(server, "nope")["error"]["code"] == METHOD_NOT_FOUND
+        assert _call(server, "parse")["error"]["code"] == INVALID_PARAMS
+        assert _call(server, "export", data_b64="AA==", engine_id="x.y", entries=[])["error"]["code"] == INVALID_PARAMS
+        assert asyncio.run(server.handle({"id": 1}))["error"]["code"] == INVALID_REQUEST
+        batch = asyncio.run(server.handle([
+            {"jsonrpc": "2.0", "id": 1, "method": "list_engines"},
+            {"jsonrpc": "2.0", "method": "list_engines"},  # notificação: sem resposta
+        ]))
+        assert [r["id"] for r in batch] == [1]
+        assert "kirikiri.ks" in batch[0]["result"]
+    finally:
+        server.close()
+
+
+def test_unix_socket_serves_concurrent_requests(tmp_path):
+    sock = str(tmp_path / "s.sock")
+    data_b64 = base64.b64encode(_SC).decode("ascii")
+
+    async def scenario() -> list[dict]:
+        server = ParseServer()
+        ready = asyncio.Event()
+        task = asyncio.create_task(server.serve_unix(sock, ready=ready.set))
+        await ready.wait()
+        try:
+            assert stat.S_IMODE(os.stat(sock).st_mode) == 0o600
+            reader, writer = await asyncio.open_unix_connection(sock)
+            for i in range(20):
+                req = {"jsonrpc": "2.0", "id": i, "method": "parse", "params": {"data_b64": data_b64, "engine_id": "musica.sc"}}
+                writer.write(json.dumps(req).encode() + b"\n")
+            writer.write(b"{not json\n")
+            await writer.drain()
+            replies = [json.loads(await reader.readline()) for _ in range(21)]
+            writer.close()
+            return replies
+        finally:
+            task.cancel()
+            server.close()
+
+    replies = asyncio.run(scenario())
+    by_id = {r["id"]: r for r in replies}
+    assert by_id[None]["error"]["code"] == PARSE_ERROR
+    assert sorted(i for i in by_id if i is not None) == list(range(20))
+    assert all(len(by_id[i]["result"]["entries"]) == 2 for i in range(20))
+
+
+def test_unix_socket_replaces_stale_socket_but_not_other_files(tmp_path):
+    regular = tmp_path / "notes.txt"
+    regular.write_bytes(b"keep me")
+    stale = tmp_path / "old.sock"
+    leftover = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    leftover.bind(str(stale))
+    leftover.close()
+
+    async def serve_once(path) -> None:
+        server = ParseServer()
+        ready = asyncio.Event()
+        task = asyncio.create_task(server.serve_unix(path, ready=ready.set))
+        waiter = asyncio.create_task(ready.wait())
+        try:
+            await asyncio.wait({task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            if task.done():
+                task.result()  # propaga o erro do bind
+        finally:
+            task.cancel()
+            waiter.cancel()
+            server.close()
+
+    with pytest.raises(FileExistsError):
+        asyncio.run(serve_once(regular))
+    assert regular.read_bytes() == b"keep me"
+
+    asyncio.run(serve_once(stale))
+    assert not stale.exists()
+
+
+def test_stdio_mode():
+    req = {"jsonrpc": "2.0", "id": 7, "method": "list_engines"}
+    proc = subprocess.run(
+        [sys.executable, "-m", "sekai_parsers.server", "--stdio"],
+        input=json.dumps(req).encode() + b"\n",
+        capture_output=True,
+        timeout=60,
+    )
+    assert proc.returncode == 0, proc.stderr
+    reply = json.loads(proc.stdout)
+    assert reply["id"] == 7
+    assert "musica.sc" in reply["result"]
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from sekai_parsers.engines.kirikiri.ks_parser import KiriKiriKsParser
+from sekai_parsers.engines.musica.sc_parser import MusicaScParser
+from sekai_parsers.translation_index import TranslationIndex
+
+_KS = '[cn name="A"]\n……\n[cn name="B"]\nYes.[r]\n'.encode()
+_KS2 = b'  Yes.\r\nOther line\r\n'
+_SC = '.message 0 001-01 @A 「Yes.」\\a\r\n'.encode("cp932")
+
+
+def _results():
+    ks, sc = KiriKiriKsParser(), MusicaScParser()
+    return {
+        "a.ks": ks.parse(_KS, file_path="a.ks"),
+        "b.ks": ks.parse(_KS2, file_path="b.ks"),
+        "c.sc": sc.parse(_SC, file_path="c.sc"),
+    }
+
+
+def test_index_groups_normalized_text_across_files():
+    index = TranslationIndex.from_results(_results())
+
+    assert index.occurrences == 5
+    assert len(index) == 3
+    assert index.keys("Yes.") == ["a.ks:1", "b.ks:0", "c.sc:0"]
+    assert index.count("……") == 1
+    assert index.duplicates() == [("Yes.", 3)]
+
+
+def test_bulk_apply_translates_every_occurrence_and_exports(tmp_path):
+    results = _results()
+    index = TranslationIndex.from_results(results)
+    assert index.set_translation("Yes.", "Sim.") == 3
+
+    ks = KiriKiriKsParser()
+    out_a = ks.export(_KS, index.apply(results["a.ks"].entries), file_path="a.ks")
+    out_b = ks.export(_KS2, index.apply(results["b.ks"].entries), file_path="b.ks")
+    out_c = MusicaScParser().export(_SC, index.apply(results["c.sc"].entries), file_path="c.sc")
+
+    assert out_a == '[cn name="A"]\n……\n[cn name="B"]\nSim.[r]\n'.encode()
+    assert out_b == b'  Sim.\r\nOther line\r\n'
+    assert "「Sim.」\\a" in out_c.decode("cp932")
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    index = TranslationIndex.from_results(_results())
+    index.update({"Yes.": "Sim.", "Other line": "Outra\x00linha"})
+
+    loaded = TranslationIndex.load(index.save(tmp_path / "tm.sti"))
+
+    assert list(loaded.texts()) == list(index.texts())
+    assert loaded.keys("Yes.") == index.keys("Yes.")
+    assert loaded.translation("Other line") == "Outra\x00linha"
+    assert loaded.translation("……") is None
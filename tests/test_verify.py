@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from sekai_parsers import get_engine, verify
+from sekai_parsers.api import Entry
+from sekai_parsers.errors import RoundTripError
+from sekai_parsers.verify import check_entries, first_difference, verify_roundtrip
+
+GOOD = ".stage bg\r\n.message 0 001-01 @Hero 「Ola」\\a\r\n.message 0 001-02 「Narration」\r\n".encode("cp932")
+# 0xFA 0x9A é um "∵" que decode+encode em cp932 devolve como 0x81 0xE6.
+BAD = GOOD.replace("Narration".encode("cp932"), b"\xfa\x9a")
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.sc").write_bytes(GOOD)
+    (tmp_path / "sub" / "b.sc").write_bytes(BAD)
+    (tmp_path / "c.sc").write_bytes(GOOD * 3)
+    return tmp_path
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_verify_roundtrip_reports_first_differing_line_and_key(project, workers):
+    report = verify_roundtrip(project, "musica.sc", workers=workers)
+
+    assert report.checked == 3
+    assert not report.errors
+    assert not report.ok
+    [m] = report.mismatches
+    assert m.path == (project / "sub" / "b.sc").as_posix()
+    assert m.line == 3
+    assert m.key == f"{m.path}:2"
+    assert m.expected == BAD.splitlines(keepends=True)[2]
+    assert m.offset == BAD.index(b"\xfa\x9a")
+    with pytest.raises(RoundTripError, match="b.sc:3"):
+        report.raise_for_mismatch()
+
+
+def test_verify_roundtrip_collects_unreadable_files(project):
+    report = verify_roundtrip([project / "a.sc", project / "missing.sc"], "musica.sc", workers=1)
+    assert report.checked == 1
+    assert report.ok is False
+    assert [e.path for e in report.errors] == [(project / "missing.sc").as_posix()]
+
+
+def test_first_difference():
+    big = bytes(200_000)
+    assert first_difference(big, big) == len(big)
+    assert first_difference(big, big[:10]) == 10
+    assert first_difference(big, big[:150_001] + b"x" + big[150_002:]) == 150_001
+
+
+def test_strict_export_rejects_edits_that_do_not_read_back():
+    sc = get_engine("musica.sc")
+    parsed = sc.parse(GOOD, file_path="s.sc")
+    e = parsed.entries[1]
+    ok = [Entry(e.key, "Narração", e.speaker, e.meta)]
+    assert sc.export(GOOD, ok, file_path="s.sc", strict=True) == sc.export(GOOD, ok, file_path="s.sc")
+    with pytest.raises(RoundTripError, match="s.sc:"):
+        sc.export(GOOD, [Entry(e.key, "한국어", e.speaker, e.meta)], file_path="s.sc", strict=True)
+
+    ks = get_engine("kirikiri.ks")
+    data = b'[cn name="A"]\nHello.[r]\nWorld.\n'
+    parsed = ks.parse(data, file_path="s.ks", with_spans=True)
+    e = parsed.entries[1]
+    # Sem a quebra de linha no texto editado: a export a mantém, strict aceita.
+    assert ks.export(data, [Entry(e.key, "Oi", e.speaker, e.meta)], file_path="s.ks", strict=True) == b'[cn name="A"]\nHello.[r]\nOi\n'
+    # "[r]" no texto vira markup ao reler.
+    with pytest.raises(RoundTripError, match="reads back"):
+        ks.export(data, [Entry(e.key, "Oi[r]", e.speaker, e.meta)], file_path="s.ks", byte_spans=parsed.byte_spans, strict=True)
+
+
+def test_check_entries_reports_unencodable_and_reserved_chars():
+    entries = [
+        Entry("s.sc:0", "Não, você está certo."),  # ê não está no char_map nem no cp932
+        Entry("s.sc:1", "Ação à tarde."),
+        Entry("s.sc:2", "Tom & Jerry, señor"),  # "&" voltaria como "ç"
+        Entry("s.sc:3", "日本語「テスト」"),
+    ]
+    problems = check_entries(entries, "musica.sc", "cp932")
+    assert [(p.key, p.chars) for p in problems] == [("s.sc:0", ("ê",)), ("s.sc:2", ("&", "ñ"))]
+    # Mesmo resultado com o repertório já em cache.
+    assert check_entries(entries, "musica.sc", "cp932") == problems
+
+    assert [p.chars for p in check_entries(entries, "kirikiri.ks", "cp932")] == [("ã", "ê", "á"), ("ç", "ã", "à"), ("ñ",)]
+    assert check_entries(entries, "kirikiri.ks", "utf-8") == []
+
+
+def test_check_entries_agrees_with_export():
+    sc = get_engine("musica.sc")
+    parsed = sc.parse(GOOD, file_path="s.sc")
+    e = parsed.entries[1]
+    for text in ("Você", "Ação", "ÇÃO", "ü", "Tom & Jerry"):
+        edited = [Entry(e.key, text, e.speaker, e.meta)]
+        try:
+            sc.export(GOOD, edited, file_path="s.sc", encoding="cp932", strict=True)
+        except RoundTripError:
+            assert check_entries(edited, "musica.sc", "cp932"), text
+        else:
+            assert not check_entries(edited, "musica.sc", "cp932"), text
+
+
+def test_strict_export_accepts_translation_that_keeps_the_tail():
+    ks = get_engine("kirikiri.ks")
+    data = b"Hello[r]\n"
+    [e] = ks.parse(data, file_path="f").entries
+    assert e.meta["kk_tail"] == "[r]"
+    kept = [Entry(e.key, "Hi[r]\n", e.speaker, e.meta)]
+    assert ks.export(data, kept, file_path="f", strict=True) == b"Hi[r]\n"
+
+
+def test_check_entries_is_consistent_across_threads():
+    # Cada thread traz caracteres novos: o repertório compartilhado cresce em paralelo.
+    batches = [
+        [Entry(f"s.sc:{i}", "".join(chr(0x100 + 64 * t + j) for j in range(64)) + "日本語") for i in range(20)]
+        for t in range(16)
+    ]
+    verify._repertoire.cache_clear()
+    expected = [check_entries(b, "musica.sc", "cp932") for b in batches]
+    verify._repertoire.cache_clear()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        got = list(pool.map(lambda b: check_entries(b, "musica.sc", "cp932"), batches))
+    assert got == expected
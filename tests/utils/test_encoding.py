@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import codecs
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from sekai_parsers.utils import encoding as enc_mod
+from sekai_parsers.utils.encoding import decode_bytes, detect_encoding, sniff_stream
+
+_CANDIDATES = ("utf-8", "cp932")
+
+
+def test_bom_wins_over_candidates():
+    assert detect_encoding(codecs.BOM_UTF8 + b"abc", _CANDIDATES, fallback="cp932") == "utf-8-sig"
+    data = codecs.BOM_UTF16_LE + "[cm]\r\n".encode("utf-16-le")
+    decoded = decode_bytes(data, _CANDIDATES, fallback="cp932")
+    assert decoded.encoding == "utf-16-le-sig"
+    assert decoded.text == "[cm]\r\n"
+    assert decoded.text.encode(decoded.encoding) == data
+
+
+def test_utf16_sig_codecs_keep_byte_order_and_bom():
+    for bom, enc in ((codecs.BOM_UTF16_BE, "utf-16-be"), (codecs.BOM_UTF16_LE, "utf-16-le")):
+        data = bom + "「テスト」\r\n".encode(enc)
+        decoded = decode_bytes(data, _CANDIDATES, fallback="cp932")
+        assert decoded.text == "「テスト」\r\n"
+        assert decoded.text.encode(decoded.encoding) == data
+
+        # Incremental (parse_stream/export_stream), com o BOM cortado entre blocos.
+        dec = codecs.getincrementaldecoder(decoded.encoding)()
+        assert "".join(dec.decode(data[i:i + 1]) for i in range(len(data))) + dec.decode(b"", True) == decoded.text
+        enc_ = codecs.getincrementalencoder(decoded.encoding)()
+        assert b"".join(enc_.encode(ch) for ch in decoded.text) + enc_.encode("", True) == data
+
+
+def test_detection_uses_bounded_sample_but_verifies_full_decode():
+    # ASCII head passes as UTF-8, but the tail is cp932; the full strict decode catches it.
+    data = b"a" * 32 + "「テスト」".encode("cp932")
+    assert detect_encoding(data, _CANDIDATES, fallback="cp932", sample_size=16) == "utf-8"
+
+    decoded = enc_mod._decode_uncached(data, _CANDIDATES, fallback="cp932", encoding=None)
+    assert decoded.encoding == "cp932"
+    assert decoded.lossless
+
+
+def test_multibyte_char_cut_by_sample_still_detects_utf8():
+    data = "あいう".encode()
+    assert detect_encoding(data + b"x" * 10, _CANDIDATES, fallback="cp932", sample_size=4) == "utf-8"
+
+
+def test_explicit_encoding_skips_detection_and_flags_lossy_decode():
+    decoded = decode_bytes(b"\xff\xfe", _CANDIDATES, fallback="cp932", encoding="utf-8")
+    assert decoded.encoding == "utf-8"
+    assert not decoded.lossless
+
+
+def test_decode_is_cached_by_buffer_identity():
+    data = "「テスト」".encode("cp932") + b"!" * 8
+    first = decode_bytes(data, _CANDIDATES, fallback="cp932")
+    assert decode_bytes(data, _CANDIDATES, fallback="cp932") is first
+
+
+def test_sniff_stream_returns_consumed_head():
+    data = "行1\n行2\n".encode()
+    fp = io.BytesIO(data)
+
+    enc, head = sniff_stream(fp, _CANDIDATES, fallback="cp932", sample_size=5)
+
+    assert enc == "utf-8"
+    assert head == data[:5]
+
+
+def test_decode_cache_is_safe_across_threads():
+    buffers = [f"linha {i} テスト\n".encode("cp932") * 50 for i in range(64)]
+
+    def work(data: bytes) -> str:
+        for _ in range(200):
+            decoded = decode_bytes(data, _CANDIDATES, fallback="cp932")
+        return decoded.text
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        texts = list(pool.map(work, buffers))
+
+    assert texts == [b.decode("cp932") for b in buffers]
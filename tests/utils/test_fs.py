@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import os
+import stat
+
+from sekai_parsers.utils.fs import atomic_write_bytes, atomic_write_chunks
+
+
+def test_atomic_write_chunks_writes_every_buffer_in_order(tmp_path):
+    chunks = [memoryview(b"%05d|" % i) for i in range(5000)] + [b"", b"end"]
+
+    dst = atomic_write_chunks(tmp_path / "sub" / "out.bin", chunks)
+
+    assert dst.read_bytes() == b"".join(chunks)
+    assert [p.name for p in dst.parent.iterdir()] == ["out.bin"]
+
+
+def test_atomic_write_bytes_replaces_existing_file(tmp_path):
+    dst = tmp_path / "out.bin"
+    dst.write_bytes(b"old content")
+
+    atomic_write_bytes(dst, b"new")
+
+    assert dst.read_bytes() == b"new"
+
+
+def test_atomic_write_preserves_mode_of_existing_file(tmp_path):
+    dst = tmp_path / "script.ks"
+    dst.write_bytes(b"old")
+    dst.chmod(0o640)
+
+    atomic_write_chunks(dst, [b"new"])
+
+    assert stat.S_IMODE(dst.stat().st_mode) == 0o640
+
+
+def test_atomic_write_new_file_follows_umask(tmp_path):
+    old = os.umask(0o027)
+    try:
+        dst = atomic_write_bytes(tmp_path / "new.ks", b"x")
+    finally:
+        os.umask(old)
+
+    assert stat.S_IMODE(dst.stat().st_mode) == 0o640
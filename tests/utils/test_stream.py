@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+import io
+
+from sekai_parsers.utils.stream import iter_decoded_lines, make_line_writer
+
+
+def test_iter_decoded_lines_matches_splitlines_across_chunk_boundaries():
+    text = "「こんにちは」\r\n.message 0 a\r\rx\n\nlast"
+    data = text.encode("cp932")
+
+    for chunk_size in (1, 2, 3, 7, 64):
+        lines = list(iter_decoded_lines(io.BytesIO(data), "cp932", chunk_size=chunk_size))
+        assert lines == text.splitlines(keepends=True)
+
+
+def test_line_writer_encodes_incrementally():
+    out = io.BytesIO()
+    write = make_line_writer(out, "cp932")
+    write("「a」\r\n")
+    write("b")
+    assert out.getvalue() == "「a」\r\nb".encode("cp932")